@@ -145,21 +145,50 @@ app.on('activate', () => {
     }
 })
 
+// Scan process currently running, so the renderer can cancel it
+let activeScan: ChildProcess | null = null
+
 // IPC Handlers for Python scanner communication
-ipcMain.handle('run-scan', async (_event, options: { quick: boolean }) => {
+ipcMain.handle('run-scan', async (event, options: { quick: boolean }) => {
     return new Promise((resolve, reject) => {
-        const args = ['--scan', '--output', 'json']
+        const args = ['--scan', '--output', 'json', '--stream']
         if (options.quick) {
             args.push('--quick')
         }
 
         const pythonProcess = spawnPython(args)
+        activeScan = pythonProcess
 
-        let stdout = ''
+        // Scan results arrive as NDJSON events; keep only the partial last line
+        let buffer = ''
         let stderr = ''
+        const items: any[] = []
+        let summary: any = null
+
+        const handleLine = (line: string) => {
+            if (!line.trim()) return
+            let scanEvent: any
+            try {
+                scanEvent = JSON.parse(line)
+            } catch (e) {
+                return
+            }
+            const { type, ...data } = scanEvent
+            if (type === 'item') {
+                items.push(data)
+            } else if (type === 'done') {
+                summary = data
+            }
+            if (type !== 'item') {
+                event.sender.send('scan-progress', scanEvent)
+            }
+        }
 
         pythonProcess.stdout?.on('data', (data) => {
-            stdout += data.toString()
+            buffer += data.toString()
+            const lines = buffer.split('\n')
+            buffer = lines.pop() ?? ''
+            lines.forEach(handleLine)
         })
 
         pythonProcess.stderr?.on('data', (data) => {
@@ -167,12 +196,14 @@ ipcMain.handle('run-scan', async (_event, options: { quick: boolean }) => {
         })
 
         pythonProcess.on('close', (code) => {
+            if (activeScan === pythonProcess) activeScan = null
+            handleLine(buffer)
             if (code === 0) {
-                try {
-                    const result = JSON.parse(stdout)
-                    resolve(result)
-                } catch (e) {
-                    resolve({ error: 'Failed to parse scan results', raw: stdout })
+                if (summary) {
+                    items.sort((a, b) => b.size_bytes - a.size_bytes)
+                    resolve({ ...summary, items })
+                } else {
+                    resolve({ error: 'Failed to parse scan results', raw: buffer })
                 }
             } else {
                 reject({ error: stderr || 'Scan failed', code })
@@ -185,6 +216,13 @@ ipcMain.handle('run-scan', async (_event, options: { quick: boolean }) => {
     })
 })
 
+// SIGTERM makes the scanner checkpoint and exit; the scan resolves with status 'partial'
+ipcMain.handle('cancel-scan', async () => {
+    if (!activeScan) return { success: false }
+    activeScan.kill('SIGTERM')
+    return { success: true }
+})
+
 ipcMain.handle('execute-cleanup', async (_event, items: string[]) => {
     return new Promise((resolve, reject) => {
         const args = [
@@ -334,7 +372,7 @@ ipcMain.handle('get-stats', async () => {
                     const result = JSON.parse(stdout)
                     resolve(result)
                 } catch (e) {
-                    resolve({ total_scans: 0, total_cleanups: 0, total_bytes_freed: 0, total_items_cleaned: 0 })
+                    resolve({ total_scans: 0, total_cleanups: 0, total_bytes_freed: 0, total_disk_bytes_freed: 0, total_items_cleaned: 0 })
                 }
             } else {
                 reject({ error: stderr || 'Failed to get stats', code })
@@ -342,7 +380,7 @@ ipcMain.handle('get-stats', async () => {
         })
 
         pythonProcess.on('error', (err) => {
-            resolve({ total_scans: 0, total_cleanups: 0, total_bytes_freed: 0, total_items_cleaned: 0 })
+            resolve({ total_scans: 0, total_cleanups: 0, total_bytes_freed: 0, total_disk_bytes_freed: 0, total_items_cleaned: 0 })
         })
     })
 })
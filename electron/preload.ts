@@ -5,6 +5,12 @@ contextBridge.exposeInMainWorld('electronAPI', {
     // Scanner operations
     runScan: (options: { quick: boolean }) => ipcRenderer.invoke('run-scan', options),
     executeCleanup: (items: string[]) => ipcRenderer.invoke('execute-cleanup', items),
+    cancelScan: () => ipcRenderer.invoke('cancel-scan'),
+    onScanProgress: (callback: (event: { type: string; [key: string]: any }) => void) => {
+        const handler = (_event: any, scanEvent: any) => callback(scanEvent)
+        ipcRenderer.on('scan-progress', handler)
+        return () => ipcRenderer.removeListener('scan-progress', handler)
+    },
 
     // System info
     getSystemInfo: () => ipcRenderer.invoke('get-system-info'),
@@ -68,6 +74,7 @@ declare global {
         electronAPI: {
             runScan: (options: { quick: boolean }) => Promise<any>
             executeCleanup: (items: string[]) => Promise<any>
+            onScanProgress: (callback: (event: { type: string; [key: string]: any }) => void) => () => void
             getSystemInfo: () => Promise<{
                 platform: string
                 arch: string
@@ -85,6 +92,7 @@ declare global {
                     scan_type: string
                     total_items: number
                     total_size_bytes: number
+                    total_disk_bytes: number
                     duration_seconds: number
                     status: string
                 }>
@@ -95,12 +103,14 @@ declare global {
                     items_deleted: number
                     items_failed: number
                     bytes_freed: number
+                    disk_bytes_freed: number
                 }>
             }>
             getStats: () => Promise<{
                 total_scans: number
                 total_cleanups: number
                 total_bytes_freed: number
+                total_disk_bytes_freed: number
                 total_items_cleaned: number
             }>
             getDiskUsage: () => Promise<{
@@ -1,14 +1,53 @@
 # CloudCleaner Python Modules
-from .cache_scanner import CacheScanner, FileItem, ScanResult
+from .cache_scanner import CacheScanner, FileItem, ItemColumns, SpilledItems, ScanResult, ScanEvent
 from .cleaner import Cleaner, CleanupResult
-from .safety_rules import validate_deletion_safety, is_path_protected
+from .deleter import ParallelDeleter, DeletionReport
+from .quarantine import Quarantine, QuarantineEntry, QuarantineResult
+from .xdg_trash import XdgTrash, TrashResult
+from .dir_sizer import DirSizer, FileFilter, WalkCheckpoint
+from .scan_index import ScanIndex
+from .io_throttle import IOThrottle
+from .watcher import CacheWatcher
+from .rule_packs import BUILTIN_PACKS, CompiledRules, compile_packs
+from .duplicate_finder import DuplicateFinder, DuplicateGroup, DuplicateScanResult
+from .artifact_finder import ArtifactFinder, ArtifactScanResult, ProjectArtifact
+from .safety_rules import validate_deletion_safety, validate_many, is_path_protected, RuleSet
+from .path_matcher import PathMatcher
 
 __all__ = [
     'CacheScanner',
     'FileItem',
+    'ItemColumns',
+    'SpilledItems',
     'ScanResult',
+    'ScanEvent',
     'Cleaner',
     'CleanupResult',
+    'ParallelDeleter',
+    'DeletionReport',
+    'Quarantine',
+    'QuarantineEntry',
+    'QuarantineResult',
+    'XdgTrash',
+    'TrashResult',
+    'DirSizer',
+    'FileFilter',
+    'WalkCheckpoint',
+    'ScanIndex',
+    'IOThrottle',
+    'CacheWatcher',
+    'BUILTIN_PACKS',
+    'CompiledRules',
+    'compile_packs',
+    'DuplicateFinder',
+    'DuplicateGroup',
+    'DuplicateScanResult',
+    'ArtifactFinder',
+    'ArtifactScanResult',
+    'ProjectArtifact',
     'validate_deletion_safety',
+    'validate_many',
     'is_path_protected',
+    'RuleSet',
+    'PathMatcher',
 ]
@@ -0,0 +1,248 @@
+"""
+CloudCleaner - Artifact Finder Module
+Finds regenerable build outputs (node_modules, target, build, ...) in project trees.
+"""
+
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field
+import os
+import time
+
+from .dir_sizer import DirSizer, _DevicePlan
+from .fd_walk import scan_dir
+from .io_throttle import IOThrottle
+from .path_matcher import PathMatcher
+
+
+# Artifact directory name -> (ecosystem, marker files, where the markers live).
+# 'parent' markers sit next to the directory in the project root; 'self'
+# markers sit inside it. A directory is an artifact if any marker exists;
+# an empty marker list means the name alone is conclusive.
+ARTIFACT_RULES: Dict[str, List[Tuple[str, Tuple[str, ...], str]]] = {
+    'node_modules': [('node', ('package.json',), 'parent')],
+    'target': [
+        ('rust', ('Cargo.toml',), 'parent'),
+        ('maven', ('pom.xml',), 'parent'),
+    ],
+    'build': [
+        ('gradle', ('build.gradle', 'build.gradle.kts', 'settings.gradle', 'settings.gradle.kts'), 'parent'),
+        ('cmake', ('CMakeLists.txt',), 'parent'),
+        ('python', ('setup.py', 'pyproject.toml'), 'parent'),
+    ],
+    '.gradle': [('gradle', ('build.gradle', 'build.gradle.kts', 'settings.gradle', 'settings.gradle.kts'), 'parent')],
+    '__pycache__': [('python', (), 'parent')],
+    '.venv': [('python', ('pyvenv.cfg',), 'self')],
+    'venv': [('python', ('pyvenv.cfg',), 'self')],
+}
+
+# Never descended into: version control internals hold no artifacts
+SKIP_DIRS = {'.git', '.hg', '.svn'}
+
+
+@dataclass
+class ProjectArtifact:
+    """A build output directory that the project's tooling can regenerate."""
+    path: str
+    name: str  # Directory name, e.g. 'node_modules'
+    ecosystem: str  # 'node', 'rust', 'maven', 'gradle', 'cmake' or 'python'
+    project: str  # Directory holding the marker file
+    marker: str  # Marker file that identified it ('' if the name alone did)
+    last_build: float = 0  # Newest mtime of the directory and its top-level entries
+    size_bytes: int = 0
+    disk_size_bytes: int = 0
+
+    @property
+    def age_days(self) -> float:
+        return max(0.0, (time.time() - self.last_build) / 86400)
+
+    def to_dict(self) -> dict:
+        return {
+            'path': self.path,
+            'name': self.name,
+            'ecosystem': self.ecosystem,
+            'project': self.project,
+            'marker': self.marker,
+            'last_build': self.last_build,
+            'age_days': round(self.age_days, 1),
+            'size_bytes': self.size_bytes,
+            'disk_size_bytes': self.disk_size_bytes
+        }
+
+
+@dataclass
+class ArtifactScanResult:
+    """Complete artifact scan output."""
+    artifacts: List[ProjectArtifact] = field(default_factory=list)  # Stalest first
+    dirs_walked: int = 0
+    scan_duration_seconds: float = 0
+    timestamp: str = ""
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        return sum(artifact.size_bytes for artifact in self.artifacts)
+
+    def cleanup_paths(self) -> List[str]:
+        """Paths Cleaner.execute can delete to reclaim the artifact space."""
+        return [artifact.path for artifact in self.artifacts]
+
+    def to_dict(self) -> dict:
+        return {
+            'total_artifacts': len(self.artifacts),
+            'reclaimable_bytes': self.reclaimable_bytes,
+            'reclaimable_disk_bytes': sum(artifact.disk_size_bytes for artifact in self.artifacts),
+            'artifacts': [artifact.to_dict() for artifact in self.artifacts],
+            'category': 'build_artifacts',
+            'dirs_walked': self.dirs_walked,
+            'scan_duration_seconds': self.scan_duration_seconds,
+            'timestamp': self.timestamp
+        }
+
+
+class ArtifactFinder:
+    """
+    Pruned search for build artifacts under project roots.
+
+    The search lists only source directories: a subdirectory whose name
+    and marker files identify it as an artifact is recorded and never
+    entered, so a node_modules tree costs one listing of its parent. The
+    artifacts found are then sized together in one parallel DirSizer walk.
+    Like every walk, the search stays on the filesystems of its roots
+    unless cross_mounts is set, and backs off under the I/O throttle.
+    """
+
+    def __init__(self, sizer: Optional[DirSizer] = None, exclusions: Optional[List[str]] = None,
+                 min_age_days: float = 0, cross_mounts: Optional[bool] = None,
+                 throttle: Optional[IOThrottle] = None):
+        """
+        Initialize finder.
+
+        Args:
+            sizer: Sizing engine (created if not given)
+            exclusions: User exclusion paths/globs; excluded trees are not searched
+            min_age_days: Only report artifacts not rebuilt for this many days
+            cross_mounts: Descend into filesystems mounted below the roots
+                (the sizer's setting if None)
+            throttle: Background-mode I/O throttle (the sizer's if None)
+        """
+        self.sizer = sizer or DirSizer()
+        self.exclusions = PathMatcher((path, path) for path in exclusions or ())
+        self.min_age_days = min_age_days
+        self.cross_mounts = self.sizer.cross_mounts if cross_mounts is None else cross_mounts
+        self.throttle = throttle or self.sizer.throttle
+
+    def find(self, roots: List[str]) -> ArtifactScanResult:
+        """
+        Find build artifacts under the given roots.
+
+        Args:
+            roots: Directories to search, e.g. the user's projects folder
+
+        Returns:
+            ArtifactScanResult, stalest artifacts first
+        """
+        start_time = time.time()
+        roots = [os.path.normpath(os.path.abspath(os.path.expanduser(root))) for root in roots]
+        roots = [root for root in dict.fromkeys(roots) if os.path.isdir(root)]
+
+        artifacts: Dict[str, ProjectArtifact] = {}
+        dirs_walked = 0
+        devices = _DevicePlan(roots, self.cross_mounts)
+        stack = [(root, dev) for root, dev in reversed(list(zip(roots, devices.root_devs)))
+                 if self.exclusions.match_walked(root) is None]
+        while stack:
+            path, dev = stack.pop()
+            dirs_walked += 1
+            listed = self._list(path, artifacts)
+            # Mount points the walk must not enter are not reported either
+            kept = set(devices.stay_on_device([child for child, _ in listed], dev))
+            for child, is_artifact in listed:
+                if child not in kept:
+                    artifacts.pop(child, None)
+                elif not is_artifact:
+                    stack.append((child, devices.device_of(child, dev)))
+
+        cutoff = time.time() - self.min_age_days * 86400
+        found = [artifact for artifact in artifacts.values()
+                 if self.min_age_days <= 0 or artifact.last_build <= cutoff]
+        sizes = self.sizer.measure([artifact.path for artifact in found], exclude=self.exclusions)
+        for artifact in found:
+            artifact.size_bytes = sizes[artifact.path].size_bytes
+            artifact.disk_size_bytes = sizes[artifact.path].disk_bytes
+
+        found.sort(key=lambda artifact: (artifact.last_build, -artifact.size_bytes))
+        return ArtifactScanResult(
+            artifacts=found,
+            dirs_walked=dirs_walked,
+            scan_duration_seconds=round(time.time() - start_time, 2),
+            timestamp=time.strftime('%Y-%m-%dT%H:%M:%S')
+        )
+
+    def _list(self, path: str, artifacts: Dict[str, ProjectArtifact]) -> List[Tuple[str, bool]]:
+        """List a directory's subdirectories, recording those that are artifacts."""
+        files = set()
+        subdirs = []
+        count = 0
+        if self.throttle:
+            self.throttle.wait()
+        started = time.monotonic()
+        try:
+            with scan_dir(path) as entries:
+                for entry in entries:
+                    count += 1
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in SKIP_DIRS:
+                                subdirs.append(entry.name)
+                        else:
+                            files.add(entry.name)
+                    except OSError:
+                        continue
+        except (PermissionError, OSError):
+            return []
+        finally:
+            if self.throttle:
+                self.throttle.record(time.monotonic() - started, count)
+
+        listed = []
+        for name in subdirs:
+            child = os.path.join(path, name)
+            if self.exclusions.match_walked(child) is not None:
+                continue
+            artifact = self._identify(path, name, files)
+            if artifact is not None:
+                artifacts[child] = artifact
+            listed.append((child, artifact is not None))
+        return listed
+
+    def _identify(self, parent: str, name: str, parent_files: set) -> Optional[ProjectArtifact]:
+        """Match a subdirectory against ARTIFACT_RULES."""
+        child = os.path.join(parent, name)
+        for ecosystem, markers, location in ARTIFACT_RULES.get(name, ()):
+            if not markers:
+                marker = ''
+            elif location == 'parent':
+                marker = next((m for m in markers if m in parent_files), None)
+            else:
+                marker = next((m for m in markers if os.path.isfile(os.path.join(child, m))), None)
+            if marker is not None:
+                return ProjectArtifact(path=child, name=name, ecosystem=ecosystem, project=parent,
+                                       marker=marker, last_build=_last_build(child))
+        return None
+
+
+def _last_build(path: str) -> float:
+    """Newest mtime of a directory and its direct entries; builds touch these."""
+    try:
+        newest = os.stat(path, follow_symlinks=False).st_mtime
+    except (PermissionError, OSError):
+        return 0
+    try:
+        with scan_dir(path) as entries:
+            for entry in entries:
+                try:
+                    newest = max(newest, entry.stat(follow_symlinks=False).st_mtime)
+                except OSError:
+                    continue
+    except (PermissionError, OSError):
+        pass
+    return newest
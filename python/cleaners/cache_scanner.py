@@ -3,14 +3,50 @@ CloudCleaner - Cache Scanner Module
 Scans system for junk files, caches, and temporary data.
 """
 
-from typing import List, Dict, Optional
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Iterable, Optional, Iterator, Tuple, Union
+from dataclasses import dataclass, field, asdict, replace
 from pathlib import Path
+from array import array
+import heapq
+import itertools
+import struct
+import tempfile
 import platform
 import os
+import threading
 import time
 import json
 
+from .dir_sizer import DirSizer, WalkProgress, WalkCheckpoint, FileMatch, FileFilter, disk_usage
+from .path_matcher import PathMatcher
+from .rule_packs import compile_packs
+
+
+# Default time budget of a quick scan, in seconds
+QUICK_SCAN_BUDGET = 2.0
+
+# Memory held by scan items before a sorted run is spilled to a temporary file
+SPILL_THRESHOLD_BYTES = 256 * 1024 * 1024
+
+# One spilled item: size, disk size, margin, mtime, estimated, profile id, path length
+_RUN_RECORD = struct.Struct('<qqqdbHI')
+
+# Run files older than this are leftovers of a scan that died, removed on the next spill
+STALE_RUN_SECONDS = 24 * 3600
+
+
+def default_spill_dir() -> str:
+    """
+    Spill directory inside the application's data directory.
+
+    Not the system temp directory: /tmp is itself a scan root, so a large
+    scan would fill the filesystem it is measuring and walk its own runs.
+    """
+    if os.name == 'nt':
+        app_data = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+        return os.path.join(app_data, 'CloudCleaner', 'spill')
+    return os.path.expanduser('~/.cloudcleaner/spill')
+
 @dataclass
 class FileItem:
     """Represents a scannable file or directory."""
@@ -21,38 +57,405 @@ class FileItem:
     risk_level: str  # 'low', 'medium', 'high'
     safe_to_delete: bool
     reason: str
+    disk_size_bytes: int = 0  # Allocated size on disk, hardlinks counted once
+    estimated: bool = False  # Size extrapolated by a time-budgeted quick scan
+    size_margin_bytes: int = 0  # +/- bound (~95% confidence) on an estimated size
 
     def to_dict(self) -> dict:
         return asdict(self)
 
+class ItemColumns:
+    """
+    Compact columnar store of scan items.
+
+    Sizes and mtimes live in typed arrays, paths in one packed byte buffer,
+    and the (category, risk, safe, reason) profile of each item is interned
+    into a small table referenced by index. No per-item Python objects are
+    kept; FileItem instances are built on access for callers that want them.
+    Behaves like a read-only list of FileItem (len, indexing, slicing, iter).
+    """
+
+    def __init__(self):
+        self.sizes = array('q')
+        self.disk_sizes = array('q')
+        self.margins = array('q')
+        self.estimated = array('b')
+        self.mtimes = array('d')
+        self.profile_ids = array('H')
+        self.profiles: List[Tuple[str, str, bool, str]] = []
+        self._profile_index: Dict[Tuple[str, str, bool, str], int] = {}
+        self._paths = bytearray()
+        self._path_ends = array('Q')
+        self._order: Optional[array] = None
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def append(self, path: str, size_bytes: int, last_modified: float, category: str,
+               risk_level: str, safe_to_delete: bool, reason: str, disk_size_bytes: int = 0,
+               estimated: bool = False, size_margin_bytes: int = 0):
+        """Add one item."""
+        profile = (category, risk_level, safe_to_delete, reason)
+        profile_id = self._profile_index.get(profile)
+        if profile_id is None:
+            profile_id = self._profile_index[profile] = len(self.profiles)
+            self.profiles.append(profile)
+        if self._order is not None:
+            self._order.append(len(self.sizes))
+        self.sizes.append(size_bytes)
+        self.disk_sizes.append(disk_size_bytes)
+        self.margins.append(size_margin_bytes)
+        self.estimated.append(estimated)
+        self.mtimes.append(last_modified)
+        self.profile_ids.append(profile_id)
+        self._paths += os.fsencode(path)
+        self._path_ends.append(len(self._paths))
+
+    def append_item(self, item: FileItem):
+        """Add one FileItem."""
+        self.append(item.path, item.size_bytes, item.last_modified, item.category,
+                    item.risk_level, item.safe_to_delete, item.reason, item.disk_size_bytes,
+                    item.estimated, item.size_margin_bytes)
+
+    def path(self, row: int) -> str:
+        """Path of a physical row."""
+        start = self._path_ends[row - 1] if row else 0
+        return os.fsdecode(bytes(self._paths[start:self._path_ends[row]]))
+
+    def _rows(self) -> Iterator[int]:
+        return iter(self._order) if self._order is not None else iter(range(len(self.sizes)))
+
+    def _view(self, row: int) -> FileItem:
+        category, risk_level, safe_to_delete, reason = self.profiles[self.profile_ids[row]]
+        return FileItem(
+            path=self.path(row),
+            size_bytes=self.sizes[row],
+            category=category,
+            last_modified=self.mtimes[row],
+            risk_level=risk_level,
+            safe_to_delete=safe_to_delete,
+            reason=reason,
+            disk_size_bytes=self.disk_sizes[row],
+            estimated=bool(self.estimated[row]),
+            size_margin_bytes=self.margins[row]
+        )
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[FileItem, List[FileItem]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        row = self._order[index] if self._order is not None else index
+        return self._view(row)
+
+    def __iter__(self) -> Iterator[FileItem]:
+        return (self._view(row) for row in self._rows())
+
+    def sort_by_size(self, reverse: bool = True):
+        """Order items by size (largest first by default) without moving any data."""
+        self._order = array('Q', sorted(range(len(self.sizes)), key=self.sizes.__getitem__,
+                                        reverse=reverse))
+
+    def top(self, n: int) -> List[FileItem]:
+        """The n largest items, largest first."""
+        rows = heapq.nlargest(n, range(len(self.sizes)), key=self.sizes.__getitem__)
+        return [self._view(row) for row in rows]
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the columns."""
+        arrays = (self.sizes, self.disk_sizes, self.margins, self.estimated, self.mtimes,
+                  self.profile_ids, self._path_ends)
+        return len(self._paths) + sum(column.itemsize * len(column) for column in arrays)
+
+    def category_totals(self) -> Dict[str, int]:
+        """Total size per category, aggregated straight from the columns."""
+        per_profile = [0] * len(self.profiles)
+        for profile_id, size in zip(self.profile_ids, self.sizes):
+            per_profile[profile_id] += size
+        totals: Dict[str, int] = {}
+        for (category, _, _, _), size in zip(self.profiles, per_profile):
+            totals[category] = totals.get(category, 0) + size
+        return totals
+
+    def iter_dicts(self) -> Iterator[dict]:
+        """Serialize items to dicts one at a time, without building FileItem instances."""
+        profiles = [
+            {'category': category, 'risk_level': risk_level,
+             'safe_to_delete': safe_to_delete, 'reason': reason}
+            for category, risk_level, safe_to_delete, reason in self.profiles
+        ]
+        return (
+            {'path': self.path(row), 'size_bytes': self.sizes[row],
+             'last_modified': self.mtimes[row], **profiles[self.profile_ids[row]],
+             'disk_size_bytes': self.disk_sizes[row], 'estimated': bool(self.estimated[row]),
+             'size_margin_bytes': self.margins[row]}
+            for row in self._rows()
+        )
+
+    def to_list(self) -> List[dict]:
+        """Serialize items to dicts without building FileItem instances."""
+        return list(self.iter_dicts())
+
+
+class SpilledItems:
+    """
+    Scan items too many to hold in memory, largest first.
+
+    Items collect in an ItemColumns buffer; whenever it grows past the
+    spill threshold it is sorted by size and written out as a run to a
+    temporary file. Reading k-way merges the runs and the final
+    buffer (heapq.merge), so iterating holds one item per run in memory.
+    Sequential access only: iteration, top(n) and leading slices.
+    Use ItemRuns to build one.
+    """
+
+    def __init__(self, runs: List[str], buffer: ItemColumns, profiles: List[Tuple[str, str, bool, str]],
+                 count: int, totals: Dict[str, int]):
+        self._runs = runs
+        self._buffer = buffer
+        self._profiles = profiles
+        self._count = count
+        self._totals = totals
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[FileItem]:
+        sources = [self._read_run(run) for run in self._runs]
+        sources.append(iter(self._buffer))
+        return heapq.merge(*sources, key=lambda item: item.size_bytes, reverse=True)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[FileItem, List[FileItem]]:
+        if isinstance(index, slice):
+            return list(itertools.islice(iter(self), *index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        for item in itertools.islice(iter(self), index, None):
+            return item
+        raise IndexError(index)
+
+    def _read_run(self, run: str) -> Iterator[FileItem]:
+        with open(run, 'rb', buffering=1024 * 1024) as f:
+            while True:
+                header = f.read(_RUN_RECORD.size)
+                if not header:
+                    return
+                size, disk_size, margin, mtime, estimated, profile_id, path_length = _RUN_RECORD.unpack(header)
+                category, risk_level, safe_to_delete, reason = self._profiles[profile_id]
+                yield FileItem(
+                    path=os.fsdecode(f.read(path_length)),
+                    size_bytes=size,
+                    category=category,
+                    last_modified=mtime,
+                    risk_level=risk_level,
+                    safe_to_delete=safe_to_delete,
+                    reason=reason,
+                    disk_size_bytes=disk_size,
+                    estimated=bool(estimated),
+                    size_margin_bytes=margin
+                )
+
+    def top(self, n: int) -> List[FileItem]:
+        """The n largest items, largest first."""
+        return list(itertools.islice(iter(self), n))
+
+    def category_totals(self) -> Dict[str, int]:
+        """Total size per category."""
+        return dict(self._totals)
+
+    def iter_dicts(self) -> Iterator[dict]:
+        """Serialize items to dicts one at a time."""
+        return (item.to_dict() for item in self)
+
+    def to_list(self) -> List[dict]:
+        """Serialize all items to dicts (materializes them; prefer iter_dicts)."""
+        return list(self.iter_dicts())
+
+    def close(self):
+        """Delete the temporary run files."""
+        for run in self._runs:
+            try:
+                os.remove(run)
+            except OSError:
+                pass
+        self._runs = []
+
+    def __del__(self):
+        self.close()
+
+
+class ItemRuns:
+    """
+    Collects scan items with bounded memory, spilling sorted runs to disk.
+
+    finish() returns the plain sorted ItemColumns when everything fit under
+    the threshold, and a SpilledItems merging the runs otherwise.
+    """
+
+    def __init__(self, threshold_bytes: int = SPILL_THRESHOLD_BYTES, temp_dir: Optional[str] = None):
+        """
+        Initialize collector.
+
+        Args:
+            threshold_bytes: Buffer size at which a run is spilled
+            temp_dir: Directory for run files (default_spill_dir() if None)
+        """
+        self.threshold_bytes = threshold_bytes
+        self.temp_dir = temp_dir or default_spill_dir()
+        self._buffer = ItemColumns()
+        self._runs: List[str] = []
+        # Profiles of all runs, so each run record only stores an index
+        self._profiles: List[Tuple[str, str, bool, str]] = []
+        self._profile_index: Dict[Tuple[str, str, bool, str], int] = {}
+        self._count = 0
+        self._totals: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append_item(self, item: FileItem):
+        """Add one FileItem, spilling the buffer when it grows past the threshold."""
+        self._buffer.append_item(item)
+        self._count += 1
+        self._totals[item.category] = self._totals.get(item.category, 0) + item.size_bytes
+        # Checked every 1024 items; computing the size is cheap but not free
+        if not self._count & 1023 and self._buffer.memory_bytes() >= self.threshold_bytes:
+            self._spill()
+
+    def _spill(self):
+        buffer = self._buffer
+        buffer.sort_by_size()
+        profile_ids = []
+        for profile in buffer.profiles:
+            if profile not in self._profile_index:
+                self._profile_index[profile] = len(self._profiles)
+                self._profiles.append(profile)
+            profile_ids.append(self._profile_index[profile])
+
+        if not self._runs:
+            self._prepare_dir()
+        fd, run = tempfile.mkstemp(prefix='cloudcleaner-run-', dir=self.temp_dir)
+        self._runs.append(run)
+        with open(fd, 'wb', buffering=1024 * 1024) as f:
+            for row in buffer._rows():
+                path = os.fsencode(buffer.path(row))
+                f.write(_RUN_RECORD.pack(buffer.sizes[row], buffer.disk_sizes[row], buffer.margins[row],
+                                         buffer.mtimes[row], buffer.estimated[row],
+                                         profile_ids[buffer.profile_ids[row]], len(path)))
+                f.write(path)
+        self._buffer = ItemColumns()
+
+    def _prepare_dir(self):
+        """Create the spill directory and drop runs a crashed scan left behind."""
+        os.makedirs(self.temp_dir, mode=0o700, exist_ok=True)
+        cutoff = time.time() - STALE_RUN_SECONDS
+        with os.scandir(self.temp_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.name.startswith('cloudcleaner-run-') and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError:
+                    continue
+
+    def finish(self) -> Union[ItemColumns, SpilledItems]:
+        """Sort what is buffered and hand back the complete, largest-first collection."""
+        self._buffer.sort_by_size()
+        if not self._runs:
+            return self._buffer
+        # The last run stays in memory; merged with the spilled ones on read
+        for profile in self._buffer.profiles:
+            if profile not in self._profile_index:
+                self._profile_index[profile] = len(self._profiles)
+                self._profiles.append(profile)
+        return SpilledItems(self._runs, self._buffer, self._profiles, self._count, self._totals)
+
+
 @dataclass
 class ScanResult:
     """Complete scan output."""
     total_items: int
     total_size_bytes: int
-    items: List[FileItem]
+    items: Union[ItemColumns, SpilledItems]  # Largest first
     categories: Dict[str, int]
     scan_duration_seconds: float
     timestamp: str
+    total_disk_size_bytes: int = 0
+    estimated: bool = False  # Some sizes were extrapolated (quick scan)
+    total_size_margin_bytes: int = 0
+    status: str = 'completed'  # 'partial' if cancelled before finishing
+    checkpoint: Optional[Dict] = None  # Resume state of a partial scan (without items), see scan_iter
+    # (path, size, disk size, inode, mtime_ns) of each fully walked directory item
+    measured_dirs: List[Tuple[str, int, int, int, int]] = field(default_factory=list)
 
-    def to_dict(self) -> dict:
-        return {
+    def to_dict(self, include_items: bool = True) -> dict:
+        output = {
+            'status': self.status,
             'total_items': self.total_items,
             'total_size_bytes': self.total_size_bytes,
-            'items': [item.to_dict() for item in self.items],
+            'total_disk_size_bytes': self.total_disk_size_bytes,
+            'estimated': self.estimated,
+            'total_size_margin_bytes': self.total_size_margin_bytes,
             'categories': self.categories,
             'scan_duration_seconds': self.scan_duration_seconds,
             'timestamp': self.timestamp
         }
+        if include_items:
+            output['items'] = self.items.to_list()
+        return output
+
+    def close(self):
+        """Release temporary files of spilled items."""
+        if isinstance(self.items, SpilledItems):
+            self.items.close()
+
+@dataclass
+class ScanEvent:
+    """A single event emitted by a streaming scan."""
+    type: str  # 'item', 'category', 'progress', 'done'
+    data: Dict = field(default_factory=dict)
+    item: Optional[FileItem] = None
+
+    def to_dict(self) -> dict:
+        output = {'type': self.type}
+        if self.item is not None:
+            output.update(self.item.to_dict())
+        output.update(self.data)
+        return output
 
 
 class CacheScanner:
     """Main scanner engine for discovering junk files."""
 
-    def __init__(self, os_type: Optional[str] = None):
+    def __init__(self, os_type: Optional[str] = None, sizer: Optional[DirSizer] = None,
+                 exclusions: Optional[List[str]] = None, rule_packs: Optional[List[str]] = None,
+                 pack_files: Optional[List[str]] = None,
+                 spill_threshold_bytes: int = SPILL_THRESHOLD_BYTES, temp_dir: Optional[str] = None):
+        """
+        Initialize scanner.
+
+        Args:
+            os_type: OS whose scan targets to use; defaults to the running OS
+            sizer: Shared directory sizing engine (created if not given)
+            exclusions: User exclusion paths/globs, pruned during traversal
+            rule_packs: Built-in rule packs to scan with (all if None)
+            pack_files: Additional rule packs in JSON files
+            spill_threshold_bytes: Memory scan() may hold in items before
+                spilling sorted runs to temporary files
+            temp_dir: Directory for those files (default_spill_dir() if
+                None); never walked by the scan itself
+        """
         self.os_type = os_type or platform.system().lower()
         self.whitelist = self._load_whitelist()
-        self.scan_paths = self._get_scan_paths()
+        self.whitelist_matcher = PathMatcher((path, path) for path in self.whitelist)
+        self.temp_dir = temp_dir or default_spill_dir()
+        # User exclusions (paths or globs), compiled once and pruned during traversal;
+        # the spill directory is pruned too, should it lie under a scan root
+        self.exclusions = PathMatcher((path, path) for path in [*(exclusions or ()), self.temp_dir])
+        # Scan targets, compiled once per pack selection and shared between scanners
+        self.rules = compile_packs(self.os_type, tuple(rule_packs) if rule_packs is not None else None,
+                                   tuple(pack_files or ()))
+        self.sizer = sizer or DirSizer()
+        self.spill_threshold_bytes = spill_threshold_bytes
 
     def _load_whitelist(self) -> List[str]:
         """Load critical paths that should never be touched."""
@@ -93,113 +496,17 @@ class CacheScanner:
                 '/etc', '/lib', '/lib64',
             ]
 
-    def _get_scan_paths(self) -> Dict[str, Dict]:
-        """Get OS-specific scan paths with metadata."""
-        if self.os_type == 'windows':
-            temp = os.path.expandvars('%TEMP%')
-            local_app = os.path.expandvars('%LOCALAPPDATA%')
-            return {
-                'temp_files': {
-                    'paths': [temp, r'C:\Windows\Temp'],
-                    'category': 'temp_files',
-                    'risk_level': 'low',
-                    'reason': 'Temporary files - safe to delete'
-                },
-                'chrome_cache': {
-                    'paths': [f'{local_app}\\Google\\Chrome\\User Data\\Default\\Cache',
-                              f'{local_app}\\Google\\Chrome\\User Data\\Default\\Code Cache'],
-                    'category': 'browser_cache',
-                    'risk_level': 'low',
-                    'reason': 'Chrome browser cache'
-                },
-                'edge_cache': {
-                    'paths': [f'{local_app}\\Microsoft\\Edge\\User Data\\Default\\Cache'],
-                    'category': 'browser_cache',
-                    'risk_level': 'low',
-                    'reason': 'Edge browser cache'
-                },
-                'firefox_cache': {
-                    'paths': [f'{local_app}\\Mozilla\\Firefox\\Profiles'],
-                    'category': 'browser_cache',
-                    'risk_level': 'low',
-                    'reason': 'Firefox browser cache'
-                },
-                'thumbnails': {
-                    'paths': [f'{local_app}\\Microsoft\\Windows\\Explorer'],
-                    'category': 'thumbnails',
-                    'risk_level': 'low',
-                    'reason': 'Windows thumbnail cache'
-                },
-                'crash_dumps': {
-                    'paths': [f'{local_app}\\CrashDumps',
-                              os.path.expandvars(r'%USERPROFILE%\AppData\Local\CrashDumps')],
-                    'category': 'crash_dumps',
-                    'risk_level': 'low',
-                    'reason': 'Application crash dumps'
-                },
-                'windows_logs': {
-                    'paths': [r'C:\Windows\Logs'],
-                    'category': 'logs',
-                    'risk_level': 'medium',
-                    'reason': 'Windows log files - may be useful for debugging'
-                },
-            }
-        elif self.os_type == 'darwin':
-            home = os.path.expanduser('~')
-            return {
-                'user_cache': {
-                    'paths': [f'{home}/Library/Caches'],
-                    'category': 'app_cache',
-                    'risk_level': 'low',
-                    'reason': 'Application caches'
-                },
-                'chrome_cache': {
-                    'paths': [f'{home}/Library/Caches/Google/Chrome'],
-                    'category': 'browser_cache',
-                    'risk_level': 'low',
-                    'reason': 'Chrome browser cache'
-                },
-            }
-        else:  # Linux
-            home = os.path.expanduser('~')
-            return {
-                'temp_files': {
-                    'paths': ['/tmp', f'{home}/.cache'],
-                    'category': 'temp_files',
-                    'risk_level': 'low',
-                    'reason': 'Temporary files'
-                },
-                'chrome_cache': {
-                    'paths': [f'{home}/.cache/google-chrome'],
-                    'category': 'browser_cache',
-                    'risk_level': 'low',
-                    'reason': 'Chrome browser cache'
-                },
-            }
-
     def _is_path_protected(self, path: str) -> bool:
         """Check if path is in whitelist."""
-        path_lower = path.lower()
-        for protected in self.whitelist:
-            if path_lower.startswith(protected.lower()):
-                return True
-        return False
+        return self.whitelist_matcher.match(path) is not None
+
+    def _is_path_excluded(self, path: str) -> bool:
+        """Check if path is covered by a user exclusion."""
+        return bool(self.exclusions) and self.exclusions.match(path) is not None
 
     def _get_dir_size(self, path: str) -> int:
         """Calculate total size of a directory."""
-        total = 0
-        try:
-            for entry in os.scandir(path):
-                try:
-                    if entry.is_file(follow_symlinks=False):
-                        total += entry.stat().st_size
-                    elif entry.is_dir(follow_symlinks=False):
-                        total += self._get_dir_size(entry.path)
-                except (PermissionError, OSError):
-                    continue
-        except (PermissionError, OSError):
-            pass
-        return total
+        return self.sizer.get_sizes([path], exclude=self.exclusions).get(path, 0)
 
     def _is_file_locked(self, path: str) -> bool:
         """Check if a file is currently in use."""
@@ -212,76 +519,332 @@ class CacheScanner:
         except (PermissionError, OSError):
             return True
 
-    def scan(self, quick_scan: bool = False) -> ScanResult:
-        """Execute system scan."""
+    def _make_item(self, path: str, size: int, scan_config: Dict,
+                   last_modified: Optional[float] = None, disk_size: int = 0,
+                   estimated: bool = False, size_margin: int = 0) -> FileItem:
+        """Build a FileItem for a scanned path."""
+        return FileItem(
+            path=path,
+            size_bytes=size,
+            category=scan_config['category'],
+            last_modified=os.path.getmtime(path) if last_modified is None else last_modified,
+            risk_level=scan_config['risk_level'],
+            safe_to_delete=True,
+            reason=scan_config['reason'],
+            disk_size_bytes=disk_size,
+            estimated=estimated,
+            size_margin_bytes=size_margin
+        )
+
+    def _iter_roots(self) -> Iterator[Tuple[str, Dict]]:
+        """Yield (path, scan config) for every existing scan root not protected or excluded."""
+        for path, scan_config in self.rules.targets.items():
+            if not os.path.exists(path):
+                continue
+
+            if self._is_path_protected(path) or self._is_path_excluded(path):
+                continue
+
+            yield path, scan_config
+
+    def root_dirs(self) -> List[str]:
+        """Directories a scan walks, e.g. for a watcher to keep current."""
+        return list(dict.fromkeys(path for path, _ in self._iter_roots() if os.path.isdir(path)))
+
+    def scan(self, quick_scan: bool = False, file_filter: Optional[FileFilter] = None,
+             time_budget: Optional[float] = None, cancel: Optional[threading.Event] = None,
+             resume: Optional[Dict] = None,
+             resume_items: Optional[Iterable[FileItem]] = None) -> ScanResult:
+        """
+        Execute system scan.
+
+        Items beyond the spill threshold (see ItemRuns) are kept in sorted
+        temporary runs instead of memory; the result then holds SpilledItems.
+        A partial result's items are what the checkpoint is resumed with.
+        """
+        items = ItemRuns(self.spill_threshold_bytes, self.temp_dir)
+        summary: Dict = {}
+
+        for event in self.scan_iter(quick_scan=quick_scan, progress_interval=None,
+                                    file_filter=file_filter, time_budget=time_budget,
+                                    cancel=cancel, resume=resume, resume_items=resume_items):
+            if event.type == 'item':
+                items.append_item(event.item)
+            elif event.type == 'done':
+                summary = event.data
+
+        return ScanResult(
+            total_items=summary['total_items'],
+            total_size_bytes=summary['total_size_bytes'],
+            total_disk_size_bytes=summary['total_disk_size_bytes'],
+            estimated=summary['estimated'],
+            total_size_margin_bytes=summary['total_size_margin_bytes'],
+            items=items.finish(),
+            categories=summary['categories'],
+            scan_duration_seconds=summary['scan_duration_seconds'],
+            timestamp=summary['timestamp'],
+            status=summary['status'],
+            checkpoint=summary.get('checkpoint'),
+            measured_dirs=summary['measured_dirs']
+        )
+
+    def scan_iter(self, quick_scan: bool = False, progress_interval: Optional[float] = 0.25,
+                  file_filter: Optional[FileFilter] = None, time_budget: Optional[float] = None,
+                  cancel: Optional[threading.Event] = None,
+                  resume: Optional[Dict] = None,
+                  resume_items: Optional[Iterable[FileItem]] = None) -> Iterator[ScanEvent]:
+        """
+        Execute system scan, yielding results as they are found.
+
+        Args:
+            quick_scan: Quick scan mode: finish within time_budget, walking
+                what fits and extrapolating the rest. Items whose size was
+                extrapolated are marked estimated with a +/- margin.
+            progress_interval: Seconds between progress events while sizing
+                directories, or None to emit no progress events
+            file_filter: If set, scan at file granularity: emit one item per
+                file under the scan roots that meets the filter (e.g. older
+                than N days, larger than X bytes) instead of one per root.
+                Filtering happens inside the walk and matches are streamed,
+                so memory stays bounded however many files are scanned.
+                Roots of rules with their own patterns or minimum age are
+                always scanned at file granularity, combined with this filter.
+            time_budget: Seconds allowed for a quick scan (QUICK_SCAN_BUDGET
+                by default). Ignored unless quick_scan is set.
+            cancel: Event that stops the scan between directories when set.
+                The 'done' event then has status 'partial' and carries a
+                JSON-serializable 'checkpoint' of the directories still to
+                walk. The items found so far are not in it: they are the
+                'item' events already yielded, which the caller keeps
+                anyway (e.g. in ItemRuns) and saves alongside.
+            resume: A checkpoint from a cancelled scan; the walk continues
+                where it stopped with the checkpoint's file filter.
+            resume_items: Items the cancelled scan had found, re-emitted
+                first (streamed, so they can come straight from disk)
+
+        Yields:
+            ScanEvent of type 'item' per found item, 'category' with the
+            running subtotal (after each item, or per finished root in file
+            mode), 'progress' while sizing, and a final 'done' with totals.
+            Its 'measured_dirs' lists (path, size, disk size, inode,
+            mtime_ns) of the directory items that were walked in full, with
+            the fingerprint the walk saw, for sizes to be reused later.
+        """
         start_time = time.time()
-        items: List[FileItem] = []
+        prior_seconds = 0.0
+        walk_resume = None
+        if resume is not None:
+            prior_seconds = resume.get('scan_duration_seconds', 0)
+            walk_resume = WalkCheckpoint.from_dict(resume['walk'])
+            file_filter = FileFilter(**resume['file_filter']) if resume.get('file_filter') else None
+        checkpoint: Optional[WalkCheckpoint] = None
+        measured_dirs: List[Tuple[str, int, int, int, int]] = []
         categories: Dict[str, int] = {}
+        total_items = 0
+        total_size = 0
+        total_disk_size = 0
+        total_margin = 0
+        estimated = False
+        # Root directory -> scan config; nested roots are walked once and
+        # their bytes credited to the deepest (most specific) category
+        pending_dirs: Dict[str, Dict] = {}
 
-        for scan_name, scan_config in self.scan_paths.items():
-            for path_template in scan_config['paths']:
-                path = os.path.expandvars(path_template)
-                
-                if not os.path.exists(path):
-                    continue
-                
-                if self._is_path_protected(path):
-                    continue
+        def found(path: str, size: int, disk_size: int, scan_config: Dict,
+                  last_modified: Optional[float] = None, margin: Optional[int] = None,
+                  per_file: bool = False) -> Iterator[ScanEvent]:
+            try:
+                item = self._make_item(path, size, scan_config, last_modified, disk_size,
+                                       margin is not None, margin or 0)
+            except (PermissionError, OSError):
+                return
+            yield from record(item, per_file)
 
-                try:
-                    if os.path.isdir(path):
-                        size = self._get_dir_size(path)
-                        if size > 0:
-                            item = FileItem(
-                                path=path,
-                                size_bytes=size,
-                                category=scan_config['category'],
-                                last_modified=os.path.getmtime(path),
-                                risk_level=scan_config['risk_level'],
-                                safe_to_delete=True,
-                                reason=scan_config['reason']
-                            )
-                            items.append(item)
-                            
-                            # Update category totals
-                            cat = scan_config['category']
-                            categories[cat] = categories.get(cat, 0) + size
-                    
-                    elif os.path.isfile(path) and not self._is_file_locked(path):
-                        size = os.path.getsize(path)
-                        if size > 0:
-                            item = FileItem(
-                                path=path,
-                                size_bytes=size,
-                                category=scan_config['category'],
-                                last_modified=os.path.getmtime(path),
-                                risk_level=scan_config['risk_level'],
-                                safe_to_delete=True,
-                                reason=scan_config['reason']
-                            )
-                            items.append(item)
-                            
-                            cat = scan_config['category']
-                            categories[cat] = categories.get(cat, 0) + size
-                
-                except (PermissionError, OSError) as e:
+        def record(item: FileItem, per_file: bool = False) -> Iterator[ScanEvent]:
+            nonlocal total_items, total_size, total_disk_size, total_margin, estimated
+            cat = item.category
+            categories[cat] = categories.get(cat, 0) + item.size_bytes
+            total_items += 1
+            total_size += item.size_bytes
+            total_disk_size += item.disk_size_bytes
+            if item.estimated:
+                estimated = True
+                total_margin += item.size_margin_bytes
+            yield ScanEvent('item', item=item)
+            # File-granular roots report their category once, when finished
+            if not per_file:
+                yield ScanEvent('category', {'category': cat, 'size_bytes': categories[cat]})
+
+        if resume is not None:
+            measured_dirs.extend(tuple(entry) for entry in resume.get('measured_dirs', ()))
+            # Checkpoints of earlier versions carry their items inline
+            inline = (FileItem(**data) for data in resume.get('items', ()))
+            for item in itertools.chain(inline, resume_items or ()):
+                yield from record(item, file_filter is not None)
+
+        for path, scan_config in self._iter_roots():
+            try:
+                if os.path.isdir(path):
+                    # Sized together below in a single pass over all roots
+                    pending_dirs.setdefault(path, scan_config)
+
+                elif resume is not None:
+                    # File roots are all checked before the walk a checkpoint
+                    # comes from, so the resumed items already include them
                     continue
 
-        # Sort items by size (largest first)
-        items.sort(key=lambda x: x.size_bytes, reverse=True)
+                elif os.path.isfile(path) and not self._is_file_locked(path):
+                    st = os.stat(path)
+                    if st.st_size > 0 and self._passes_filter(path, st,
+                                                              _combine(scan_config['file_filter'], file_filter)):
+                        yield from found(path, st.st_size, disk_usage(st), scan_config, st.st_mtime)
 
-        # Calculate totals
-        total_size = sum(item.size_bytes for item in items)
-        duration = time.time() - start_time
+            except (PermissionError, OSError) as e:
+                continue
 
-        return ScanResult(
-            total_items=len(items),
-            total_size_bytes=total_size,
-            items=items,
-            categories=categories,
-            scan_duration_seconds=round(duration, 2),
-            timestamp=time.strftime('%Y-%m-%dT%H:%M:%S')
-        )
+        budget = None
+        if quick_scan:
+            # Root discovery above counts against the budget too
+            elapsed = time.time() - start_time
+            budget = max(0.1, (time_budget or QUICK_SCAN_BUDGET) - elapsed)
+        # Rule filters are merged with the scan-wide filter; every root is
+        # still walked in the same single pass
+        root_filters = {
+            path: _combine(scan_config['file_filter'], file_filter)
+            for path, scan_config in pending_dirs.items() if scan_config['file_filter']
+        }
+        sizes = self.sizer.iter_sizes(list(pending_dirs), progress_interval=progress_interval,
+                                      exclusive=True, exclude=self.exclusions,
+                                      file_filter=file_filter, time_budget=budget,
+                                      cancel=cancel, resume=walk_resume, root_filters=root_filters)
+        for event in sizes:
+            if isinstance(event, WalkCheckpoint):
+                checkpoint = event
+            elif isinstance(event, FileMatch):
+                if event.size_bytes > 0:
+                    yield from found(event.path, event.size_bytes, event.disk_bytes,
+                                     pending_dirs[event.root], event.mtime, per_file=True)
+            elif isinstance(event, WalkProgress):
+                yield ScanEvent('progress', event.to_dict())
+            elif file_filter is not None or event.path in root_filters:
+                # A root cut short by the budget may have unlisted files
+                estimated = estimated or event.estimated
+                cat = pending_dirs[event.path]['category']
+                yield ScanEvent('category', {'category': cat, 'size_bytes': categories.get(cat, 0)})
+            elif event.size_bytes > 0:
+                if not event.estimated and event.inode:
+                    measured_dirs.append((event.path, event.size_bytes, event.disk_bytes,
+                                          event.inode, event.mtime_ns))
+                yield from found(event.path, event.size_bytes, event.disk_bytes, pending_dirs[event.path],
+                                 margin=event.margin_bytes if event.estimated else None)
+
+        summary = {
+            'status': 'partial' if checkpoint else 'completed',
+            'total_items': total_items,
+            'total_size_bytes': total_size,
+            'total_disk_size_bytes': total_disk_size,
+            'estimated': estimated,
+            'total_size_margin_bytes': total_margin,
+            'categories': categories,
+            'scan_duration_seconds': round(prior_seconds + time.time() - start_time, 2),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'measured_dirs': measured_dirs
+        }
+        if checkpoint:
+            summary['checkpoint'] = {
+                'walk': checkpoint.to_dict(),
+                'measured_dirs': measured_dirs,
+                'file_filter': asdict(file_filter) if file_filter else None,
+                'scan_duration_seconds': summary['scan_duration_seconds']
+            }
+        yield ScanEvent('done', summary)
+
+    def find_largest(self, n: int, roots: Optional[List[str]] = None,
+                     file_filter: Optional[FileFilter] = None) -> List[FileItem]:
+        """
+        Find the n largest files under the given roots.
+
+        Keeps a fixed-size min-heap, so memory is O(n) however many files
+        are walked. Once the heap is full its smallest size becomes the
+        walk's live size threshold, so workers stop handing over files that
+        could not make the ranking.
+
+        Args:
+            n: Number of files to return
+            roots: Directories to search. Defaults to the configured scan paths.
+            file_filter: Optional extra criteria (e.g. minimum age)
+
+        Returns:
+            FileItems sorted largest first
+        """
+        if n <= 0:
+            return []
+        # A copy: its minimum size is raised as the heap fills, which must not leak to the caller
+        file_filter = replace(file_filter) if file_filter else FileFilter()
+
+        configs: Dict[str, Dict] = {}
+        root_filters: Dict[str, FileFilter] = {}
+        if roots:
+            default_config = {
+                'category': 'large_file',
+                'risk_level': 'medium',
+                'reason': 'Large file - review before deleting'
+            }
+            for root in roots:
+                configs.setdefault(os.path.normpath(os.path.abspath(os.path.expanduser(root))),
+                                   default_config)
+        else:
+            configs.update(self.rules.targets)
+            # Rules with their own patterns or age only rank the files they cover
+            root_filters = {root: _combine(rule_filter, file_filter)
+                            for root, rule_filter in self.rules.file_filters().items()}
+        configs = {
+            path: config for path, config in configs.items()
+            if os.path.isdir(path) and not self._is_path_protected(path) and not self._is_path_excluded(path)
+        }
+        root_filters = {path: flt for path, flt in root_filters.items() if path in configs}
+        filters = [file_filter, *root_filters.values()]
+
+        heap: List[Tuple[int, str, float, str, int]] = []
+        for event in self.sizer.iter_sizes(list(configs), exclusive=True, exclude=self.exclusions,
+                                           file_filter=file_filter, root_filters=root_filters):
+            if not isinstance(event, FileMatch):
+                continue
+            entry = (event.size_bytes, event.path, event.mtime, event.root, event.disk_bytes)
+            if len(heap) < n:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            else:
+                continue
+            if len(heap) == n:
+                for flt in filters:
+                    flt.min_size_bytes = max(flt.min_size_bytes, heap[0][0])
+
+        return [
+            self._make_item(path, size, configs[root], mtime, disk_size)
+            for size, path, mtime, root, disk_size in sorted(heap, reverse=True)
+        ]
+
+    @staticmethod
+    def _passes_filter(path: str, st: os.stat_result, file_filter: Optional[FileFilter]) -> bool:
+        """Apply a file filter to a single file."""
+        if file_filter is None:
+            return True
+        cutoff = file_filter.mtime_cutoff()
+        name_pattern = file_filter.name_pattern()
+        return (st.st_size >= file_filter.min_size_bytes and (cutoff is None or st.st_mtime <= cutoff)
+                and (name_pattern is None or name_pattern.match(os.path.basename(path)) is not None))
+
+
+def _combine(rule_filter: Optional[FileFilter], file_filter: Optional[FileFilter]) -> Optional[FileFilter]:
+    """Filter matching files that pass both a rule's filter and the scan-wide one."""
+    if rule_filter is None or file_filter is None:
+        return rule_filter or file_filter
+    return FileFilter(
+        min_size_bytes=max(rule_filter.min_size_bytes, file_filter.min_size_bytes),
+        min_age_days=max(rule_filter.min_age_days, file_filter.min_age_days),
+        patterns=rule_filter.patterns or tuple(file_filter.patterns)
+    )
 
 
 if __name__ == '__main__':
@@ -3,13 +3,20 @@ CloudCleaner - Cleaner Module
 Handles actual file deletion operations with safety checks.
 """
 
-from typing import List, Dict
+from typing import Callable, Iterable, List, Dict, Optional, Tuple
 from pathlib import Path
 import os
-import shutil
 import json
+import queue
+import threading
 import time
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
+
+from .deleter import DeletionReport, ParallelDeleter
+from .dir_sizer import DirSizer, disk_usage
+from .quarantine import Quarantine
+from .xdg_trash import HAS_XDG_TRASH, XdgTrash
+from .safety_rules import RuleSet
 
 try:
     from send2trash import send2trash
@@ -18,6 +25,10 @@ except ImportError:
     HAS_SEND2TRASH = False
 
 
+# Paths validated and deleted together by execute_stream
+CLEAN_BATCH_SIZE = 1000
+
+
 @dataclass
 class CleanupResult:
     """Result of a cleanup operation."""
@@ -27,6 +38,16 @@ class CleanupResult:
     freed_bytes: int
     errors: List[str]
     timestamp: str
+    freed_disk_bytes: int = 0  # Allocated bytes released, hardlinks counted once
+    entries_deleted: int = 0  # Files and directories removed, including inside deleted trees
+    entries_failed: int = 0  # Files and directories left behind
+    item_reports: List[Dict] = field(default_factory=list)  # DeletionReport.to_dict() per path
+    cleaned_paths: List[str] = field(default_factory=list)  # Paths removed (or moved away) in full
+    quarantine_batch: str = ''  # Quarantine batch to link to the cleanup record (quarantine mode)
+    # Quarantined, not freed: the known size of what was held (files, and
+    # directories with a matching scan size); purging frees it later
+    held_bytes: int = 0
+    held_disk_bytes: int = 0
 
     def to_dict(self) -> dict:
         return asdict(self)
@@ -35,15 +56,30 @@ class CleanupResult:
 class Cleaner:
     """Handles actual file/directory deletion operations."""
 
-    def __init__(self, use_trash: bool = True):
+    def __init__(self, use_trash: bool = True, sizer: DirSizer = None,
+                 exclusions: Optional[List[str]] = None, max_workers: Optional[int] = None,
+                 scan_sizes: Optional[Dict[str, Dict]] = None, quarantine: Optional[Quarantine] = None):
         """
         Initialize cleaner.
         
         Args:
             use_trash: If True, move files to trash instead of permanent delete
+            sizer: Shared directory sizing engine (created if not given); give
+                it the scan index so only changed directories are re-listed
+            exclusions: User exclusion paths/globs; matching paths are refused
+            max_workers: Deletion threads (tuned to the device if not given)
+            scan_sizes: Sizes a scan recorded, by path (Database.get_scan_items);
+                trusted while the path's inode and mtime are unchanged
+            quarantine: If given, paths are renamed into it instead of deleted
+                (takes precedence over use_trash)
         """
-        self.use_trash = use_trash and HAS_SEND2TRASH
+        self.use_trash = use_trash and (HAS_XDG_TRASH or HAS_SEND2TRASH)
         self.backup_log: List[Dict] = []
+        self.sizer = sizer or DirSizer()
+        self.rules = RuleSet(exclusions=exclusions)
+        self.deleter = ParallelDeleter(max_workers)
+        self.scan_sizes = scan_sizes or {}
+        self.quarantine = quarantine
 
     def preview(self, paths: List[str]) -> Dict:
         """
@@ -56,24 +92,29 @@ class Cleaner:
             Dict with estimated space recovery and item counts
         """
         total_size = 0
+        total_disk_size = 0
         valid_paths = []
         warnings = []
 
+        paths, refused = self.rules.partition_excluded(paths)
+        for path, reason in refused:
+            warnings.append(f"Skipping {path}: {reason}")
+
         for path in paths:
             if not os.path.exists(path):
                 continue
                 
             try:
-                if os.path.isdir(path):
-                    size = self._get_dir_size(path)
-                else:
-                    size = os.path.getsize(path)
+                size, disk_size, cached = self._measure(path)
                 
                 total_size += size
+                total_disk_size += disk_size
                 valid_paths.append({
                     'path': path,
                     'size': size,
-                    'type': 'directory' if os.path.isdir(path) else 'file'
+                    'disk_size': disk_size,
+                    'type': 'directory' if os.path.isdir(path) else 'file',
+                    'from_scan': cached
                 })
             except (PermissionError, OSError) as e:
                 warnings.append(f"Cannot access {path}: {str(e)}")
@@ -81,58 +122,292 @@ class Cleaner:
         return {
             'items_to_delete': len(valid_paths),
             'estimated_size_bytes': total_size,
+            'estimated_disk_bytes': total_disk_size,
             'paths': valid_paths,
             'warnings': warnings,
-            'use_trash': self.use_trash
+            'use_trash': self.use_trash,
+            'quarantine': self.quarantine is not None
         }
 
-    def execute(self, paths: List[str], create_backup_log: bool = True) -> CleanupResult:
+    def execute(self, paths: List[str], create_backup_log: bool = True,
+                on_progress: Optional[Callable[[List[DeletionReport]], None]] = None,
+                on_copy_progress: Optional[Callable[[str, int, int], None]] = None) -> CleanupResult:
         """
         Perform actual cleanup.
         
         Args:
             paths: List of paths to delete
             create_backup_log: Whether to log deleted items for reference
+            on_progress: Called periodically with per-path DeletionReports
+                while permanent deletion runs
+            on_copy_progress: Called with (path, bytes copied, bytes total)
+                while a path that cannot be renamed into a trash is copied there
             
         Returns:
             CleanupResult with success/failure counts
         """
+        paths, errors = self._validate(paths)
+        return self._run(paths, errors, create_backup_log, on_progress, on_copy_progress)
+
+    def execute_stream(self, paths: Iterable[str], batch_size: int = CLEAN_BATCH_SIZE,
+                       create_backup_log: bool = True,
+                       on_batch: Optional[Callable[[int, CleanupResult, CleanupResult], None]] = None,
+                       on_progress: Optional[Callable[[List[DeletionReport]], None]] = None,
+                       on_copy_progress: Optional[Callable[[str, int, int], None]] = None) -> CleanupResult:
+        """
+        Clean up paths as they arrive, in pipelined batches.
+
+        A reader thread takes batch_size paths at a time from the iterable
+        and validates them while the previous batch is being deleted, so
+        deletion starts after the first batch and the whole selection is
+        never held at once. Per-path item_reports and cleaned_paths are not
+        kept across batches; on_batch sees each batch's result.
+
+        Args:
+            paths: Paths to delete, e.g. read line by line from a file; a
+                ValueError or OSError raised by it ends the input early
+            batch_size: Paths per batch
+            create_backup_log: Whether to log deleted items for reference
+            on_batch: Called with (batch number, batch result, running total) after each batch
+            on_progress: As for execute(), within each batch
+            on_copy_progress: As for execute()
+
+        Returns:
+            CleanupResult totalled over all batches
+        """
+        batches: 'queue.Queue' = queue.Queue(maxsize=2)
+        reader_error: List[Exception] = []
+
+        def read():
+            batch = []
+            try:
+                for path in paths:
+                    batch.append(path)
+                    if len(batch) >= batch_size:
+                        batches.put(self._validate(batch))
+                        batch = []
+            except (ValueError, OSError) as e:
+                # Paths already read are still cleaned; the rest is reported unread
+                reader_error.append(e)
+            finally:
+                if batch:
+                    batches.put(self._validate(batch))
+                batches.put(None)
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        total = CleanupResult(success=True, items_deleted=0, items_failed=0, freed_bytes=0, errors=[],
+                              timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'))
+        number = 0
+        while True:
+            validated = batches.get()
+            if validated is None:
+                break
+            number += 1
+            result = self._run(*validated, create_backup_log, on_progress, on_copy_progress,
+                               total.quarantine_batch)
+            total.items_deleted += result.items_deleted
+            total.items_failed += result.items_failed
+            total.freed_bytes += result.freed_bytes
+            total.freed_disk_bytes += result.freed_disk_bytes
+            total.held_bytes += result.held_bytes
+            total.held_disk_bytes += result.held_disk_bytes
+            total.entries_deleted += result.entries_deleted
+            total.entries_failed += result.entries_failed
+            total.errors.extend(result.errors)
+            total.quarantine_batch = total.quarantine_batch or result.quarantine_batch
+            total.success = total.items_failed == 0
+            if on_batch:
+                on_batch(number, result, total)
+        reader.join()
+        if reader_error:
+            total.errors.append(f"Stopped reading paths: {reader_error[0]}")
+            total.success = False
+        total.timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+        return total
+
+    def _validate(self, paths: List[str]) -> Tuple[List[str], List[str]]:
+        """Drop refused and missing paths; returns (paths to clean, refusal errors)."""
+        paths, refused = self.rules.partition_excluded(paths)
+        errors = [f"Refused {path}: {reason}" for path, reason in refused]
+        return [path for path in paths if os.path.exists(path)], errors
+
+    def _run(self, paths: List[str], errors: List[str], create_backup_log: bool,
+             on_progress: Optional[Callable[[List[DeletionReport]], None]],
+             on_copy_progress: Optional[Callable[[str, int, int], None]],
+             quarantine_batch: str = '') -> CleanupResult:
+        """Clean validated paths with the configured backend."""
+        if self.quarantine is not None:
+            result = self._hold(paths, create_backup_log, quarantine_batch)
+        elif self.use_trash and HAS_XDG_TRASH:
+            result = self._trash_batch(paths, create_backup_log, on_copy_progress)
+        elif self.use_trash:
+            result = self._trash(paths, create_backup_log)
+        else:
+            result = self._delete(paths, create_backup_log, on_progress)
+        result.items_failed += len(errors)
+        result.errors[:0] = errors
+        result.success = result.items_failed == 0
+        return result
+
+    def _delete(self, paths: List[str], create_backup_log: bool,
+                on_progress: Optional[Callable[[List[DeletionReport]], None]]) -> CleanupResult:
+        """Delete permanently in one parallel pass, counting bytes as files are unlinked."""
+        reports = self.deleter.delete(paths, on_progress)
+        errors = []
+        for report in reports:
+            if create_backup_log and (report.removed or report.files_deleted):
+                self.backup_log.append({
+                    'path': report.path,
+                    'size_bytes': report.freed_bytes,
+                    'disk_size_bytes': report.freed_disk_bytes,
+                    'deleted_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'type': 'directory' if report.is_dir else 'file',
+                    'partial': not report.removed
+                })
+            if report.removed:
+                continue
+            failed_path, error = report.failures[0]
+            if failed_path == report.path:
+                errors.append(f"Error deleting {report.path}: {error}")
+            else:
+                errors.append(f"Partially deleted {report.path}: {len(report.failures)} entries left"
+                              f" ({failed_path}: {error})")
+
+        items_failed = sum(1 for report in reports if not report.removed)
+        return CleanupResult(
+            success=items_failed == 0,
+            items_deleted=len(reports) - items_failed,
+            items_failed=items_failed,
+            freed_bytes=sum(report.freed_bytes for report in reports),
+            errors=errors,
+            timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'),
+            freed_disk_bytes=sum(report.freed_disk_bytes for report in reports),
+            entries_deleted=sum(report.files_deleted + report.dirs_removed for report in reports),
+            entries_failed=sum(len(report.failures) for report in reports),
+            item_reports=[report.to_dict() for report in reports],
+            cleaned_paths=[report.path for report in reports if report.removed]
+        )
+
+    def _hold(self, paths: List[str], create_backup_log: bool, batch: str = '') -> CleanupResult:
+        """
+        Rename paths into the quarantine (adding to batch if given).
+
+        Nothing is walked first: a directory's size is only taken from the
+        scan when its fingerprint still matches, and is otherwise left for
+        the purger to measure. Nothing is freed until the purge either.
+        """
+        items = []
+        errors = []
+        for path in paths:
+            try:
+                known = self._recorded_size(path)
+            except OSError as e:
+                errors.append(f"Cannot access {path}: {str(e)}")
+                continue
+            size, disk_size = known[:2] if known else (None, None)
+            items.append((path, size, disk_size))
+
+        held = self.quarantine.hold(items, batch or None)
+        moved = set(held.moved)
+        errors.extend(f"Error quarantining {path}: {reason}" for path, reason in held.errors)
+        deleted = [(path, size, disk_size) for path, size, disk_size in items if os.path.abspath(path) in moved]
+        if create_backup_log:
+            for path, size, disk_size in deleted:
+                self.backup_log.append({
+                    'path': path,
+                    'size_bytes': size,
+                    'disk_size_bytes': disk_size,
+                    'deleted_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'quarantined': True
+                })
+
+        items_failed = len(paths) - len(deleted)
+        return CleanupResult(
+            success=items_failed == 0,
+            items_deleted=len(deleted),
+            items_failed=items_failed,
+            freed_bytes=0,
+            errors=errors,
+            timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'),
+            entries_deleted=len(deleted),
+            entries_failed=items_failed,
+            quarantine_batch=held.batch,
+            cleaned_paths=[path for path, _, _ in deleted],
+            held_bytes=sum(size or 0 for _, size, _ in deleted),
+            held_disk_bytes=sum(disk_size or 0 for _, _, disk_size in deleted)
+        )
+
+    def _trash_batch(self, paths: List[str], create_backup_log: bool,
+                     on_copy_progress: Optional[Callable[[str, int, int], None]]) -> CleanupResult:
+        """Move paths to the freedesktop trash in one batch, measured beforehand."""
+        sizes = {}
+        errors = []
+        for path in paths:
+            try:
+                size, disk_size, _ = self._measure(path)
+            except OSError as e:
+                errors.append(f"Cannot access {path}: {str(e)}")
+                continue
+            sizes[os.path.abspath(path)] = (path, size, disk_size, os.path.isdir(path))
+
+        trashed = XdgTrash().trash(list(sizes), on_copy_progress)
+        errors.extend(f"Error moving {path} to trash: {reason}" for path, reason in trashed.errors)
+        deleted = [sizes[path] for path in trashed.trashed + trashed.copied]
+        if create_backup_log:
+            for path, size, disk_size, is_dir in deleted:
+                self.backup_log.append({
+                    'path': path,
+                    'size_bytes': size,
+                    'disk_size_bytes': disk_size,
+                    'deleted_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'type': 'directory' if is_dir else 'file'
+                })
+
+        items_failed = len(paths) - len(deleted)
+        return CleanupResult(
+            success=items_failed == 0,
+            items_deleted=len(deleted),
+            items_failed=items_failed,
+            freed_bytes=sum(size for _, size, _, _ in deleted),
+            errors=errors,
+            timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'),
+            freed_disk_bytes=sum(disk_size for _, _, disk_size, _ in deleted),
+            entries_deleted=len(deleted),
+            entries_failed=items_failed,
+            cleaned_paths=[path for path, _, _, _ in deleted]
+        )
+
+    def _trash(self, paths: List[str], create_backup_log: bool) -> CleanupResult:
+        """Move paths to the trash one at a time with send2trash, measured beforehand."""
         items_deleted = 0
         items_failed = 0
         freed_bytes = 0
+        freed_disk_bytes = 0
         errors = []
+        cleaned_paths = []
 
         for path in paths:
-            if not os.path.exists(path):
-                continue
-            
             try:
                 # Get size before deletion
-                if os.path.isdir(path):
-                    size = self._get_dir_size(path)
-                else:
-                    size = os.path.getsize(path)
+                size, disk_size, _ = self._measure(path)
 
                 # Log for backup/reference
                 if create_backup_log:
                     self.backup_log.append({
                         'path': path,
                         'size_bytes': size,
+                        'disk_size_bytes': disk_size,
                         'deleted_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
                         'type': 'directory' if os.path.isdir(path) else 'file'
                     })
 
-                # Perform deletion
-                if self.use_trash:
-                    send2trash(path)
-                else:
-                    if os.path.isdir(path):
-                        shutil.rmtree(path, ignore_errors=True)
-                    else:
-                        os.remove(path)
+                send2trash(path)
 
                 items_deleted += 1
                 freed_bytes += size
+                freed_disk_bytes += disk_size
+                cleaned_paths.append(path)
 
             except PermissionError as e:
                 items_failed += 1
@@ -150,7 +425,11 @@ class Cleaner:
             items_failed=items_failed,
             freed_bytes=freed_bytes,
             errors=errors,
-            timestamp=time.strftime('%Y-%m-%dT%H:%M:%S')
+            timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'),
+            freed_disk_bytes=freed_disk_bytes,
+            entries_deleted=items_deleted,
+            entries_failed=items_failed,
+            cleaned_paths=cleaned_paths
         )
 
     def get_backup_log(self) -> List[Dict]:
@@ -168,20 +447,33 @@ class Cleaner:
 
     def _get_dir_size(self, path: str) -> int:
         """Calculate total size of a directory."""
-        total = 0
-        try:
-            for entry in os.scandir(path):
-                try:
-                    if entry.is_file(follow_symlinks=False):
-                        total += entry.stat().st_size
-                    elif entry.is_dir(follow_symlinks=False):
-                        total += self._get_dir_size(entry.path)
-                except (PermissionError, OSError):
-                    continue
-        except (PermissionError, OSError):
-            pass
-        return total
+        return self.sizer.get_size(path)
+
+    def _measure(self, path: str) -> Tuple[int, int, bool]:
+        """
+        Return (apparent, on-disk) size of a file or directory, and whether it came from the scan.
+
+        A directory the scan recorded keeps its scan-time size while its own
+        inode and mtime match; that fingerprint covers its direct entries,
+        so changes deeper down are only seen by the freed counts of the
+        deletion itself. Other directories are walked, through the sizer's
+        index when it has one.
+        """
+        known = self._recorded_size(path)
+        if known is not None:
+            return known
+        sized = self.sizer.measure([path])[path]
+        return sized.size_bytes, sized.disk_bytes, False
 
+    def _recorded_size(self, path: str) -> Optional[Tuple[int, int, bool]]:
+        """Size of a file, or of a directory the scan recorded unchanged, without a walk; None otherwise."""
+        st = os.stat(path)
+        if not os.path.isdir(path):
+            return st.st_size, disk_usage(st), False
+        record = self.scan_sizes.get(path)
+        if record is not None and (record['inode'], record['mtime_ns']) == (st.st_ino, st.st_mtime_ns):
+            return record['size_bytes'], record['disk_bytes'], True
+        return None
 
 if __name__ == '__main__':
     # Quick test (dry run)
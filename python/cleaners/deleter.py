@@ -0,0 +1,280 @@
+"""
+CloudCleaner - Deleter Module
+Parallel, single-pass deletion of files and directory trees with exact accounting.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from stat import S_ISDIR
+import errno
+import os
+import queue
+import threading
+
+from .devices import default_worker_count
+from .dir_sizer import disk_usage
+from .fd_walk import HAS_FD_WALK, open_dir
+
+
+# How often on_progress is called while trees are being deleted, in seconds
+PROGRESS_INTERVAL = 0.25
+
+
+@dataclass
+class DeletionReport:
+    """Outcome of deleting one requested path."""
+    path: str
+    removed: bool = False  # The path itself is gone
+    is_dir: bool = False
+    files_deleted: int = 0
+    dirs_removed: int = 0
+    freed_bytes: int = 0  # Apparent size of unlinked files, hardlinks counted once
+    freed_disk_bytes: int = 0  # Allocated bytes released; a hardlinked file's only with its last link
+    failures: List[Tuple[str, str]] = field(default_factory=list)  # (path, error) of entries left behind
+
+    def to_dict(self) -> dict:
+        return {
+            'path': self.path,
+            'removed': self.removed,
+            'is_dir': self.is_dir,
+            'files_deleted': self.files_deleted,
+            'dirs_removed': self.dirs_removed,
+            'freed_bytes': self.freed_bytes,
+            'freed_disk_bytes': self.freed_disk_bytes,
+            'failed': len(self.failures),
+            'failures': [{'path': path, 'error': error} for path, error in self.failures]
+        }
+
+
+class _Dir:
+    """A directory being emptied; removed once its listing and all subdirectories are done."""
+
+    __slots__ = ('path', 'parent', 'report', 'identity', 'pending', 'blocked')
+
+    def __init__(self, path: str, parent: Optional['_Dir'], report: DeletionReport,
+                 identity: Tuple[int, int]):
+        self.path = path
+        self.parent = parent
+        self.report = report
+        # (st_dev, st_ino) seen when the parent was listed
+        self.identity = identity
+        # Its own listing plus each subdirectory not yet removed
+        self.pending = 1
+        # Something below could not be deleted, so rmdir would fail anyway
+        self.blocked = False
+
+
+class ParallelDeleter:
+    """
+    Deletes paths with a pool of threads, each tree in a single walk.
+
+    Workers take directories from a shared queue, list each one through a
+    descriptor and unlink its files on the spot, counting their sizes from
+    the listing's lstat; subdirectories go back on the queue. A directory is
+    removed as soon as its own listing and every subdirectory are finished,
+    so trees disappear bottom-up without a second pass, and no sizing walk
+    is needed beforehand.
+
+    A subdirectory is opened by path and its (st_dev, st_ino) compared with
+    what its parent's listing saw, so a directory swapped for a symlink
+    mid-delete is refused instead of followed. Failures never stop the rest
+    of a tree; they are collected per requested path.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Initialize deleter.
+
+        Args:
+            max_workers: Thread count; defaults to a value tuned to the
+                device of the first path
+        """
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._queue: 'queue.Queue[Optional[_Dir]]' = queue.Queue()
+        self._roots_left = 0
+        self._done = threading.Event()
+        # Links not yet unlinked of multiply-linked inodes already counted
+        self._links: Dict[Tuple[int, int], int] = {}
+
+    def delete(self, paths: List[str],
+               on_progress: Optional[Callable[[List[DeletionReport]], None]] = None) -> List[DeletionReport]:
+        """
+        Delete files and directory trees.
+
+        Args:
+            paths: Paths to delete; a path that does not exist is reported as not removed
+            on_progress: Called periodically with the reports so far while trees are deleted
+
+        Returns:
+            One DeletionReport per path, in the order given
+        """
+        reports = [DeletionReport(path=path) for path in paths]
+        self._links = {}
+        trees = []
+        for report in reports:
+            try:
+                st = os.lstat(report.path)
+            except OSError as e:
+                report.failures.append((report.path, e.strerror or str(e)))
+                continue
+            report.is_dir = S_ISDIR(st.st_mode)
+            if report.is_dir:
+                trees.append(_Dir(report.path, None, report, (st.st_dev, st.st_ino)))
+            else:
+                try:
+                    os.unlink(report.path)
+                except OSError as e:
+                    report.failures.append((report.path, e.strerror or str(e)))
+                    continue
+                report.removed = True
+                self._count_file(report, st)
+        if not trees:
+            return reports
+
+        self._roots_left = len(trees)
+        self._done.clear()
+        for tree in trees:
+            self._queue.put(tree)
+        workers = self.max_workers or default_worker_count(trees[0].path)
+        threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        while not self._done.wait(PROGRESS_INTERVAL):
+            if on_progress:
+                on_progress(reports)
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+        if on_progress:
+            on_progress(reports)
+        return reports
+
+    def _worker(self):
+        while True:
+            directory = self._queue.get()
+            if directory is None:
+                return
+            self._empty(directory)
+
+    def _empty(self, directory: _Dir):
+        """Unlink a directory's files and queue its subdirectories."""
+        report = directory.report
+        files = 0
+        freed = 0
+        freed_disk = 0
+        failures: List[Tuple[str, str]] = []
+        subdirs: List[_Dir] = []
+        fd = None
+        try:
+            if HAS_FD_WALK:
+                fd = open_dir(directory.path)
+                st = os.fstat(fd)
+            else:
+                st = os.lstat(directory.path)
+            # Windows listings report no inode; nothing to compare there
+            if directory.identity[1] and (st.st_dev, st.st_ino) != directory.identity:
+                raise OSError(errno.EBUSY, 'Directory was replaced during deletion', directory.path)
+            with os.scandir(fd if fd is not None else directory.path) as entries:
+                for entry in entries:
+                    child = os.path.join(directory.path, entry.name)
+                    try:
+                        entry_st = entry.stat(follow_symlinks=False)
+                        if S_ISDIR(entry_st.st_mode):
+                            subdirs.append(_Dir(child, directory, report, (entry_st.st_dev, entry_st.st_ino)))
+                            continue
+                        if fd is not None:
+                            os.unlink(entry.name, dir_fd=fd)
+                        else:
+                            os.unlink(child)
+                    except OSError as e:
+                        failures.append((child, e.strerror or str(e)))
+                        continue
+                    files += 1
+                    size, disk_size = self._freed(entry_st)
+                    freed += size
+                    freed_disk += disk_size
+        except OSError as e:
+            failures.append((directory.path, e.strerror or str(e)))
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+        with self._lock:
+            report.files_deleted += files
+            report.freed_bytes += freed
+            report.freed_disk_bytes += freed_disk
+            report.failures.extend(failures)
+            if failures:
+                directory.blocked = True
+            directory.pending += len(subdirs)
+        for subdir in subdirs:
+            self._queue.put(subdir)
+        self._finish(directory)
+
+    def _finish(self, directory: Optional[_Dir]):
+        """Count one piece of a directory's work done; remove it and climb when nothing is left."""
+        while directory is not None:
+            with self._lock:
+                directory.pending -= 1
+                if directory.pending:
+                    return
+            removed = False
+            if not directory.blocked:
+                try:
+                    os.rmdir(directory.path)
+                    removed = True
+                except OSError as e:
+                    with self._lock:
+                        directory.report.failures.append((directory.path, e.strerror or str(e)))
+            parent = directory.parent
+            with self._lock:
+                if removed:
+                    directory.report.dirs_removed += 1
+                if parent is None:
+                    directory.report.removed = removed
+                    self._roots_left -= 1
+                    if not self._roots_left:
+                        self._done.set()
+                elif not removed:
+                    parent.blocked = True
+            directory = parent
+
+    def _freed(self, st: os.stat_result) -> Tuple[int, int]:
+        """
+        Bytes released by unlinking one file.
+
+        The apparent size of a multiply-linked inode counts at its first
+        link; its disk blocks count once its last link is gone.
+        """
+        if not st.st_ino or (st.st_nlink < 2 and not self._links):
+            return st.st_size, disk_usage(st)
+        key = (st.st_dev, st.st_ino)
+        with self._lock:
+            remaining = self._links.get(key)
+            if remaining is None:
+                if st.st_nlink < 2:
+                    return st.st_size, disk_usage(st)
+                self._links[key] = st.st_nlink - 1
+                return st.st_size, 0
+            if remaining > 1:
+                self._links[key] = remaining - 1
+                return 0, 0
+            del self._links[key]
+            return 0, disk_usage(st)
+
+    def _count_file(self, report: DeletionReport, st: os.stat_result):
+        size, disk_size = self._freed(st)
+        report.files_deleted += 1
+        report.freed_bytes += size
+        report.freed_disk_bytes += disk_size
+
+
+if __name__ == '__main__':
+    # Quick test
+    import sys
+    import json
+    deleter = ParallelDeleter()
+    for report in deleter.delete(sys.argv[1:]):
+        print(json.dumps(report.to_dict(), indent=2))
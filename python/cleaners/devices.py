@@ -0,0 +1,183 @@
+"""
+CloudCleaner - Devices Module
+Mount table lookup and per-device concurrency tuning for directory walks.
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+import os
+import re
+
+
+# Upper bound on sizing threads per device; scandir releases the GIL but more
+# threads than this only add contention on the shared work queue.
+MAX_WORKERS = 32
+
+# Spinning disks serve one seek at a time; a second worker only hides
+# the CPU time between reads
+HDD_WORKERS = 2
+
+# Network filesystems are latency-bound, so parallel requests hide round trips
+NETWORK_WORKERS = 16
+
+MEMORY_FS_TYPES = {'tmpfs', 'ramfs', 'devtmpfs'}
+NETWORK_FS_TYPES = {
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ceph', 'glusterfs', '9p', 'afs',
+    'lustre', 'beegfs', 'davfs', 'fuse.sshfs', 'fuse.rclone', 'fuse.s3fs', 'fuse.gcsfuse',
+}
+
+
+class MountInfo(NamedTuple):
+    """One entry of the mount table."""
+    mount_point: str
+    fs_type: str
+    source: str
+
+
+def read_mounts() -> Optional[Dict[str, MountInfo]]:
+    """
+    Read the mount table, keyed by mount point (Linux only).
+
+    Returns:
+        Dict of mount point to MountInfo, or None where no mount table is available
+    """
+    try:
+        with open('/proc/self/mountinfo', 'r', encoding='utf-8', errors='surrogateescape') as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    mounts: Dict[str, MountInfo] = {}
+    for line in lines:
+        # id parent major:minor root mount_point options [optional...] - fs_type source super_options
+        fields = line.split()
+        try:
+            separator = fields.index('-')
+            mount_point = _unescape(fields[4])
+            mounts[mount_point] = MountInfo(mount_point, fields[separator + 1], _unescape(fields[separator + 2]))
+        except (ValueError, IndexError):
+            continue
+    return mounts
+
+
+def _unescape(field: str) -> str:
+    """Decode the octal escapes (\\040 for space etc.) used in mountinfo."""
+    return re.sub(r'\\([0-7]{3})', lambda match: chr(int(match.group(1), 8)), field)
+
+
+def mount_of(path: str, mounts: Dict[str, MountInfo]) -> Optional[MountInfo]:
+    """Find the mount a normalized absolute path lives on."""
+    while True:
+        if path in mounts:
+            return mounts[path]
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def mounts_below(path: str, mounts: Dict[str, MountInfo]) -> List[str]:
+    """Mount points strictly inside a normalized absolute path."""
+    prefix = path.rstrip(os.sep) + os.sep
+    return [mount_point for mount_point in mounts if mount_point.startswith(prefix)]
+
+
+def device_root(path: str) -> str:
+    """Topmost ancestor of a path on the same filesystem (its mount point), found by st_dev alone."""
+    path = os.path.dirname(os.path.abspath(path))
+    try:
+        device = os.stat(path).st_dev
+    except OSError:
+        return path
+    while True:
+        parent = os.path.dirname(path)
+        if parent == path:
+            return path
+        try:
+            if os.stat(parent).st_dev != device:
+                return path
+        except OSError:
+            return path
+        path = parent
+
+
+def _block_attribute(st_dev: int, name: str, source: str = '') -> Optional[str]:
+    """Read a queue attribute of the block device behind st_dev (Linux only)."""
+    candidates = []
+    try:
+        candidates.append(os.path.realpath(f'/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}'))
+    except (AttributeError, ValueError, OSError):
+        pass
+    if source.startswith('/dev/'):
+        # Anonymous devices (btrfs subvolumes, some fuse mounts) only name their source
+        candidates.append(os.path.realpath(f'/sys/class/block/{os.path.basename(os.path.realpath(source))}'))
+
+    for dev_dir in candidates:
+        # Partitions have no queue directory of their own; use the parent disk's
+        for candidate in (dev_dir, os.path.dirname(dev_dir)):
+            try:
+                with open(os.path.join(candidate, 'queue', name), 'r') as f:
+                    return f.read().strip()
+            except OSError:
+                continue
+    return None
+
+
+def _device_queue_depth(path: str) -> Optional[int]:
+    """Read the block device request queue depth backing a path (Linux only)."""
+    try:
+        depth = _block_attribute(os.stat(path).st_dev, 'nr_requests')
+        return int(depth) if depth else None
+    except (OSError, ValueError):
+        return None
+
+
+def default_worker_count(path: Optional[str] = None) -> int:
+    """
+    Pick a thread count from core count and device queue depth.
+
+    Args:
+        path: A path on the device to be walked, used to look up queue depth
+
+    Returns:
+        Number of sizing threads to run
+    """
+    workers = min(MAX_WORKERS, (os.cpu_count() or 1) * 4)
+    if path:
+        depth = _device_queue_depth(path)
+        if depth:
+            workers = min(workers, depth)
+    return max(2, workers)
+
+
+def device_kind(path: str, st_dev: int, mounts: Optional[Dict[str, MountInfo]]) -> str:
+    """
+    Classify the device a path lives on.
+
+    Returns:
+        'memory', 'network', 'ssd', 'hdd' or 'unknown'
+    """
+    mount = mount_of(path, mounts) if mounts else None
+    if mount is not None:
+        if mount.fs_type in MEMORY_FS_TYPES:
+            return 'memory'
+        if mount.fs_type in NETWORK_FS_TYPES:
+            return 'network'
+    rotational = _block_attribute(st_dev, 'rotational', mount.source if mount else '')
+    if rotational == '1':
+        return 'hdd'
+    if rotational == '0':
+        return 'ssd'
+    return 'unknown'
+
+
+def device_concurrency(kind: str, path: str) -> int:
+    """Worker count suited to a device of the given kind."""
+    cpus = os.cpu_count() or 1
+    if kind == 'memory':
+        # Pure CPU work under the GIL; more threads than cores only contend
+        return max(2, min(8, cpus))
+    if kind == 'hdd':
+        return HDD_WORKERS
+    if kind == 'network':
+        return NETWORK_WORKERS
+    return default_worker_count(path)
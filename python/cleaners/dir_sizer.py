@@ -0,0 +1,903 @@
+"""
+CloudCleaner - Directory Sizer Module
+Parallel, iterative directory size calculation shared by the scanner and cleaner.
+"""
+
+from typing import List, Dict, Optional, Iterator, Tuple, Union, NamedTuple
+from dataclasses import dataclass, asdict
+import fnmatch
+import math
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+from .scan_index import ScanIndex, DirRecord
+from .path_matcher import PathMatcher
+from .io_throttle import IOThrottle
+from .fd_walk import scan_dir
+from .devices import MountInfo, device_concurrency, device_kind, mounts_below, read_mounts
+
+
+# Bound on walk events waiting for the consumer; workers block beyond this,
+# so file-granular walks hold a fixed number of matches in memory.
+MAX_PENDING_EVENTS = 10000
+
+# Share of a time budget spent walking exactly; the rest samples what is left
+BUDGET_WALK_SHARE = 0.75
+
+# Random descents per unfinished root when estimating its unwalked part
+MAX_PROBES = 256
+
+# Normal quantile for the reported confidence interval (~95%)
+CONFIDENCE_Z = 1.96
+
+# Seconds between checks of a cancel event while waiting on the walk
+CANCEL_POLL_INTERVAL = 0.1
+
+
+def disk_usage(st: os.stat_result) -> int:
+    """
+    Bytes a file actually occupies on disk.
+
+    Uses allocated 512-byte blocks where the platform reports them, so sparse
+    files count their holes as free and small files count a whole block.
+    Falls back to the apparent size elsewhere (e.g. Windows).
+    """
+    blocks = getattr(st, 'st_blocks', None)
+    return blocks * 512 if blocks is not None else st.st_size
+
+
+def _is_below(path: str, root: str) -> bool:
+    """Check whether a path lies strictly inside root."""
+    return path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def _outermost(paths: List[str]) -> List[str]:
+    """Drop paths that lie inside another path of the list."""
+    path_set = set(paths)
+    outer = []
+    for path in paths:
+        parent = os.path.dirname(path)
+        while parent and parent not in path_set and parent != os.path.dirname(parent):
+            parent = os.path.dirname(parent)
+        if parent not in path_set:
+            outer.append(path)
+    return outer
+
+
+@dataclass
+class WalkProgress:
+    """Snapshot of a running walk."""
+    dirs_visited: int
+    dirs_pending: int
+    bytes_counted: int
+    roots_done: int
+    roots_total: int
+    elapsed_seconds: float
+    expected_bytes: int = 0  # Previous total from the scan index, 0 if unknown
+
+    @property
+    def fraction_done(self) -> float:
+        """Best estimate of completed work in [0, 1)."""
+        if self.expected_bytes > 0:
+            fraction = self.bytes_counted / self.expected_bytes
+        elif self.dirs_visited:
+            fraction = self.dirs_visited / (self.dirs_visited + self.dirs_pending)
+        else:
+            fraction = 0.0
+        return min(fraction, 0.99)
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated time remaining, None until enough work has been seen."""
+        fraction = self.fraction_done
+        if fraction <= 0:
+            return None
+        return round(self.elapsed_seconds * (1 - fraction) / fraction, 1)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data['percent'] = round(self.fraction_done * 100, 1)
+        data['eta_seconds'] = self.eta_seconds
+        return data
+
+
+@dataclass
+class RootSized:
+    """A walk root whose whole subtree has been sized."""
+    path: str
+    size_bytes: int  # Apparent size (st_size)
+    disk_bytes: int = 0  # Allocated size (st_blocks * 512)
+    estimated: bool = False  # Part of the subtree was extrapolated, not walked
+    margin_bytes: int = 0  # Half-width of the ~95% confidence interval of size_bytes
+    inode: int = 0  # Root's inode and mtime when it was sized, 0 if unknown
+    mtime_ns: int = 0
+
+
+@dataclass
+class WalkCheckpoint:
+    """
+    Resumable state of a cancelled walk.
+
+    Hardlinks already counted are not recorded, so a file linked from both
+    sides of the cut may be counted twice after resuming.
+    """
+    done: List[str]  # Roots fully sized and already yielded
+    partial: Dict[str, Tuple[int, int]]  # Root -> (apparent, on-disk) bytes counted so far
+    frontier: List[Tuple[str, str]]  # (root, directory) pairs still to walk
+
+    def to_dict(self) -> dict:
+        return {
+            'done': self.done,
+            'partial': {root: list(sizes) for root, sizes in self.partial.items()},
+            'frontier': [list(job) for job in self.frontier]
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'WalkCheckpoint':
+        return cls(
+            done=list(data.get('done', [])),
+            partial={root: tuple(sizes) for root, sizes in data.get('partial', {}).items()},
+            frontier=[tuple(job) for job in data.get('frontier', [])]
+        )
+
+
+class FileMatch(NamedTuple):
+    """A file that passed the walk's FileFilter (a plain tuple, cheap to create)."""
+    path: str
+    size_bytes: int
+    mtime: float
+    root: str
+    disk_bytes: int = 0
+
+
+@dataclass
+class FileFilter:
+    """
+    Per-file criteria evaluated inside the walk.
+
+    min_size_bytes is read live by the workers, so a consumer may raise it
+    mid-walk (e.g. to the smallest entry of a top-N heap) to stop receiving
+    files that can no longer qualify.
+    """
+    min_size_bytes: int = 0
+    min_age_days: float = 0
+    patterns: Tuple[str, ...] = ()  # Glob patterns on the file name; any may match
+
+    def mtime_cutoff(self) -> Optional[float]:
+        """Latest modification time a file may have to match, or None."""
+        if self.min_age_days <= 0:
+            return None
+        return time.time() - self.min_age_days * 86400
+
+    def name_pattern(self) -> Optional['re.Pattern']:
+        """All name patterns compiled into one regular expression, or None."""
+        if not self.patterns:
+            return None
+        flags = re.IGNORECASE if os.name == 'nt' else 0
+        return re.compile('|'.join(fnmatch.translate(pattern) for pattern in self.patterns), flags)
+
+
+class _DevicePlan:
+    """
+    Worker pools and mount boundaries of one walk.
+
+    Every device (st_dev) under the walk gets its own queue and its own
+    pool of workers, sized for the device type, so a slow disk cannot stall
+    the threads serving a fast one. Mount points below the roots are either
+    boundaries that are never crossed, or (cross_mounts) entry points into
+    the pool of the device mounted there.
+    """
+
+    def __init__(self, paths: List[str], cross_mounts: bool = False, max_workers: Optional[int] = None):
+        self.cross_mounts = cross_mounts
+        self.mounts: Optional[Dict[str, MountInfo]] = read_mounts()
+        self.kinds: Dict[int, str] = {}
+        self.pools: Dict[int, int] = {}
+        self.root_devs: List[int] = []
+        # (st_ino, st_mtime_ns) of each root before the walk, (0, 0) if unreadable
+        self.root_ids: List[Tuple[int, int]] = []
+        # Mount points below the roots; with cross_mounts, mapped to their device
+        self.mount_devs: Dict[str, int] = {}
+        self.boundaries = set()
+        # Without a mount table, mount points are found by comparing st_dev
+        self.compare_devs = self.mounts is None and not cross_mounts and os.name == 'posix'
+
+        for path in paths:
+            try:
+                st = os.stat(path)
+                dev = st.st_dev
+                self.root_ids.append((st.st_ino, st.st_mtime_ns))
+            except (PermissionError, OSError):
+                dev = -1  # Unreadable; its walk ends at the first scandir
+                self.root_ids.append((0, 0))
+            self.root_devs.append(dev)
+            self._add_pool(dev, path, max_workers)
+            if self.mounts:
+                for mount_point in mounts_below(path, self.mounts):
+                    if not cross_mounts:
+                        self.boundaries.add(mount_point)
+                    elif mount_point not in self.mount_devs:
+                        mount_dev = self._device(mount_point)
+                        self.mount_devs[mount_point] = mount_dev
+                        self._add_pool(mount_dev, mount_point, max_workers)
+
+    @staticmethod
+    def _device(path: str) -> int:
+        try:
+            return os.stat(path).st_dev
+        except (PermissionError, OSError):
+            return -1  # Unreadable; its walk ends at the first scandir
+
+    def _add_pool(self, dev: int, path: str, max_workers: Optional[int]):
+        if dev in self.pools:
+            return
+        if dev == -1:
+            self.kinds[dev], self.pools[dev] = 'unknown', 1
+            return
+        self.kinds[dev] = device_kind(path, dev, self.mounts)
+        self.pools[dev] = max_workers or device_concurrency(self.kinds[dev], path)
+
+    def device_of(self, path: str, default: int) -> int:
+        """Device of a directory below a root, given the root's device."""
+        if not self.mount_devs:
+            return default
+        while True:
+            if path in self.mount_devs:
+                return self.mount_devs[path]
+            parent = os.path.dirname(path)
+            if parent == path:
+                return default
+            path = parent
+
+    def stay_on_device(self, children: List[str], dev: int) -> List[str]:
+        """Drop subdirectories that are mount points the walk must not enter."""
+        if self.boundaries:
+            return [child for child in children if child not in self.boundaries]
+        if self.compare_devs and dev != -1:
+            kept = []
+            for child in children:
+                try:
+                    if os.stat(child, follow_symlinks=False).st_dev == dev:
+                        kept.append(child)
+                except (PermissionError, OSError):
+                    continue
+            return kept
+        return children
+
+
+class _Walk:
+    """Shared state of one parallel walk."""
+
+    def __init__(self, paths: List[str], devices: _DevicePlan, cached: Optional[Dict[str, DirRecord]],
+                 exclusive: bool = False, exclude: Optional[PathMatcher] = None,
+                 file_filter: Optional[FileFilter] = None, resume: Optional[WalkCheckpoint] = None,
+                 throttle: Optional[IOThrottle] = None, root_filters: Optional[Dict[str, FileFilter]] = None):
+        self.paths = paths
+        self.throttle = throttle
+        self.cached = cached
+        self.exclude = exclude if exclude else None
+        # File filter of each root, with its cutoff and name pattern resolved once
+        self.filters = [(root_filters or {}).get(path, file_filter) for path in paths]
+        self.cutoffs = [flt.mtime_cutoff() if flt else None for flt in self.filters]
+        self.name_patterns = [flt.name_pattern() if flt else None for flt in self.filters]
+        # In exclusive mode a root nested in another is walked only as itself
+        self.roots = {path: index for index, path in enumerate(paths)} if exclusive else None
+        self.devices = devices
+        # One work queue per device, each served by its own pool of slots
+        self.queues: Dict[int, queue.Queue] = {dev: queue.Queue() for dev in devices.pools}
+        self.slot_devs = [dev for dev, count in devices.pools.items() for _ in range(count)]
+        workers = len(self.slot_devs)
+        # Finished root indexes and FileMatch tuples, in completion order
+        self.events: queue.Queue = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        # Directories queued or in flight per root; a root is done at zero
+        self.outstanding = [1] * len(paths)
+        self.pending = len(paths)
+        # Per-worker counters, merged on read to keep the hot loop lock-free
+        self.totals = [[0] * len(paths) for _ in range(workers)]
+        self.disk_totals = [[0] * len(paths) for _ in range(workers)]
+        # (st_dev, st_ino) of multiply-linked files already counted
+        self.links_seen = set()
+        self.links_lock = threading.Lock()
+        self.dedupe_links = True
+        # Jobs abandoned by a stop, still counted as outstanding
+        self.unvisited: List[Tuple[int, str]] = []
+        # File matches from walked directories that a stop kept from the consumer
+        self.undelivered: List[FileMatch] = []
+        self.dirs_visited = [0] * workers
+        self.visited: List[Dict[str, DirRecord]] = [{} for _ in range(workers)]
+        self.start_time = time.time()
+
+        if resume is None:
+            for index, path in enumerate(paths):
+                self.put(index, path, devices.root_devs[index])
+        else:
+            self._seed(resume)
+
+    def put(self, index: int, path: str, dev: int):
+        """Queue a directory on its device's pool."""
+        self.queues[dev].put((index, path))
+
+    def _seed(self, resume: WalkCheckpoint):
+        """Start from a checkpoint: restore partial totals and queue its frontier."""
+        index_of = {path: index for index, path in enumerate(self.paths)}
+        done = set(resume.done)
+        self.outstanding = [0] * len(self.paths)
+        for index, path in enumerate(self.paths):
+            if path in done:
+                continue
+            if path in resume.partial:
+                self.totals[0][index], self.disk_totals[0][index] = resume.partial[path]
+            else:
+                self.outstanding[index] = 1
+                self.put(index, path, self.devices.root_devs[index])
+        for root, path in resume.frontier:
+            index = index_of.get(root)
+            if index is not None and root not in done:
+                self.outstanding[index] += 1
+                self.put(index, path, self.devices.device_of(path, self.devices.root_devs[index]))
+        self.pending = sum(self.outstanding)
+        # Roots that finished during the cancel but were never reported
+        for index, path in enumerate(self.paths):
+            if path in resume.partial and self.outstanding[index] == 0:
+                self.events.put(index)
+
+    def finish_dir(self, index: int, children: List[str], dev: int):
+        """Account for a processed directory on device dev and queue its children."""
+        if self.roots:
+            children = [child for child in children if child not in self.roots]
+        children = self.devices.stay_on_device(children, dev)
+        with self.lock:
+            self.outstanding[index] += len(children) - 1
+            self.pending += len(children) - 1
+            done = self.outstanding[index] == 0
+        for child in children:
+            self.put(index, child, self.devices.device_of(child, dev))
+        if done:
+            self.events.put(index)
+
+    def first_link(self, st: os.stat_result) -> bool:
+        """Check a file is not a hardlink to an inode this walk already counted."""
+        # Windows may report inode 0; never treat those as hardlinks
+        if st.st_nlink < 2 or not st.st_ino or not self.dedupe_links:
+            return True
+        key = (st.st_dev, st.st_ino)
+        with self.links_lock:
+            if key in self.links_seen:
+                return False
+            self.links_seen.add(key)
+        return True
+
+    def emit(self, matches: List[FileMatch]):
+        """Hand file matches to the consumer, blocking while it catches up."""
+        for position, match in enumerate(matches):
+            if self.stopped.is_set():
+                # Their bytes are already counted; keep them for a checkpoint
+                self.undelivered.extend(matches[position:])
+                return
+            self.events.put(match)
+
+    def stop(self, threads: List[threading.Thread]):
+        """Abandon remaining work and wait for the workers to exit."""
+        self.stopped.set()
+        for dev in self.slot_devs:
+            self.queues[dev].put(None)
+        for thread in threads:
+            while thread.is_alive():
+                # Unblock workers waiting on a full event queue
+                self._drain_events()
+                thread.join(timeout=0.05)
+        self._drain_events()
+        # Directories queued but never picked up are part of the frontier too
+        for work in self.queues.values():
+            try:
+                while True:
+                    job = work.get_nowait()
+                    if job is not None:
+                        self.unvisited.append(job)
+            except queue.Empty:
+                pass
+
+    def _drain_events(self):
+        """Empty the event queue, setting aside file matches the consumer never got."""
+        try:
+            while True:
+                event = self.events.get_nowait()
+                if isinstance(event, FileMatch):
+                    self.undelivered.append(event)
+        except queue.Empty:
+            pass
+
+    def checkpoint(self, finished: set) -> WalkCheckpoint:
+        """Capture a stopped walk so it can be resumed later."""
+        return WalkCheckpoint(
+            done=[self.paths[index] for index in sorted(finished)],
+            partial={
+                path: (self.root_size(index), self.root_disk_size(index))
+                for index, path in enumerate(self.paths) if index not in finished
+            },
+            frontier=[(self.paths[index], path) for index, path in self.unvisited]
+        )
+
+    def root_size(self, index: int) -> int:
+        return sum(totals[index] for totals in self.totals)
+
+    def root_disk_size(self, index: int) -> int:
+        return sum(totals[index] for totals in self.disk_totals)
+
+    def sized(self, index: int) -> 'RootSized':
+        """A fully walked root, fingerprinted with its pre-walk inode and mtime."""
+        inode, mtime_ns = self.devices.root_ids[index]
+        return RootSized(self.paths[index], self.root_size(index), self.root_disk_size(index),
+                         inode=inode, mtime_ns=mtime_ns)
+
+    def progress(self, roots_done: int, expected_bytes: int) -> WalkProgress:
+        return WalkProgress(
+            dirs_visited=sum(self.dirs_visited),
+            dirs_pending=self.pending,
+            bytes_counted=sum(sum(totals) for totals in self.totals),
+            roots_done=roots_done,
+            roots_total=len(self.paths),
+            elapsed_seconds=round(time.time() - self.start_time, 2),
+            expected_bytes=expected_bytes
+        )
+
+
+class DirSizer:
+    """
+    Computes directory sizes with an explicit work queue and a thread pool.
+
+    Every directory is a job on the queue of the device it lives on, so
+    large subtrees are split across workers and deep trees never touch the
+    recursion limit. Each device has its own pool of workers.
+
+    Each file is counted twice: by apparent size (st_size) and by allocated
+    size on disk (st_blocks * 512). A file with several hardlinks inside one
+    walk is counted only at the first link reached.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, index: Optional[ScanIndex] = None,
+                 throttle: Optional[IOThrottle] = None, cross_mounts: bool = False, live: bool = True):
+        """
+        Initialize sizer.
+
+        Args:
+            max_workers: Thread count per device. Defaults to a value tuned to
+                the device type (see devices.device_concurrency).
+            index: Persistent directory index; when given, directories whose
+                (inode, mtime) are unchanged reuse their cached listing.
+            throttle: Paces directory reads for background scanning
+            cross_mounts: Descend into filesystems mounted below a walked
+                path. Off by default, so sizing a directory never walks a
+                network share or pseudo filesystem mounted inside it.
+            live: Answer paths a running watcher keeps current straight
+                from the index (see ScanIndex.is_live).
+        """
+        self.max_workers = max_workers
+        self.index = index
+        self.throttle = throttle
+        self.cross_mounts = cross_mounts
+        self.live = live
+
+    def get_size(self, path: str) -> int:
+        """Calculate total size of a single directory."""
+        return self.get_sizes([path]).get(path, 0)
+
+    def get_sizes(self, paths: List[str], exclusive: bool = False,
+                  exclude: Optional[PathMatcher] = None) -> Dict[str, int]:
+        """
+        Calculate total sizes of several directories in one parallel walk.
+
+        Args:
+            paths: Directories to size
+            exclusive: See iter_sizes
+            exclude: See iter_sizes
+
+        Returns:
+            Dict mapping each input path to its apparent size in bytes
+        """
+        return {path: sized.size_bytes for path, sized in self.measure(paths, exclusive, exclude).items()}
+
+    def measure(self, paths: List[str], exclusive: bool = False,
+                exclude: Optional[PathMatcher] = None) -> Dict[str, RootSized]:
+        """
+        Like get_sizes, but report both apparent and on-disk sizes.
+
+        Returns:
+            Dict mapping each input path to its RootSized
+        """
+        sizes = {
+            event.path: event
+            for event in self.iter_sizes(paths, exclusive=exclusive, exclude=exclude)
+            if isinstance(event, RootSized)
+        }
+        return {path: sizes[path] for path in dict.fromkeys(paths)}
+
+    def iter_sizes(self, paths: List[str], progress_interval: Optional[float] = None,
+                   exclusive: bool = False, exclude: Optional[PathMatcher] = None,
+                   file_filter: Optional[FileFilter] = None, time_budget: Optional[float] = None,
+                   cancel: Optional[threading.Event] = None, resume: Optional[WalkCheckpoint] = None,
+                   root_filters: Optional[Dict[str, FileFilter]] = None
+                   ) -> Iterator[Union[RootSized, WalkProgress, FileMatch, WalkCheckpoint]]:
+        """
+        Size several directories, yielding each one as soon as it completes.
+
+        Paths whose index totals a live watcher keeps current (see
+        ScanIndex.is_live) are answered from the index without a walk.
+
+        Args:
+            paths: Directories to size
+            progress_interval: If set, also yield a WalkProgress snapshot
+                whenever this many seconds pass without a root completing
+            exclusive: If True, paths nested inside other paths are walked
+                once and credited only to the deepest path, so every byte is
+                counted exactly once. Paths must be normalized (os.path.normpath).
+            exclude: Matcher of excluded paths. Entries it matches are neither
+                counted nor descended into, so an excluded directory costs a
+                single lookup. Directories no rule can reach skip the checks.
+            file_filter: If set, also yield a FileMatch for every file meeting
+                the filter, as the walk finds it. The index is bypassed since
+                it does not record individual files.
+            time_budget: If set, stop walking after most of this many seconds
+                and extrapolate the unwalked part of each unfinished root from
+                random descents (see _estimate). Such roots are yielded last,
+                marked estimated, and the index is not updated.
+            cancel: If this event gets set, workers stop between directories
+                and a WalkCheckpoint of the unfinished roots is yielded last.
+            resume: Checkpoint of an earlier cancelled walk over the same
+                paths; its finished roots are not yielded again. The index
+                is bypassed, as it only records complete walks.
+            root_filters: File filters for individual paths, replacing
+                file_filter under them. Roots without a filter of either
+                kind are sized whole and still use the index.
+
+        Yields:
+            RootSized per input path, interleaved with WalkProgress snapshots
+            and FileMatch tuples, and a final WalkCheckpoint if cancelled
+        """
+        paths = list(dict.fromkeys(paths))
+        if self.index and self.live and not file_filter and not resume:
+            live = self._live_sizes([path for path in paths if path not in (root_filters or {})],
+                                    exclusive, exclude)
+            yield from live
+            answered = {sized.path for sized in live}
+            paths = [path for path in paths if path not in answered]
+        if not paths:
+            return
+
+        devices = _DevicePlan(paths, self.cross_mounts, self.max_workers)
+        cached = self.index.load() if self.index and not file_filter and not resume else None
+        expected_bytes = 0
+        if cached is not None:
+            # Index totals cover whole subtrees, so only count outermost paths
+            outer = _outermost(paths) if exclusive else paths
+            expected_bytes = sum(self.index.get_total(path) or 0 for path in outer)
+
+        walk = _Walk(paths, devices, cached, exclusive, exclude, file_filter, resume, self.throttle,
+                     root_filters)
+        threads = [
+            threading.Thread(target=self._worker, args=(walk, slot), daemon=True)
+            for slot in range(len(walk.slot_devs))
+        ]
+        for thread in threads:
+            thread.start()
+
+        deadline = walk.start_time + time_budget * BUDGET_WALK_SHARE if time_budget else None
+        next_progress = walk.start_time + (progress_interval or 0)
+        finished = set()
+        if resume is not None:
+            done = set(resume.done)
+            finished.update(index for index, path in enumerate(paths) if path in done)
+        try:
+            while len(finished) < len(paths):
+                if cancel is not None and cancel.is_set():
+                    break
+                timeout = progress_interval
+                if cancel is not None:
+                    timeout = CANCEL_POLL_INTERVAL if timeout is None else min(timeout, CANCEL_POLL_INTERVAL)
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                try:
+                    event = walk.events.get(timeout=timeout)
+                except queue.Empty:
+                    if progress_interval is not None and time.time() >= next_progress:
+                        next_progress = time.time() + progress_interval
+                        yield walk.progress(len(finished), expected_bytes)
+                    continue
+                if isinstance(event, FileMatch):
+                    yield event
+                    continue
+                finished.add(event)
+                yield walk.sized(event)
+        finally:
+            walk.stop(threads)
+
+        if len(finished) < len(paths):
+            # Walked directories count in the totals, so their files must be reported
+            yield from walk.undelivered
+        if len(finished) < len(paths) and cancel is not None and cancel.is_set():
+            yield walk.checkpoint(finished)
+            return
+        if len(finished) < len(paths):
+            yield from self._estimate(walk, finished, walk.start_time + time_budget)
+            return
+
+        if cached is not None:
+            # Roots with file filters were not walked through the index, so
+            # neither they nor paths above them have complete records
+            filtered = [path for path, flt in zip(paths, walk.filters) if flt]
+            saved = [path for path in paths
+                     if path not in filtered and not any(_is_below(other, path) for other in filtered)]
+            merged: Dict[str, DirRecord] = {}
+            for records in walk.visited:
+                merged.update(records)
+            if filtered:
+                merged = {path: record for path, record in merged.items()
+                          if any(path == root or _is_below(path, root) for root in saved)}
+            self.index.save(saved, merged)
+
+    def _live_sizes(self, paths: List[str], exclusive: bool,
+                    exclude: Optional[PathMatcher]) -> List[RootSized]:
+        """
+        Answer paths whose indexed totals a running watcher keeps current.
+
+        In exclusive mode a path qualifies only together with every other
+        path nested in it and every path it is nested in, as its share is
+        its total minus the totals of the paths below it.
+        """
+        live = {
+            path for path in paths
+            if self.index.is_live(path)
+            and not (exclude and (exclude.match_walked(path) is not None or exclude.may_match_below(path)))
+        }
+        if exclusive:
+            # Drop paths related to a path that must be walked, until stable
+            changed = True
+            while changed:
+                changed = False
+                for path in list(live):
+                    if any(other not in live and (_is_below(other, path) or _is_below(path, other))
+                           for other in paths):
+                        live.discard(path)
+                        changed = True
+
+        sized = []
+        for path in paths:
+            if path not in live:
+                continue
+            record = self.index.get_record(path)
+            size, disk = record.total_bytes, record.total_disk_bytes
+            if exclusive:
+                for nested in _outermost([other for other in paths if _is_below(other, path)]):
+                    nested_record = self.index.get_record(nested)
+                    size -= nested_record.total_bytes
+                    disk -= nested_record.total_disk_bytes
+            sized.append(RootSized(path, size, disk, inode=record.inode, mtime_ns=record.mtime_ns))
+        return sized
+
+    def _worker(self, walk: _Walk, slot: int):
+        """Pull directory jobs until a None sentinel arrives."""
+        totals = walk.totals[slot]
+        disk_totals = walk.disk_totals[slot]
+        dev = walk.slot_devs[slot]
+        work = walk.queues[dev]
+        while True:
+            job = work.get()
+            if job is None:
+                return
+            index, path = job
+            if walk.stopped.is_set():
+                # Left outstanding so a budgeted walk can estimate it
+                walk.unvisited.append(job)
+                continue
+            children: List[str] = []
+            try:
+                if walk.throttle:
+                    walk.throttle.wait()
+                skip = walk.exclude if walk.exclude and walk.exclude.may_match_below(path) else None
+                if walk.filters[index]:
+                    matches: List[FileMatch] = []
+                    file_bytes, disk_bytes, children = self._scan_dir(path, walk, skip, matches, index)
+                    walk.emit(matches)
+                elif walk.cached is None or skip:
+                    # Filtered listings are not cached; the index holds raw listings
+                    file_bytes, disk_bytes, children = self._scan_dir(path, walk, skip)
+                else:
+                    file_bytes, disk_bytes, children = self._scan_dir_indexed(path, walk, slot)
+                totals[index] += file_bytes
+                disk_totals[index] += disk_bytes
+                walk.dirs_visited[slot] += 1
+            finally:
+                walk.finish_dir(index, children, dev)
+
+    def _estimate(self, walk: _Walk, finished: set, deadline: float) -> Iterator[RootSized]:
+        """
+        Extrapolate the unwalked frontier of each root a stopped walk did not finish.
+
+        Each probe picks a random frontier directory and descends along
+        random children, scaling the file bytes met at every level by the
+        product of branching factors so far (Knuth's tree-size estimator).
+        Every probe is an unbiased estimate of the frontier's total, so the
+        mean of several gives the estimate and their spread the interval.
+        Probes run round-robin until the deadline, at least one per root.
+        """
+        frontiers: Dict[int, List[str]] = {}
+        for index, path in walk.unvisited:
+            frontiers.setdefault(index, []).append(path)
+        # A probe may revisit a directory, so its hardlinks must count each time
+        walk.dedupe_links = False
+
+        samples: Dict[int, List[Tuple[float, float]]] = {}
+        for index in range(len(walk.paths)):
+            if index in finished:
+                continue
+            if walk.outstanding[index] == 0 or index not in frontiers:
+                # Finished during the stop; its event was drained unread
+                yield walk.sized(index)
+            else:
+                samples[index] = []
+
+        rng = random.Random()
+        first = True
+        while samples and (first or time.time() < deadline):
+            first = False
+            for index, probes in samples.items():
+                if len(probes) < MAX_PROBES:
+                    probes.append(self._probe(walk, frontiers[index], walk.devices.root_devs[index], rng))
+            if all(len(probes) >= MAX_PROBES for probes in samples.values()):
+                break
+
+        for index, probes in samples.items():
+            count = len(probes)
+            mean = sum(apparent for apparent, _ in probes) / count
+            mean_disk = sum(disk for _, disk in probes) / count
+            if count > 1:
+                variance = sum((apparent - mean) ** 2 for apparent, _ in probes) / (count - 1)
+                margin = CONFIDENCE_Z * math.sqrt(variance / count)
+            else:
+                margin = mean
+            yield RootSized(
+                walk.paths[index],
+                walk.root_size(index) + round(mean),
+                walk.root_disk_size(index) + round(mean_disk),
+                estimated=True,
+                margin_bytes=round(margin)
+            )
+
+    def _probe(self, walk: _Walk, frontier: List[str], root_dev: int,
+               rng: random.Random) -> Tuple[float, float]:
+        """One random descent from the frontier; returns (apparent, on-disk) estimates."""
+        weight = len(frontier)
+        path = rng.choice(frontier)
+        dev = walk.devices.device_of(path, root_dev)
+        apparent = disk = 0.0
+        while True:
+            skip = walk.exclude if walk.exclude and walk.exclude.may_match_below(path) else None
+            file_bytes, disk_bytes, children = self._scan_dir(path, walk, skip)
+            apparent += weight * file_bytes
+            disk += weight * disk_bytes
+            if walk.roots:
+                children = [child for child in children if child not in walk.roots]
+            children = walk.devices.stay_on_device(children, dev)
+            if not children:
+                return apparent, disk
+            weight *= len(children)
+            path = rng.choice(children)
+            dev = walk.devices.device_of(path, dev)
+
+    def _scan_dir(self, path: str, walk: _Walk, skip: Optional[PathMatcher] = None,
+                  matches: Optional[List[FileMatch]] = None, index: int = 0) -> Tuple[int, int, List[str]]:
+        """
+        Sum files directly in a directory and list its subdirectories.
+
+        If matches is given, files passing the file filter of walk root
+        index are appended to it, tagged with that root.
+
+        Returns:
+            Tuple of (apparent bytes, on-disk bytes, subdirectory paths)
+        """
+        total = 0
+        disk_total = 0
+        children = []
+        count = 0
+        if matches is not None:
+            file_filter = walk.filters[index]
+            cutoff = walk.cutoffs[index]
+            name_pattern = walk.name_patterns[index]
+            root = walk.paths[index]
+        started = time.monotonic()
+        try:
+            # Entries are stat'ed relative to the open directory; full paths are
+            # only built for what leaves this function
+            with scan_dir(path) as entries:
+                for entry in entries:
+                    count += 1
+                    if skip is not None and skip.match_walked(os.path.join(path, entry.name)) is not None:
+                        continue
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            # On POSIX only d_type comes with the listing, so this is
+                            # one lstat per file (cached on the entry afterwards);
+                            # on Windows the listing already carries the stat fields
+                            st = entry.stat(follow_symlinks=False)
+                            if not walk.first_link(st):
+                                continue
+                            disk = disk_usage(st)
+                            total += st.st_size
+                            disk_total += disk
+                            if (matches is not None and st.st_size >= file_filter.min_size_bytes
+                                    and (cutoff is None or st.st_mtime <= cutoff)
+                                    and (name_pattern is None or name_pattern.match(entry.name))):
+                                matches.append(FileMatch(os.path.join(path, entry.name), st.st_size,
+                                                         st.st_mtime, root, disk))
+                        elif entry.is_dir(follow_symlinks=False):
+                            children.append(os.path.join(path, entry.name))
+                    except (PermissionError, OSError):
+                        continue
+        except (PermissionError, OSError):
+            pass
+        if walk.throttle:
+            walk.throttle.record(time.monotonic() - started, count)
+        return total, disk_total, children
+
+    def _scan_dir_indexed(self, path: str, walk: _Walk, slot: int) -> Tuple[int, int, List[str]]:
+        """
+        Like _scan_dir, but reuse the cached listing of unchanged directories.
+
+        Reused listings keep the hardlink attribution of the walk that
+        recorded them; only rescanned directories consult this walk's links.
+        """
+        started = time.monotonic()
+        count = 1  # The stat of the directory itself
+        try:
+            st = os.stat(path, follow_symlinks=False)
+        except (PermissionError, OSError):
+            return 0, 0, []
+
+        record = walk.cached.get(path)
+        if record is None or record.inode != st.st_ino or record.mtime_ns != st.st_mtime_ns:
+            file_bytes = 0
+            file_disk_bytes = 0
+            subdirs = []
+            try:
+                with scan_dir(path) as entries:
+                    for entry in entries:
+                        count += 1
+                        try:
+                            if entry.is_file(follow_symlinks=False):
+                                entry_st = entry.stat(follow_symlinks=False)
+                                if walk.first_link(entry_st):
+                                    file_bytes += entry_st.st_size
+                                    file_disk_bytes += disk_usage(entry_st)
+                            elif entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.name)
+                        except (PermissionError, OSError):
+                            continue
+            except (PermissionError, OSError):
+                return 0, 0, []
+            record = DirRecord(st.st_ino, st.st_mtime_ns, file_bytes, tuple(subdirs), 0,
+                               file_disk_bytes, 0)
+
+        if walk.throttle:
+            walk.throttle.record(time.monotonic() - started, count)
+        walk.visited[slot][path] = record
+        return record.file_bytes, record.file_disk_bytes, [os.path.join(path, name) for name in record.subdirs]
+
+
+if __name__ == '__main__':
+    # Quick test
+    import sys
+    sizer = DirSizer()
+    targets = sys.argv[1:] or [os.path.expanduser('~')]
+    start = time.time()
+    for target, sized in sizer.measure(targets).items():
+        print(f"{target}: {sized.size_bytes} bytes ({sized.disk_bytes} on disk)")
+    print(f"Took {time.time() - start:.2f}s")
@@ -0,0 +1,259 @@
+"""
+CloudCleaner - Duplicate Finder Module
+Finds duplicate files with staged hashing: size, then head/tail, then full content.
+"""
+
+from typing import List, Dict, Optional, Tuple, Iterable
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import time
+import json
+
+from .dir_sizer import DirSizer, FileFilter, FileMatch
+from .path_matcher import PathMatcher
+
+
+# Bytes read from each end of a file for the partial hash
+PARTIAL_CHUNK = 64 * 1024
+
+# Read buffer for full-content hashing
+FULL_HASH_BUFFER = 1024 * 1024
+
+
+@dataclass
+class DuplicateGroup:
+    """Files with identical content."""
+    size_bytes: int
+    digest: str
+    paths: List[str]  # Oldest first; the first path is the one kept
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        return self.size_bytes * (len(self.paths) - 1)
+
+    def redundant_paths(self) -> List[str]:
+        """Every copy except the one kept."""
+        return self.paths[1:]
+
+    def to_dict(self) -> dict:
+        return {
+            'size_bytes': self.size_bytes,
+            'digest': self.digest,
+            'paths': self.paths,
+            'keep': self.paths[0],
+            'reclaimable_bytes': self.reclaimable_bytes
+        }
+
+
+@dataclass
+class DuplicateScanResult:
+    """Complete duplicate scan output."""
+    groups: List[DuplicateGroup] = field(default_factory=list)
+    files_examined: int = 0
+    files_hashed: int = 0
+    scan_duration_seconds: float = 0
+    timestamp: str = ""
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        return sum(group.reclaimable_bytes for group in self.groups)
+
+    def cleanup_paths(self) -> List[str]:
+        """Paths Cleaner.execute can delete to reclaim the duplicate space."""
+        return [path for group in self.groups for path in group.redundant_paths()]
+
+    def to_dict(self) -> dict:
+        return {
+            'total_groups': len(self.groups),
+            'reclaimable_bytes': self.reclaimable_bytes,
+            'groups': [group.to_dict() for group in self.groups],
+            'category': 'duplicates',
+            'files_examined': self.files_examined,
+            'files_hashed': self.files_hashed,
+            'scan_duration_seconds': self.scan_duration_seconds,
+            'timestamp': self.timestamp
+        }
+
+
+class DuplicateFinder:
+    """
+    Staged duplicate detection.
+
+    1. Group files by size during the walk; unique sizes are dropped.
+    2. Collapse hardlinks to the same (device, inode); they free nothing.
+    3. Hash the first and last 64 KB of each remaining candidate.
+    4. Fully hash only files whose size and partial hash still collide.
+
+    Hashing runs in a thread pool; hashlib releases the GIL on large buffers.
+    """
+
+    def __init__(self, sizer: Optional[DirSizer] = None, min_size_bytes: int = 1,
+                 max_workers: Optional[int] = None, exclusions: Optional[List[str]] = None):
+        """
+        Initialize finder.
+
+        Args:
+            sizer: Walk engine (created if not given)
+            min_size_bytes: Ignore files smaller than this
+            max_workers: Hashing threads. Defaults to ThreadPoolExecutor's default.
+            exclusions: User exclusion paths/globs pruned during the walk
+        """
+        self.sizer = sizer or DirSizer()
+        self.min_size_bytes = max(1, min_size_bytes)
+        self.max_workers = max_workers
+        self.exclusions = PathMatcher((path, path) for path in exclusions or ())
+
+    def find(self, roots: List[str]) -> DuplicateScanResult:
+        """
+        Find duplicate files under the given roots.
+
+        Args:
+            roots: Directories to search
+
+        Returns:
+            DuplicateScanResult with groups sorted by reclaimable bytes
+        """
+        start_time = time.time()
+        roots = [os.path.normpath(os.path.abspath(os.path.expanduser(root))) for root in roots]
+        roots = [root for root in roots if os.path.isdir(root)]
+
+        # Stage 1: group by size. A unique size is kept as a bare string and
+        # only becomes a list on the first collision.
+        by_size: Dict[int, object] = {}
+        files_examined = 0
+        walk = self.sizer.iter_sizes(roots, exclusive=True, exclude=self.exclusions,
+                                     file_filter=FileFilter(min_size_bytes=self.min_size_bytes))
+        for event in walk:
+            if not isinstance(event, FileMatch):
+                continue
+            files_examined += 1
+            existing = by_size.get(event.size_bytes)
+            if existing is None:
+                by_size[event.size_bytes] = event.path
+            elif isinstance(existing, list):
+                existing.append(event.path)
+            else:
+                by_size[event.size_bytes] = [existing, event.path]
+
+        candidates = [(size, paths) for size, paths in by_size.items() if isinstance(paths, list)]
+        del by_size
+
+        # Stage 2: drop extra hardlinks, remembering mtimes to pick the keeper
+        mtimes: Dict[str, float] = {}
+        unlinked: List[Tuple[int, List[str]]] = []
+        for size, paths in candidates:
+            distinct = self._distinct_inodes(paths, mtimes)
+            if len(distinct) > 1:
+                unlinked.append((size, distinct))
+
+        files_hashed = 0
+        groups: List[DuplicateGroup] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # Stage 3: partial hash
+            partial_groups: List[Tuple[int, str, str]] = []
+            jobs = [(size, path) for size, paths in unlinked for path in paths]
+            for (size, path), digest in zip(jobs, pool.map(lambda job: _partial_hash(*job), jobs)):
+                if digest is None:
+                    continue
+                files_hashed += 1
+                partial_groups.append((size, digest, path))
+            collisions = self._collisions(partial_groups)
+
+            # Stage 4: full hash, skipped when the partial read covered the whole file
+            jobs = []
+            for (size, partial), paths in collisions.items():
+                if size <= 2 * PARTIAL_CHUNK:
+                    groups.append(self._make_group(size, partial, paths, mtimes))
+                else:
+                    jobs.extend((size, path) for path in paths)
+            full_hashes = []
+            for (size, path), digest in zip(jobs, pool.map(lambda job: _full_hash(job[1]), jobs)):
+                if digest is not None:
+                    full_hashes.append((size, digest, path))
+            for (size, digest), paths in self._collisions(full_hashes).items():
+                groups.append(self._make_group(size, digest, paths, mtimes))
+
+        groups.sort(key=lambda group: group.reclaimable_bytes, reverse=True)
+        return DuplicateScanResult(
+            groups=groups,
+            files_examined=files_examined,
+            files_hashed=files_hashed,
+            scan_duration_seconds=round(time.time() - start_time, 2),
+            timestamp=time.strftime('%Y-%m-%dT%H:%M:%S')
+        )
+
+    @staticmethod
+    def _distinct_inodes(paths: List[str], mtimes: Dict[str, float]) -> List[str]:
+        """Keep one path per (device, inode) and record each kept path's mtime."""
+        seen = set()
+        distinct = []
+        for path in paths:
+            try:
+                st = os.stat(path, follow_symlinks=False)
+            except (PermissionError, OSError):
+                continue
+            key = (st.st_dev, st.st_ino)
+            # Windows may report inode 0; never treat those as hardlinks
+            if st.st_ino and key in seen:
+                continue
+            seen.add(key)
+            mtimes[path] = st.st_mtime
+            distinct.append(path)
+        return distinct
+
+    @staticmethod
+    def _collisions(hashed: Iterable[Tuple[int, str, str]]) -> Dict[Tuple[int, str], List[str]]:
+        """Group (size, digest, path) triples, keeping groups with more than one path."""
+        grouped: Dict[Tuple[int, str], List[str]] = {}
+        for size, digest, path in hashed:
+            grouped.setdefault((size, digest), []).append(path)
+        return {key: paths for key, paths in grouped.items() if len(paths) > 1}
+
+    @staticmethod
+    def _make_group(size: int, digest: str, paths: List[str], mtimes: Dict[str, float]) -> DuplicateGroup:
+        return DuplicateGroup(
+            size_bytes=size,
+            digest=digest,
+            paths=sorted(paths, key=lambda path: (mtimes.get(path, 0), path))
+        )
+
+
+def _partial_hash(size: int, path: str) -> Optional[str]:
+    """Hash the size plus the first and last PARTIAL_CHUNK bytes of a file."""
+    digest = hashlib.blake2b(str(size).encode())
+    try:
+        with open(path, 'rb') as f:
+            digest.update(f.read(PARTIAL_CHUNK))
+            if size > PARTIAL_CHUNK:
+                f.seek(max(PARTIAL_CHUNK, size - PARTIAL_CHUNK))
+                digest.update(f.read(PARTIAL_CHUNK))
+    except (PermissionError, OSError):
+        return None
+    return digest.hexdigest()
+
+
+def _full_hash(path: str) -> Optional[str]:
+    """Hash a whole file with large reads into one reused buffer."""
+    digest = hashlib.blake2b()
+    buffer = bytearray(FULL_HASH_BUFFER)
+    view = memoryview(buffer)
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                digest.update(view[:read])
+    except (PermissionError, OSError):
+        return None
+    return digest.hexdigest()
+
+
+if __name__ == '__main__':
+    # Quick test
+    import sys
+    finder = DuplicateFinder()
+    result = finder.find(sys.argv[1:] or [os.path.expanduser('~')])
+    print(json.dumps(result.to_dict(), indent=2))
@@ -0,0 +1,122 @@
+"""
+CloudCleaner - FD Walk Module
+Directory-descriptor based listing and removal shared by sizing and cleanup.
+"""
+
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+import os
+import shutil
+
+
+# scandir(fd) plus the *at() syscalls; missing on Windows
+HAS_FD_WALK = (
+    os.scandir in os.supports_fd
+    and os.open in os.supports_dir_fd
+    and os.unlink in os.supports_dir_fd
+    and os.rmdir in os.supports_dir_fd
+)
+
+_DIR_FLAGS = (os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+              | getattr(os, 'O_CLOEXEC', 0))
+
+
+def open_dir(path: str, dir_fd: Optional[int] = None) -> int:
+    """
+    Open a directory for fd-relative access without following symlinks.
+
+    Args:
+        path: Directory path, or a bare name when dir_fd is given
+        dir_fd: Descriptor of the directory path is relative to
+
+    Returns:
+        Directory file descriptor; the caller closes it
+    """
+    return os.open(path, _DIR_FLAGS, dir_fd=dir_fd)
+
+
+@contextmanager
+def scan_dir(path: str) -> Iterator[Iterator[os.DirEntry]]:
+    """
+    List a directory through a descriptor.
+
+    The path is resolved once; every entry.stat() is then an fstatat
+    relative to the open directory instead of a fresh lookup of the full
+    path, and a directory renamed mid-listing keeps being read. Entries
+    only carry their name: entry.path must not be used.
+    """
+    if not HAS_FD_WALK:
+        with os.scandir(path) as entries:
+            yield entries
+        return
+    fd = open_dir(path)
+    try:
+        with os.scandir(fd) as entries:
+            yield entries
+    finally:
+        os.close(fd)
+
+
+def remove_tree(path: str) -> List[Tuple[str, OSError]]:
+    """
+    Delete a directory tree, descending by descriptor.
+
+    Each level is opened relative to its parent with O_NOFOLLOW, so a
+    directory swapped for a symlink during the walk is never followed out
+    of the tree. Traversal is iterative; depth only costs one open
+    descriptor per level. Errors do not stop the removal of the rest.
+
+    Args:
+        path: Directory to delete
+
+    Returns:
+        (path, error) for every entry that could not be removed
+    """
+    failures: List[Tuple[str, OSError]] = []
+    if not HAS_FD_WALK:
+        shutil.rmtree(path, onerror=lambda _func, failed, info: failures.append((failed, info[1])))
+        return failures
+
+    try:
+        top = open_dir(path)
+    except OSError as e:
+        return [(path, e)]
+
+    # Frames of [fd, path, name in parent, subdirectory names left to visit]
+    frames = [[top, path, path, None]]
+    while frames:
+        frame = frames[-1]
+        fd, dir_path, _, subdirs = frame
+        if subdirs is None:
+            subdirs = frame[3] = []
+            try:
+                with os.scandir(fd) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.name)
+                            else:
+                                os.unlink(entry.name, dir_fd=fd)
+                        except OSError as e:
+                            failures.append((os.path.join(dir_path, entry.name), e))
+            except OSError as e:
+                failures.append((dir_path, e))
+
+        if subdirs:
+            name = subdirs.pop()
+            try:
+                frames.append([open_dir(name, dir_fd=fd), os.path.join(dir_path, name), name, None])
+            except OSError as e:
+                failures.append((os.path.join(dir_path, name), e))
+            continue
+
+        os.close(fd)
+        frames.pop()
+        try:
+            if frames:
+                os.rmdir(frame[2], dir_fd=frames[-1][0])
+            else:
+                os.rmdir(path)
+        except OSError as e:
+            failures.append((dir_path, e))
+    return failures
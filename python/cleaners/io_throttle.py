@@ -0,0 +1,145 @@
+"""
+CloudCleaner - I/O Throttle Module
+Rate limiting and latency-driven backoff for background scans.
+"""
+
+from typing import Optional
+import os
+import sys
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# A directory read this many times slower per entry than the fastest
+# observed ones means the device is busy with someone else's I/O
+LATENCY_FACTOR = 4.0
+
+# Below this per-directory latency the device is never considered busy
+MIN_BUSY_LATENCY = 0.02
+
+# Bounds of the per-directory pause added while the device is busy
+MIN_BACKOFF = 0.002
+MAX_BACKOFF = 0.5
+
+# Weight of the newest sample in the moving latency averages
+EWMA_WEIGHT = 0.2
+
+
+class IOThrottle:
+    """
+    Paces a walk so it leaves room for foreground I/O.
+
+    Two independent brakes, shared by all walk workers:
+
+    - A token bucket on directory entries per second. Entries are paid for
+      after each scandir, so the bucket may go into debt; the next directory
+      waits until the debt is repaid.
+    - Adaptive backoff. Per-entry scandir latency is tracked against the
+      fastest level seen; while it stays well above that level (the device
+      queue is busy) every directory is preceded by a pause that doubles
+      per slow read and decays on fast ones.
+    """
+
+    def __init__(self, entries_per_second: Optional[float] = None, adaptive: bool = True):
+        """
+        Initialize throttle.
+
+        Args:
+            entries_per_second: Budget of directory entries read per second,
+                or None for no fixed limit
+            adaptive: Back off when scandir latency rises
+        """
+        self.entries_per_second = entries_per_second or None
+        self.adaptive = adaptive
+        self._lock = threading.Lock()
+        self._tokens = float(entries_per_second or 0)
+        self._refilled_at = time.monotonic()
+        self._latency: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self._backoff = 0.0
+
+    @property
+    def backoff_seconds(self) -> float:
+        """Current pause before each directory."""
+        return self._backoff
+
+    def wait(self):
+        """Block until the next directory may be read."""
+        delay = self._backoff
+        if self.entries_per_second:
+            with self._lock:
+                self._refill()
+                if self._tokens < 0:
+                    delay += -self._tokens / self.entries_per_second
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, seconds: float, entries: int):
+        """Account for one directory read of the given size and duration."""
+        with self._lock:
+            if self.entries_per_second:
+                self._refill()
+                self._tokens -= entries
+            if self.adaptive:
+                self._adapt(seconds, entries)
+
+    def _refill(self):
+        now = time.monotonic()
+        # At most one second of burst is saved up
+        self._tokens = min(self.entries_per_second,
+                           self._tokens + (now - self._refilled_at) * self.entries_per_second)
+        self._refilled_at = now
+
+    def _adapt(self, seconds: float, entries: int):
+        per_entry = seconds / max(entries, 1)
+        if self._latency is None:
+            self._latency = self._baseline = per_entry
+            return
+        self._latency += EWMA_WEIGHT * (per_entry - self._latency)
+        # The baseline follows drops at once and rises only slowly, so it
+        # tracks what the device manages when nobody else is using it
+        if self._latency < self._baseline:
+            self._baseline = self._latency
+        else:
+            self._baseline += EWMA_WEIGHT * 0.05 * (self._latency - self._baseline)
+
+        if seconds > MIN_BUSY_LATENCY and self._latency > self._baseline * LATENCY_FACTOR:
+            self._backoff = min(MAX_BACKOFF, max(MIN_BACKOFF, self._backoff * 2))
+        elif self._backoff:
+            self._backoff = self._backoff * 0.8 if self._backoff * 0.8 >= MIN_BACKOFF else 0.0
+
+
+def lower_priority() -> bool:
+    """
+    Lower this process's CPU and (on Linux) I/O scheduling priority.
+
+    Threads started afterwards inherit both, so call it before a walk
+    starts its workers.
+
+    Returns:
+        True if any priority was lowered
+    """
+    lowered = False
+    try:
+        if hasattr(os, 'nice'):
+            os.nice(10)
+            lowered = True
+        elif psutil is not None:
+            psutil.Process().nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+            lowered = True
+    except (OSError, AttributeError):
+        pass
+
+    # Idle I/O class: only served when no other process wants the disk
+    if psutil is not None and sys.platform.startswith('linux'):
+        try:
+            psutil.Process().ionice(psutil.IOPRIO_CLASS_IDLE)
+            lowered = True
+        except (OSError, AttributeError, psutil.Error):
+            pass
+    return lowered
@@ -0,0 +1,227 @@
+"""
+CloudCleaner - Path Matcher Module
+Component-wise prefix trie for answering path rule queries in O(depth).
+"""
+
+from typing import Any, Iterable, List, Optional, Tuple
+import os
+import re
+
+
+# Trie node keys; path components are always strings so these cannot collide
+_VALUE = None
+_BELOW = 0
+
+
+def normalize_path(path: str, case_sensitive: bool = False) -> str:
+    """Expand variables and home, make absolute and normalize a path."""
+    normalized = os.path.normpath(os.path.abspath(os.path.expandvars(os.path.expanduser(path))))
+    return normalized if case_sensitive else normalized.lower()
+
+
+def is_glob(path: str) -> bool:
+    """Check if a rule path contains glob wildcards."""
+    return any(char in path for char in '*?[')
+
+
+def is_name_glob(pattern: str) -> bool:
+    """Check if a wildcard rule names entries anywhere (no separator, not under ~)."""
+    separators = (os.sep, os.altsep) if os.altsep else (os.sep,)
+    return not pattern.startswith('~') and not any(sep in pattern for sep in separators)
+
+
+def translate_glob(pattern: str) -> str:
+    """
+    Translate a glob into a regex fragment whose wildcards stay within one component.
+
+    Unlike fnmatch.translate, '*' and '?' never match the path separator,
+    so a wildcard cannot silently span directories.
+    """
+    sep = re.escape(os.sep)
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        i += 1
+        if char == '*':
+            while i < n and pattern[i] == '*':
+                i += 1
+            parts.append(f'[^{sep}]*')
+        elif char == '?':
+            parts.append(f'[^{sep}]')
+        elif char == '[':
+            end = i + 1 if i < n and pattern[i] in '!]' else i
+            if i < n and pattern[i] == '!' and end < n and pattern[end] == ']':
+                end += 1
+            end = pattern.find(']', end)
+            if end < 0:
+                parts.append(re.escape(char))
+                continue
+            body = pattern[i:end].replace('\\', '\\\\')
+            i = end + 1
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            elif body.startswith('^'):
+                body = '\\' + body
+            parts.append(f'[{body}]')
+        else:
+            parts.append(re.escape(char))
+    return ''.join(parts)
+
+
+def split_path(normalized: str) -> List[str]:
+    """Split a normalized path into its components."""
+    return [part for part in normalized.split(os.sep) if part]
+
+
+class PathMatcher:
+    """
+    Prefix trie of path rules, matched one path component at a time.
+
+    Rules are normalized once when added; each query then costs one dict
+    lookup per component of the queried path, however many rules exist.
+    Rules containing glob wildcards are compiled into a single regex and
+    match the paths they name and everything below them. A wildcard rule
+    with a separator (or starting with ~) is anchored like a path; one
+    without, such as '*.log', matches an entry of that name anywhere.
+    Wildcards never match across a separator.
+    """
+
+    def __init__(self, rules: Optional[Iterable[Tuple[str, Any]]] = None, case_sensitive: bool = False):
+        """
+        Build a matcher.
+
+        Args:
+            rules: Optional (path, value) pairs to add
+            case_sensitive: Compare components case-sensitively
+        """
+        self.case_sensitive = case_sensitive
+        self._root: dict = {}
+        self._size = 0
+        self._globs: List[Tuple[Any, Any]] = []
+        self._glob_regex = None
+        for path, value in rules or ():
+            self.add(path, value)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def has_globs(self) -> bool:
+        return bool(self._globs)
+
+    def add(self, path: str, value: Any = True):
+        """Add a rule; the first value added for a path wins."""
+        if is_glob(path):
+            self._add_glob(path, value)
+            return
+        node = self._root
+        for part in split_path(normalize_path(path, self.case_sensitive)):
+            node.setdefault(_BELOW, value)
+            node = node.setdefault(part, {})
+        if _VALUE not in node:
+            node[_VALUE] = value
+            self._size += 1
+
+    def _add_glob(self, pattern: str, value: Any):
+        """Compile a wildcard rule matching the pattern and anything below it."""
+        sep = re.escape(os.sep)
+        if is_name_glob(pattern):
+            name = pattern if self.case_sensitive else pattern.lower()
+            regex = f'(?:.*{sep})?{translate_glob(name)}(?:{sep}.*)?\\Z'
+        else:
+            normalized = normalize_path(pattern, self.case_sensitive)
+            regex = f'{translate_glob(normalized)}(?:{sep}.*)?\\Z'
+        self._globs.append((re.compile(regex, re.DOTALL), value))
+        self._glob_regex = re.compile('|'.join(f'(?:{r.pattern})' for r, _ in self._globs), re.DOTALL)
+        self._size += 1
+
+    def _match_glob(self, normalized: str) -> Optional[Any]:
+        if self._glob_regex is None or not self._glob_regex.match(normalized):
+            return None
+        for regex, value in self._globs:
+            if regex.match(normalized):
+                return value
+        return None
+
+    def normalize(self, path: str) -> str:
+        """Normalize a path the same way rules were normalized."""
+        return normalize_path(path, self.case_sensitive)
+
+    def match(self, path: str, normalized: bool = False) -> Optional[Any]:
+        """
+        Find the deepest rule at or above a path.
+
+        Args:
+            path: Path to look up
+            normalized: Set if the path already went through normalize()
+
+        Returns:
+            Value of the most specific matching rule, or None
+        """
+        return self.lookup(path, normalized)[0]
+
+    def lookup(self, path: str, normalized: bool = False) -> Tuple[Optional[Any], Optional[Any]]:
+        """
+        Find rules at or above a path, and rules strictly below it.
+
+        Returns:
+            Tuple of (value of deepest rule at or above the path,
+                      value of some rule below the path), either may be None
+        """
+        if not normalized:
+            path = normalize_path(path, self.case_sensitive)
+        node = self._root
+        found = None
+        for part in split_path(path):
+            if _VALUE in node:
+                found = node[_VALUE]
+            node = node.get(part)
+            if node is None:
+                break
+        else:
+            if _VALUE in node:
+                found = node[_VALUE]
+        if found is None and self._globs:
+            found = self._match_glob(path)
+        return found, node.get(_BELOW) if node is not None else None
+
+    def match_walked(self, path: str) -> Optional[Any]:
+        """
+        Match a path produced by a directory walk from a normalized root.
+
+        Such paths are already absolute and normalized, so only case folding
+        is applied before the lookup.
+        """
+        return self.match(path if self.case_sensitive else path.lower(), normalized=True)
+
+    def may_match_below(self, path: str) -> bool:
+        """
+        Check whether any rule could match something strictly below a walked path.
+
+        Lets a walk skip per-entry checks in directories no rule reaches.
+        """
+        if self._globs:
+            return True
+        return self.lookup(path if self.case_sensitive else path.lower(), normalized=True)[1] is not None
+
+
+if __name__ == '__main__':
+    # Quick test
+    home = os.path.expanduser('~')
+    matcher = PathMatcher([('*.log', 'logs'), ('~/.cache/*/x', 'x'), (os.path.join(home, 'tmp'), 'tmp')],
+                          case_sensitive=True)
+    # A name-only glob matches that name in any directory, not just the working one
+    assert matcher.match('/var/log/a.log') == 'logs'
+    assert matcher.match(os.path.join(os.getcwd(), 'a.log')) == 'logs'
+    assert matcher.match('/var/log/a.log/inner') == 'logs'
+    assert matcher.match('/var/log/a.log.1') is None
+    # Wildcards stay within one component
+    assert matcher.match(os.path.join(home, '.cache', 'a', 'x')) == 'x'
+    assert matcher.match(os.path.join(home, '.cache', 'a', 'b', 'x')) is None
+    assert matcher.match(os.path.join(home, '.cache', 'a', 'x', 'y')) == 'x'
+    assert matcher.match(os.path.join(home, 'tmp', 'z')) == 'tmp'
+    assert PathMatcher([('/data/[ab]?', 1)], case_sensitive=True).match('/data/a/x') is None
+    assert PathMatcher([('/data/[ab]?', 1)], case_sensitive=True).match('/data/ax/y') == 1
+    assert PathMatcher([('/data/[!a]?', 1)], case_sensitive=True).match('/data/bc') == 1
+    print('path_matcher: ok')
@@ -0,0 +1,378 @@
+"""
+CloudCleaner - Quarantine Module
+Rename-based cleanup with undo, and a purger that empties the quarantine later.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+import os
+import shutil
+import sqlite3
+import stat
+import threading
+import time
+import uuid
+
+from .deleter import ParallelDeleter
+from .devices import device_root
+from .dir_sizer import DirSizer
+
+
+# Quarantined items older than this are purged
+DEFAULT_RETENTION_DAYS = 7.0
+
+# Below this fraction of free space, a filesystem's quarantine is purged oldest first
+PURGE_FREE_RATIO = 0.10
+
+# Entry states: pending (journaled, rename not confirmed), held, restored, purged
+PENDING = 'pending'
+HELD = 'held'
+RESTORED = 'restored'
+PURGED = 'purged'
+
+
+@dataclass
+class QuarantineEntry:
+    """One quarantined path."""
+    id: int
+    batch: str
+    cleanup_id: Optional[int]
+    original_path: str
+    stored_path: str
+    device: int
+    size_bytes: Optional[int]  # None until measured; a cleanup does not walk what it quarantines
+    disk_bytes: Optional[int]
+    quarantined_at: float
+    state: str
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'cleanup_id': self.cleanup_id,
+            'original_path': self.original_path,
+            'stored_path': self.stored_path,
+            'size_bytes': self.size_bytes,
+            'disk_bytes': self.disk_bytes,
+            'quarantined_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.quarantined_at)),
+            'state': self.state
+        }
+
+
+@dataclass
+class QuarantineResult:
+    """Outcome of moving paths into, or back out of, the quarantine."""
+    batch: str = ''
+    moved: List[str] = field(default_factory=list)
+    errors: List[Tuple[str, str]] = field(default_factory=list)  # (path, reason)
+
+    def to_dict(self) -> dict:
+        return {
+            'batch': self.batch,
+            'moved': self.moved,
+            'errors': [{'path': path, 'error': error} for path, error in self.errors]
+        }
+
+
+class Quarantine:
+    """
+    Holds cleaned-up paths on their own filesystem until they are purged.
+
+    A path is quarantined by renaming it into a quarantine directory on the
+    same filesystem: the application directory when it shares the device,
+    otherwise a hidden directory at the top of that filesystem. A rename is
+    atomic and costs the same for one file or a million, and undoing it is
+    the reverse rename.
+
+    Every move is journaled in SQLite before it happens and confirmed after,
+    so an interrupted cleanup leaves at worst 'pending' entries, which
+    reconcile() settles by looking at which side of the rename exists.
+    """
+
+    def __init__(self, journal_path: str, home_dir: str):
+        """
+        Open or create the quarantine.
+
+        Args:
+            journal_path: Path to the journal database, normally next to cloudcleaner.db
+            home_dir: Quarantine directory for the application's own filesystem
+        """
+        self.journal_path = journal_path
+        self.home_dir = home_dir
+        self.conn = sqlite3.connect(journal_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._dirs: Dict[int, Optional[str]] = {}
+        self._init_schema()
+
+    def _init_schema(self):
+        """Create journal table if it doesn't exist."""
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS quarantine (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch TEXT NOT NULL,
+                cleanup_id INTEGER,
+                original_path TEXT NOT NULL,
+                stored_path TEXT NOT NULL,
+                device INTEGER NOT NULL,
+                size_bytes INTEGER,
+                disk_bytes INTEGER,
+                quarantined_at REAL NOT NULL,
+                state TEXT NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS quarantine_cleanup ON quarantine (cleanup_id)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS quarantine_state ON quarantine (state, quarantined_at)')
+        self.conn.commit()
+
+    def hold(self, items: List[Tuple[str, Optional[int], Optional[int]]],
+             batch: Optional[str] = None) -> QuarantineResult:
+        """
+        Move paths into quarantine.
+
+        Args:
+            items: (path, size_bytes, disk_bytes) of each path; the sizes are
+                what purging it will free, None if not known yet (purge()
+                measures such entries when it needs their size)
+            batch: Earlier batch to add these to (a new one if None)
+
+        Returns:
+            QuarantineResult with the batch ID to pass to assign_cleanup()
+        """
+        result = QuarantineResult(batch=batch or uuid.uuid4().hex)
+        # Makes stored names unique across calls adding to the same batch
+        prefix = uuid.uuid4().hex[:8]
+        planned = []
+        for path, size, disk_size in items:
+            path = os.path.abspath(path)
+            try:
+                device = os.stat(path, follow_symlinks=False).st_dev
+                directory = self._directory_for(path, device)
+            except OSError as e:
+                result.errors.append((path, e.strerror or str(e)))
+                continue
+            if directory is None:
+                result.errors.append((path, 'No writable quarantine directory on its filesystem'))
+                continue
+            if _is_below(directory, path):
+                result.errors.append((path, 'Contains the quarantine directory'))
+                continue
+            stored = os.path.join(directory, f"{result.batch}-{prefix}{len(planned)}-{os.path.basename(path)}")
+            planned.append((path, stored, device, size, disk_size))
+
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany('''
+                INSERT INTO quarantine
+                (batch, original_path, stored_path, device, size_bytes, disk_bytes, quarantined_at, state)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(result.batch, path, stored, device, size, disk_size, now, PENDING)
+                  for path, stored, device, size, disk_size in planned])
+
+        held = []
+        failed = []
+        for path, stored, _, _, _ in planned:
+            try:
+                os.rename(path, stored)
+            except OSError as e:
+                result.errors.append((path, e.strerror or str(e)))
+                failed.append(stored)
+                continue
+            result.moved.append(path)
+            held.append(stored)
+
+        with self._lock, self.conn:
+            self.conn.executemany('UPDATE quarantine SET state = ? WHERE stored_path = ?',
+                                  [(HELD, stored) for stored in held])
+            self.conn.executemany('DELETE FROM quarantine WHERE stored_path = ?',
+                                  [(stored,) for stored in failed])
+        return result
+
+    def assign_cleanup(self, batch: str, cleanup_id: int):
+        """Link a batch to the cleanup history record it belongs to, for undo()."""
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE quarantine SET cleanup_id = ? WHERE batch = ?', (cleanup_id, batch))
+
+    def entries(self, cleanup_id: Optional[int] = None, states: Tuple[str, ...] = (HELD,)) -> List[QuarantineEntry]:
+        """Journal entries in the given states, oldest first, optionally of one cleanup."""
+        query = f"SELECT * FROM quarantine WHERE state IN ({', '.join('?' * len(states))})"
+        params: List = list(states)
+        if cleanup_id is not None:
+            query += ' AND cleanup_id = ?'
+            params.append(cleanup_id)
+        with self._lock:
+            rows = self.conn.execute(query + ' ORDER BY quarantined_at, id', params).fetchall()
+        return [QuarantineEntry(**dict(row)) for row in rows]
+
+    def undo(self, cleanup_id: int) -> QuarantineResult:
+        """
+        Restore everything a cleanup quarantined by renaming it back.
+
+        A path is not restored over something created at its original
+        location since; that entry stays held and is reported.
+        """
+        self.reconcile()
+        result = QuarantineResult()
+        restored = []
+        for entry in self.entries(cleanup_id):
+            result.batch = entry.batch
+            if os.path.lexists(entry.original_path):
+                result.errors.append((entry.original_path, 'Something else now exists at this path'))
+                continue
+            if not _prepare_dir(os.path.dirname(entry.stored_path), entry.device):
+                result.errors.append((entry.original_path, 'Quarantine directory is no longer private'))
+                continue
+            try:
+                os.makedirs(os.path.dirname(entry.original_path), exist_ok=True)
+                os.rename(entry.stored_path, entry.original_path)
+            except OSError as e:
+                result.errors.append((entry.original_path, e.strerror or str(e)))
+                continue
+            result.moved.append(entry.original_path)
+            restored.append(entry.id)
+        self._set_state(restored, RESTORED)
+        return result
+
+    def purge(self, retention_days: float = DEFAULT_RETENTION_DAYS, free_ratio: float = PURGE_FREE_RATIO,
+              deleter: Optional[ParallelDeleter] = None, sizer: Optional[DirSizer] = None) -> Dict:
+        """
+        Delete quarantined data past the retention window, or sooner under disk pressure.
+
+        On a filesystem with less than free_ratio of its space free, entries
+        are also purged oldest first until their freed space would lift it
+        above the ratio; entries held without a size are measured for that
+        here, with sizer, rather than when they were quarantined.
+
+        Returns:
+            Dict with purged entry count, bytes freed, the bytes freed per
+            cleanup ID (for the cleanup history) and errors
+        """
+        self.reconcile()
+        cutoff = time.time() - retention_days * 86400
+        held = self.entries()
+        due = [entry for entry in held if entry.quarantined_at <= cutoff]
+
+        by_device: Dict[int, List[QuarantineEntry]] = {}
+        for entry in held:
+            if entry.quarantined_at > cutoff:
+                by_device.setdefault(entry.device, []).append(entry)
+        for entries in by_device.values():
+            try:
+                usage = shutil.disk_usage(os.path.dirname(entries[0].stored_path))
+            except OSError:
+                continue
+            shortfall = free_ratio * usage.total - usage.free
+            for entry in entries:
+                if shortfall <= 0:
+                    break
+                due.append(entry)
+                if entry.disk_bytes is None:
+                    sizer = sizer or DirSizer()
+                    self._record_size(entry, sizer)
+                shortfall -= entry.disk_bytes or 0
+
+        deleter = deleter or ParallelDeleter()
+        reports = deleter.delete([entry.stored_path for entry in due])
+        purged = []
+        errors = []
+        cleanups: Dict[int, Dict[str, int]] = {}
+        for entry, report in zip(due, reports):
+            if entry.cleanup_id is not None:
+                freed = cleanups.setdefault(entry.cleanup_id, {'freed_bytes': 0, 'freed_disk_bytes': 0})
+                freed['freed_bytes'] += report.freed_bytes
+                freed['freed_disk_bytes'] += report.freed_disk_bytes
+            if report.removed or not os.path.lexists(entry.stored_path):
+                purged.append(entry.id)
+            else:
+                errors.append({'path': entry.original_path, 'error': report.failures[0][1],
+                               'entries_left': len(report.failures)})
+        self._set_state(purged, PURGED)
+        return {
+            'purged': len(purged),
+            'freed_bytes': sum(report.freed_bytes for report in reports),
+            'freed_disk_bytes': sum(report.freed_disk_bytes for report in reports),
+            'cleanups': cleanups,
+            'errors': errors
+        }
+
+    def _record_size(self, entry: QuarantineEntry, sizer: DirSizer):
+        """Measure an entry held without a size and journal the result."""
+        sized = sizer.measure([entry.stored_path])[entry.stored_path]
+        entry.size_bytes, entry.disk_bytes = sized.size_bytes, sized.disk_bytes
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE quarantine SET size_bytes = ?, disk_bytes = ? WHERE id = ?',
+                              (entry.size_bytes, entry.disk_bytes, entry.id))
+
+    def reconcile(self):
+        """Settle entries whose move was interrupted, by which side of the rename exists."""
+        held = []
+        dropped = []
+        for entry in self.entries(states=(PENDING,)):
+            if os.path.lexists(entry.stored_path):
+                held.append(entry.id)
+            else:
+                dropped.append(entry.id)
+        self._set_state(held, HELD)
+        with self._lock, self.conn:
+            self.conn.executemany('DELETE FROM quarantine WHERE id = ?', [(entry_id,) for entry_id in dropped])
+
+    def _set_state(self, ids: List[int], state: str):
+        with self._lock, self.conn:
+            self.conn.executemany('UPDATE quarantine SET state = ? WHERE id = ?', [(state, entry_id) for entry_id in ids])
+
+    def _directory_for(self, path: str, device: int) -> Optional[str]:
+        """Quarantine directory on a device, created on first use; None if none is writable."""
+        if device not in self._dirs:
+            candidates = [self.home_dir, os.path.join(device_root(path), _hidden_name())]
+            self._dirs[device] = next((directory for directory in candidates
+                                       if _prepare_dir(directory, device)), None)
+        return self._dirs[device]
+
+    def close(self):
+        """Close the journal."""
+        self.conn.close()
+
+
+def _hidden_name() -> str:
+    """Per-user quarantine directory name at the top of a filesystem."""
+    owner = os.getuid() if hasattr(os, 'getuid') else os.environ.get('USERNAME', 'user')
+    return f'.cloudcleaner-quarantine-{owner}'
+
+
+def _prepare_dir(directory: str, device: int) -> bool:
+    """
+    Create a private quarantine directory; True if it is usable for the device.
+
+    An existing directory is only accepted if it is a real directory owned
+    by the user with no group or other access: on a shared filesystem
+    another user could have created it first, and would then control what
+    is held in it and what undo() renames back.
+    """
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        st = os.lstat(directory)
+    except OSError:
+        return False
+    if not stat.S_ISDIR(st.st_mode) or st.st_dev != device:
+        return False
+    if hasattr(os, 'getuid') and (st.st_uid != os.getuid() or st.st_mode & 0o077):
+        return False
+    return os.access(directory, os.W_OK)
+
+
+def _is_below(path: str, root: str) -> bool:
+    root = root.rstrip(os.sep)
+    return path == root or path.startswith(root + os.sep)
+
+
+if __name__ == '__main__':
+    # Quick test
+    import json
+    import tempfile
+    work = tempfile.mkdtemp()
+    quarantine = Quarantine(os.path.join(work, 'quarantine.db'), os.path.join(work, 'quarantine'))
+    target = os.path.join(work, 'junk')
+    os.makedirs(target)
+    held = quarantine.hold([(target, 0, 0)])
+    quarantine.assign_cleanup(held.batch, 1)
+    print(json.dumps(held.to_dict(), indent=2))
+    print(json.dumps(quarantine.undo(1).to_dict(), indent=2))
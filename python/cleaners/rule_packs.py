@@ -0,0 +1,347 @@
+"""
+CloudCleaner - Rule Packs Module
+Declarative scan targets, compiled once into a single path matcher.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from functools import lru_cache
+import json
+import os
+import platform
+
+from .dir_sizer import FileFilter
+
+
+# Built-in rule packs. Each rule lists its roots per OS ('~' and environment
+# variables are expanded). Rules without 'patterns' or 'min_age_days' report
+# each root as one item; rules with them report every matching file below
+# their roots instead. A root claimed by several rules keeps the first.
+BUILTIN_PACKS: Dict[str, Dict] = {
+    'system': {
+        'description': 'Temporary files, user caches, crash dumps and system logs',
+        'rules': [
+            {
+                'name': 'temp_files',
+                'category': 'temp_files',
+                'risk_level': 'low',
+                'reason': 'Temporary files',
+                'paths': {
+                    'linux': ['/tmp', '~/.cache'],
+                    'windows': ['%TEMP%', 'C:\\Windows\\Temp'],
+                },
+            },
+            {
+                'name': 'user_cache',
+                'category': 'app_cache',
+                'risk_level': 'low',
+                'reason': 'Application caches',
+                'paths': {'darwin': ['~/Library/Caches']},
+            },
+            {
+                'name': 'crash_dumps',
+                'category': 'crash_dumps',
+                'risk_level': 'low',
+                'reason': 'Application crash dumps',
+                'paths': {'windows': ['%LOCALAPPDATA%\\CrashDumps', '%USERPROFILE%\\AppData\\Local\\CrashDumps']},
+            },
+            {
+                'name': 'windows_logs',
+                'category': 'logs',
+                'risk_level': 'medium',
+                'reason': 'Windows log files - may be useful for debugging',
+                'paths': {'windows': ['C:\\Windows\\Logs']},
+            },
+        ],
+    },
+    'browsers': {
+        'description': 'Browser disk caches',
+        'rules': [
+            {
+                'name': 'chrome_cache',
+                'category': 'browser_cache',
+                'risk_level': 'low',
+                'reason': 'Chrome browser cache',
+                'paths': {
+                    'linux': ['~/.cache/google-chrome'],
+                    'darwin': ['~/Library/Caches/Google/Chrome'],
+                    'windows': ['%LOCALAPPDATA%\\Google\\Chrome\\User Data\\Default\\Cache',
+                                '%LOCALAPPDATA%\\Google\\Chrome\\User Data\\Default\\Code Cache'],
+                },
+            },
+            {
+                'name': 'edge_cache',
+                'category': 'browser_cache',
+                'risk_level': 'low',
+                'reason': 'Edge browser cache',
+                'paths': {'windows': ['%LOCALAPPDATA%\\Microsoft\\Edge\\User Data\\Default\\Cache']},
+            },
+            {
+                'name': 'firefox_cache',
+                'category': 'browser_cache',
+                'risk_level': 'low',
+                'reason': 'Firefox browser cache',
+                'paths': {'windows': ['%LOCALAPPDATA%\\Mozilla\\Firefox\\Profiles']},
+            },
+        ],
+    },
+    'pip': {
+        'description': 'pip download and wheel cache',
+        'rules': [
+            {
+                'name': 'pip_cache',
+                'category': 'package_cache',
+                'risk_level': 'low',
+                'reason': 'pip package cache - downloaded again when needed',
+                'paths': {
+                    'linux': ['~/.cache/pip'],
+                    'darwin': ['~/Library/Caches/pip'],
+                    'windows': ['%LOCALAPPDATA%\\pip\\Cache'],
+                },
+            },
+        ],
+    },
+    'npm': {
+        'description': 'npm content-addressable cache',
+        'rules': [
+            {
+                'name': 'npm_cache',
+                'category': 'package_cache',
+                'risk_level': 'low',
+                'reason': 'npm package cache - downloaded again when needed',
+                'paths': {
+                    'linux': ['~/.npm/_cacache'],
+                    'darwin': ['~/.npm/_cacache'],
+                    'windows': ['%LOCALAPPDATA%\\npm-cache\\_cacache'],
+                },
+            },
+        ],
+    },
+    'yarn': {
+        'description': 'Yarn package cache',
+        'rules': [
+            {
+                'name': 'yarn_cache',
+                'category': 'package_cache',
+                'risk_level': 'low',
+                'reason': 'Yarn package cache - downloaded again when needed',
+                'paths': {
+                    'linux': ['~/.cache/yarn'],
+                    'darwin': ['~/Library/Caches/Yarn'],
+                    'windows': ['%LOCALAPPDATA%\\Yarn\\Cache'],
+                },
+            },
+        ],
+    },
+    'cargo': {
+        'description': 'Cargo registry and git checkouts',
+        'rules': [
+            {
+                'name': 'cargo_cache',
+                'category': 'package_cache',
+                'risk_level': 'low',
+                'reason': 'Cargo crate cache - downloaded again when needed',
+                'paths': {
+                    'linux': ['~/.cargo/registry/cache', '~/.cargo/registry/src', '~/.cargo/git/db'],
+                    'darwin': ['~/.cargo/registry/cache', '~/.cargo/registry/src', '~/.cargo/git/db'],
+                    'windows': ['%USERPROFILE%\\.cargo\\registry\\cache', '%USERPROFILE%\\.cargo\\registry\\src',
+                                '%USERPROFILE%\\.cargo\\git\\db'],
+                },
+            },
+        ],
+    },
+    'gradle': {
+        'description': 'Gradle dependency caches and wrapper distributions',
+        'rules': [
+            {
+                'name': 'gradle_cache',
+                'category': 'package_cache',
+                'risk_level': 'low',
+                'reason': 'Gradle caches - rebuilt by the next build',
+                'paths': {
+                    'linux': ['~/.gradle/caches', '~/.gradle/wrapper/dists'],
+                    'darwin': ['~/.gradle/caches', '~/.gradle/wrapper/dists'],
+                    'windows': ['%USERPROFILE%\\.gradle\\caches', '%USERPROFILE%\\.gradle\\wrapper\\dists'],
+                },
+            },
+        ],
+    },
+    'maven': {
+        'description': 'Maven local repository',
+        'rules': [
+            {
+                'name': 'maven_repository',
+                'category': 'package_cache',
+                'risk_level': 'medium',
+                'reason': 'Maven local repository - locally installed artifacts are lost',
+                'paths': {
+                    'linux': ['~/.m2/repository'],
+                    'darwin': ['~/.m2/repository'],
+                    'windows': ['%USERPROFILE%\\.m2\\repository'],
+                },
+            },
+        ],
+    },
+    'apt': {
+        'description': 'Downloaded Debian packages',
+        'rules': [
+            {
+                'name': 'apt_archives',
+                'category': 'package_cache',
+                'risk_level': 'low',
+                'reason': 'Downloaded .deb packages - already installed',
+                'paths': {'linux': ['/var/cache/apt/archives']},
+                'patterns': ['*.deb'],
+            },
+        ],
+    },
+    'journald': {
+        'description': 'Rotated systemd journal files',
+        'rules': [
+            {
+                'name': 'journal_archives',
+                'category': 'logs',
+                'risk_level': 'medium',
+                'reason': 'Archived system journal - may be useful for debugging',
+                'paths': {'linux': ['/var/log/journal']},
+                'patterns': ['*@*.journal', '*@*.journal~'],
+                'min_age_days': 7,
+            },
+        ],
+    },
+    'thumbnails': {
+        'description': 'Image thumbnail caches',
+        'rules': [
+            {
+                'name': 'thumbnails',
+                'category': 'thumbnails',
+                'risk_level': 'low',
+                'reason': 'Thumbnail cache - regenerated on demand',
+                'paths': {
+                    'linux': ['~/.cache/thumbnails', '~/.thumbnails'],
+                    'windows': ['%LOCALAPPDATA%\\Microsoft\\Windows\\Explorer'],
+                },
+            },
+        ],
+    },
+    'trash': {
+        'description': 'Files in the desktop trash',
+        'rules': [
+            {
+                'name': 'trash',
+                'category': 'trash',
+                'risk_level': 'medium',
+                'reason': 'Trashed files - cannot be restored afterwards',
+                'paths': {
+                    'linux': ['~/.local/share/Trash/files', '~/.local/share/Trash/info'],
+                    'darwin': ['~/.Trash'],
+                },
+            },
+        ],
+    },
+}
+
+
+class CompiledRules:
+    """
+    Scan targets of a set of rule packs, resolved for one OS.
+
+    targets maps every expanded root to its scan config (category,
+    risk_level, reason, rule, pack and an optional file_filter). It is
+    built once; a scan walks all roots in one pass and looks rules up per
+    root.
+    """
+
+    def __init__(self, targets: Dict[str, Dict]):
+        self.targets = targets
+
+    def file_filters(self) -> Dict[str, FileFilter]:
+        """File filters of the roots whose rules report individual files."""
+        return {root: config['file_filter'] for root, config in self.targets.items() if config['file_filter']}
+
+
+def load_pack_file(path: str) -> Tuple[str, Dict]:
+    """
+    Read a user rule pack.
+
+    The file holds one pack as JSON, in the shape of a BUILTIN_PACKS entry
+    plus a 'name'. 'paths' may also be a plain list used on every OS.
+
+    Returns:
+        Tuple of (pack name, pack)
+
+    Raises:
+        ValueError: If the file is not a valid rule pack
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            pack = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Cannot read rule pack {path}: {e}")
+    if not isinstance(pack, dict) or not isinstance(pack.get('rules'), list):
+        raise ValueError(f"Rule pack {path} has no 'rules' list")
+    for rule in pack['rules']:
+        missing = [key for key in ('name', 'category', 'risk_level', 'reason', 'paths') if key not in rule]
+        if missing:
+            raise ValueError(f"Rule {rule.get('name', '?')} in {path} lacks {', '.join(missing)}")
+        if rule['risk_level'] not in ('low', 'medium', 'high'):
+            raise ValueError(f"Rule {rule['name']} in {path} has unknown risk level {rule['risk_level']}")
+    return pack.get('name') or os.path.splitext(os.path.basename(path))[0], pack
+
+
+@lru_cache(maxsize=None)
+def compile_packs(os_type: Optional[str] = None, packs: Optional[Tuple[str, ...]] = None,
+                  pack_files: Tuple[str, ...] = ()) -> CompiledRules:
+    """
+    Compile rule packs into scan targets for one OS (cached per argument set).
+
+    Args:
+        os_type: 'linux', 'darwin' or 'windows'; defaults to the running OS
+        packs: Names of built-in packs to use; all of them if None
+        pack_files: Paths of user rule packs (JSON), applied after the built-ins
+
+    Returns:
+        CompiledRules
+
+    Raises:
+        ValueError: For an unknown pack name or an invalid pack file
+    """
+    os_type = os_type or platform.system().lower()
+    names = list(BUILTIN_PACKS) if packs is None else list(packs)
+    unknown = [name for name in names if name not in BUILTIN_PACKS]
+    if unknown:
+        raise ValueError(f"Unknown rule packs: {', '.join(unknown)}")
+
+    selected: List[Tuple[str, Dict]] = [(name, BUILTIN_PACKS[name]) for name in names]
+    selected.extend(load_pack_file(path) for path in pack_files)
+
+    targets: Dict[str, Dict] = {}
+    for pack_name, pack in selected:
+        for rule in pack['rules']:
+            config = _rule_config(pack_name, rule)
+            for root in _rule_roots(rule, os_type):
+                targets.setdefault(root, config)
+    return CompiledRules(targets)
+
+
+def _rule_config(pack_name: str, rule: Dict) -> Dict:
+    """Scan config shared by every root of a rule."""
+    file_filter = None
+    if rule.get('patterns') or rule.get('min_age_days'):
+        file_filter = FileFilter(min_age_days=rule.get('min_age_days', 0),
+                                 patterns=tuple(rule.get('patterns', ())))
+    return {
+        'pack': pack_name,
+        'rule': rule['name'],
+        'category': rule['category'],
+        'risk_level': rule['risk_level'],
+        'reason': rule['reason'],
+        'file_filter': file_filter,
+    }
+
+
+def _rule_roots(rule: Dict, os_type: str) -> Iterable[str]:
+    """Expanded, normalized roots of a rule on one OS."""
+    paths = rule['paths']
+    templates = paths.get(os_type, []) if isinstance(paths, dict) else paths
+    for template in templates:
+        yield os.path.normpath(os.path.expanduser(os.path.expandvars(template)))
@@ -3,10 +3,14 @@ CloudCleaner - Safety Rules Module
 Defines protected paths and validates deletion safety.
 """
 
+from typing import Iterable, List, Optional, Tuple
+from functools import lru_cache
 from pathlib import Path
 import os
 import platform
 
+from .path_matcher import PathMatcher, normalize_path
+
 
 # Safety rules by OS
 SAFETY_RULES = {
@@ -85,7 +89,128 @@ def _expand_path(path: str) -> str:
 
 def _normalize_path(path: str) -> str:
     """Normalize path for comparison."""
-    return os.path.normpath(os.path.abspath(_expand_path(path))).lower()
+    return normalize_path(path)
+
+
+def _resolve_os_type(os_type: Optional[str]) -> str:
+    """Map an OS name to a key of SAFETY_RULES."""
+    if os_type is None:
+        os_type = platform.system().lower()
+    return os_type if os_type in SAFETY_RULES else 'linux'  # Default fallback
+
+
+class RuleSet:
+    """
+    Safety rules and exclusions compiled into path tries.
+
+    Rule paths are expanded and normalized once at construction, so each
+    query costs time proportional to the depth of the queried path.
+    """
+
+    def __init__(self, os_type: Optional[str] = None, exclusions: Optional[Iterable[str]] = None):
+        """
+        Compile rules.
+
+        Args:
+            os_type: Operating system type (windows, darwin, linux)
+            exclusions: User exclusion paths (e.g. from Database.get_exclusions)
+        """
+        self.os_type = _resolve_os_type(os_type)
+        rules = SAFETY_RULES[self.os_type]
+        self.protected = PathMatcher((rule, rule) for rule in rules['never_delete'])
+        self.confirm = PathMatcher((rule, rule) for rule in rules['require_confirmation'])
+        self.excluded = PathMatcher((path, path) for path in exclusions or ())
+
+    def is_protected(self, path: str, normalized: bool = False) -> tuple:
+        """Same contract as is_path_protected()."""
+        above, below = self.protected.lookup(path, normalized)
+        # Deleting a protected path, anything inside it, or any of its parents
+        protected = above or below
+        if protected:
+            return (True, f"Protected system path: {protected}")
+        return (False, "Path is safe to delete")
+
+    def requires_confirmation(self, path: str, normalized: bool = False) -> tuple:
+        """Same contract as requires_confirmation()."""
+        sensitive = self.confirm.match(path, normalized)
+        if sensitive:
+            return (True, f"Sensitive location: {sensitive}")
+        return (False, "No confirmation required")
+
+    def is_excluded(self, path: str, normalized: bool = False) -> tuple:
+        """
+        Check if a path is covered by a user exclusion.
+
+        Returns:
+            Tuple of (is_excluded: bool, reason: str)
+        """
+        exclusion = self.excluded.match(path, normalized)
+        if exclusion:
+            return (True, f"Excluded by user: {exclusion}")
+        return (False, "Not excluded")
+
+    def partition_excluded(self, paths: Iterable[str]) -> Tuple[List[str], List[tuple]]:
+        """
+        Split a batch of paths into allowed and excluded ones.
+
+        A path is excluded if it lies at or below an exclusion, or if a
+        literal exclusion lies inside it.
+
+        Returns:
+            Tuple of (allowed paths, list of (excluded path, reason))
+        """
+        if not self.excluded:
+            return list(paths), []
+        allowed, refused = [], []
+        for path in paths:
+            above, below = self.excluded.lookup(path)
+            if above:
+                refused.append((path, f"Excluded by user: {above}"))
+            elif below:
+                # Deleting the parent would take the excluded path with it
+                refused.append((path, f"Contains excluded path: {below}"))
+            else:
+                allowed.append(path)
+        return allowed, refused
+
+    def validate(self, path: str) -> tuple:
+        """Same contract as validate_deletion_safety(), plus exclusions."""
+        normalized = normalize_path(path)
+
+        is_protected, protected_reason = self.is_protected(normalized, normalized=True)
+        if is_protected:
+            return (False, protected_reason, False)
+
+        is_excluded, excluded_reason = self.is_excluded(normalized, normalized=True)
+        if is_excluded:
+            return (False, excluded_reason, False)
+
+        if os.path.isfile(path) and is_file_locked(path):
+            return (False, "File is currently in use by another process", False)
+
+        needs_confirm, confirm_reason = self.requires_confirmation(normalized, normalized=True)
+        if needs_confirm:
+            return (True, confirm_reason, True)
+
+        return (True, "Safe to delete", False)
+
+    def validate_many(self, paths: Iterable[str]) -> List[tuple]:
+        """
+        Validate a batch of paths against the compiled rules.
+
+        Args:
+            paths: Paths to validate
+
+        Returns:
+            List of (path, is_safe, reason, requires_confirmation) in input order
+        """
+        return [(path, *self.validate(path)) for path in paths]
+
+
+@lru_cache(maxsize=None)
+def get_rule_set(os_type: Optional[str] = None) -> RuleSet:
+    """Get the compiled safety rules for an OS (compiled once per process)."""
+    return RuleSet(_resolve_os_type(os_type))
 
 
 def is_path_protected(path: str, os_type: str = None) -> tuple:
@@ -99,22 +224,7 @@ def is_path_protected(path: str, os_type: str = None) -> tuple:
     Returns:
         Tuple of (is_protected: bool, reason: str)
     """
-    if os_type is None:
-        os_type = platform.system().lower()
-    
-    if os_type not in SAFETY_RULES:
-        os_type = 'linux'  # Default fallback
-    
-    rules = SAFETY_RULES[os_type]
-    normalized_path = _normalize_path(path)
-    
-    # Check never_delete paths
-    for protected in rules['never_delete']:
-        protected_normalized = _normalize_path(protected)
-        if normalized_path.startswith(protected_normalized) or protected_normalized.startswith(normalized_path):
-            return (True, f"Protected system path: {protected}")
-    
-    return (False, "Path is safe to delete")
+    return get_rule_set(_resolve_os_type(os_type)).is_protected(path)
 
 
 def requires_confirmation(path: str, os_type: str = None) -> tuple:
@@ -128,22 +238,7 @@ def requires_confirmation(path: str, os_type: str = None) -> tuple:
     Returns:
         Tuple of (requires_confirmation: bool, reason: str)
     """
-    if os_type is None:
-        os_type = platform.system().lower()
-    
-    if os_type not in SAFETY_RULES:
-        os_type = 'linux'
-    
-    rules = SAFETY_RULES[os_type]
-    normalized_path = _normalize_path(path)
-    
-    # Check require_confirmation paths
-    for sensitive in rules['require_confirmation']:
-        sensitive_normalized = _normalize_path(sensitive)
-        if normalized_path.startswith(sensitive_normalized):
-            return (True, f"Sensitive location: {sensitive}")
-    
-    return (False, "No confirmation required")
+    return get_rule_set(_resolve_os_type(os_type)).requires_confirmation(path)
 
 
 def is_file_locked(path: str) -> bool:
@@ -179,24 +274,21 @@ def validate_deletion_safety(path: str, os_type: str = None) -> tuple:
     Returns:
         Tuple of (is_safe: bool, reason: str, requires_confirmation: bool)
     """
-    if os_type is None:
-        os_type = platform.system().lower()
-    
-    # Check if protected
-    is_protected, protected_reason = is_path_protected(path, os_type)
-    if is_protected:
-        return (False, protected_reason, False)
-    
-    # Check if file is locked
-    if os.path.isfile(path) and is_file_locked(path):
-        return (False, "File is currently in use by another process", False)
-    
-    # Check if confirmation required
-    needs_confirm, confirm_reason = requires_confirmation(path, os_type)
-    if needs_confirm:
-        return (True, confirm_reason, True)
+    return get_rule_set(_resolve_os_type(os_type)).validate(path)
+
+
+def validate_many(paths: Iterable[str], os_type: str = None) -> List[tuple]:
+    """
+    Validate a batch of paths, normalizing each path and rule only once.
     
-    return (True, "Safe to delete", False)
+    Args:
+        paths: Paths to validate
+        os_type: Operating system type
+        
+    Returns:
+        List of (path, is_safe, reason, requires_confirmation) in input order
+    """
+    return get_rule_set(_resolve_os_type(os_type)).validate_many(paths)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,293 @@
+"""
+CloudCleaner - Scan Index Module
+Persistent per-directory size index used to make repeat scans incremental.
+"""
+
+from typing import List, Dict, Optional, NamedTuple, Tuple
+import os
+import sqlite3
+import threading
+
+
+class DirRecord(NamedTuple):
+    """Cached state of one directory from a previous walk."""
+    inode: int
+    mtime_ns: int
+    file_bytes: int  # Files directly inside the directory
+    subdirs: Tuple[str, ...]  # Names of direct subdirectories
+    total_bytes: int  # Aggregate size of the whole subtree
+    file_disk_bytes: int = 0  # Allocated (st_blocks) size of direct files
+    total_disk_bytes: int = 0  # Allocated size of the whole subtree
+
+
+class ScanIndex:
+    """
+    SQLite-backed index of directory sizes keyed on (inode, mtime).
+
+    A directory's mtime only changes when entries are added, removed or
+    renamed inside it, so an unchanged (inode, mtime) pair means its file
+    listing can be reused without a scandir. Subdirectories are still
+    visited (one stat each) because their changes do not bubble up.
+    Files rewritten in place keep the old size until their directory changes.
+
+    A watcher process (see watcher.CacheWatcher) may keep the totals of
+    some roots current between scans; such roots are registered as live,
+    and sizers answer them straight from the index.
+    """
+
+    def __init__(self, index_path: str):
+        """
+        Open or create the index.
+
+        Args:
+            index_path: Path to the index database, normally next to cloudcleaner.db
+        """
+        self.index_path = index_path
+        self.conn = sqlite3.connect(index_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._records: Optional[Dict[str, DirRecord]] = None
+        self._init_schema()
+
+    def _init_schema(self):
+        """Create index table if it doesn't exist."""
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS dir_index (
+                path TEXT PRIMARY KEY,
+                inode INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                file_bytes INTEGER DEFAULT 0,
+                subdirs TEXT,
+                total_bytes INTEGER DEFAULT 0,
+                file_disk_bytes INTEGER DEFAULT 0,
+                total_disk_bytes INTEGER DEFAULT 0
+            )
+        ''')
+        # Indexes created before on-disk accounting lack the disk columns; the
+        # index is only a cache, so drop their rows rather than trust zeros
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(dir_index)')}
+        if 'file_disk_bytes' not in columns:
+            self.conn.execute('DELETE FROM dir_index')
+            for column in ('file_disk_bytes', 'total_disk_bytes'):
+                self.conn.execute(f'ALTER TABLE dir_index ADD COLUMN {column} INTEGER DEFAULT 0')
+        # Roots a running watcher keeps current; complete = every directory watched
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS live_roots (
+                path TEXT PRIMARY KEY,
+                pid INTEGER NOT NULL,
+                complete INTEGER DEFAULT 0
+            )
+        ''')
+        self.conn.commit()
+
+    def load(self) -> Dict[str, DirRecord]:
+        """Load all records into memory (cached for the lifetime of the index)."""
+        with self._lock:
+            if self._records is None:
+                cursor = self.conn.execute('''
+                    SELECT path, inode, mtime_ns, file_bytes, subdirs, total_bytes,
+                           file_disk_bytes, total_disk_bytes
+                    FROM dir_index
+                ''')
+                self._records = {
+                    row[0]: DirRecord(row[1], row[2], row[3],
+                                      tuple(row[4].split('\0')) if row[4] else (), row[5],
+                                      row[6], row[7])
+                    for row in cursor
+                }
+            return self._records
+
+    def get_total(self, path: str) -> Optional[int]:
+        """Return the last known aggregate size of a directory, if indexed."""
+        record = self.load().get(path)
+        return record.total_bytes if record else None
+
+    def get_disk_total(self, path: str) -> Optional[int]:
+        """Return the last known aggregate on-disk size of a directory, if indexed."""
+        record = self.load().get(path)
+        return record.total_disk_bytes if record else None
+
+    def get_record(self, path: str) -> Optional[DirRecord]:
+        """Return the indexed state of a directory, if any."""
+        return self.load().get(path)
+
+    def subtree(self, root: str) -> List[str]:
+        """Indexed directories at or below root, shallowest first."""
+        prefix = root.rstrip(os.sep) + os.sep
+        paths = [path for path in self.load() if path == root or path.startswith(prefix)]
+        paths.sort(key=lambda path: path.count(os.sep))
+        return paths
+
+    def save(self, roots: List[str], visited: Dict[str, DirRecord]):
+        """
+        Replace the indexed state of the given roots with a fresh walk.
+
+        Args:
+            roots: Directories that were walked; stale entries under them are dropped
+            visited: Records for every directory reached during the walk
+        """
+        totals = self._aggregate(visited)
+        records = {
+            path: record._replace(total_bytes=totals[path][0], total_disk_bytes=totals[path][1])
+            for path, record in visited.items()
+        }
+
+        with self._lock:
+            cursor = self.conn.cursor()
+            for root in roots:
+                lower, upper = _subtree_bounds(root)
+                cursor.execute(
+                    'DELETE FROM dir_index WHERE path = ? OR (path >= ? AND path < ?)',
+                    (root, lower, upper)
+                )
+            cursor.executemany('''
+                INSERT OR REPLACE INTO dir_index
+                (path, inode, mtime_ns, file_bytes, subdirs, total_bytes,
+                 file_disk_bytes, total_disk_bytes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                (path, r.inode, r.mtime_ns, r.file_bytes, '\0'.join(r.subdirs), r.total_bytes,
+                 r.file_disk_bytes, r.total_disk_bytes)
+                for path, r in records.items()
+            ))
+            self.conn.commit()
+
+            if self._records is not None:
+                for root in roots:
+                    prefix = root.rstrip(os.sep) + os.sep
+                    for path in [p for p in self._records if p == root or p.startswith(prefix)]:
+                        del self._records[path]
+                self._records.update(records)
+
+    def update_dir(self, path: str, record: DirRecord):
+        """
+        Replace one directory's own listing after its contents changed.
+
+        The directory's total is rebuilt from its files and the indexed
+        totals of its subdirectories, subdirectories no longer listed are
+        dropped along with their subtrees, and the change in total is carried
+        up through every indexed ancestor that lists this directory.
+
+        Args:
+            path: Directory that changed
+            record: Its fresh inode, mtime, file bytes and subdirectory names;
+                the total fields are ignored
+        """
+        records = self.load()
+        with self._lock:
+            cursor = self.conn.cursor()
+            old = records.get(path)
+            if old is not None:
+                for name in set(old.subdirs) - set(record.subdirs):
+                    self._drop(cursor, os.path.join(path, name))
+
+            apparent, disk = record.file_bytes, record.file_disk_bytes
+            for name in record.subdirs:
+                child = records.get(os.path.join(path, name))
+                if child:
+                    apparent += child.total_bytes
+                    disk += child.total_disk_bytes
+            changed = {path: record._replace(total_bytes=apparent, total_disk_bytes=disk)}
+            delta = apparent - (old.total_bytes if old else 0)
+            disk_delta = disk - (old.total_disk_bytes if old else 0)
+
+            child = path
+            parent = os.path.dirname(path)
+            while (delta or disk_delta) and parent != child:
+                parent_record = records.get(parent)
+                if parent_record is None or os.path.basename(child) not in parent_record.subdirs:
+                    break
+                changed[parent] = parent_record._replace(
+                    total_bytes=parent_record.total_bytes + delta,
+                    total_disk_bytes=parent_record.total_disk_bytes + disk_delta
+                )
+                child, parent = parent, os.path.dirname(parent)
+
+            records.update(changed)
+            cursor.executemany('''
+                INSERT OR REPLACE INTO dir_index
+                (path, inode, mtime_ns, file_bytes, subdirs, total_bytes,
+                 file_disk_bytes, total_disk_bytes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                (p, r.inode, r.mtime_ns, r.file_bytes, '\0'.join(r.subdirs), r.total_bytes,
+                 r.file_disk_bytes, r.total_disk_bytes)
+                for p, r in changed.items()
+            ))
+            self.conn.commit()
+
+    def _drop(self, cursor: sqlite3.Cursor, root: str):
+        """Remove a directory and its subtree from the index (lock held)."""
+        lower, upper = _subtree_bounds(root)
+        cursor.execute('DELETE FROM dir_index WHERE path = ? OR (path >= ? AND path < ?)',
+                       (root, lower, upper))
+        prefix = root.rstrip(os.sep) + os.sep
+        for path in [p for p in self._records if p == root or p.startswith(prefix)]:
+            del self._records[path]
+
+    def set_live(self, root: str, complete: bool):
+        """Register this process as keeping a root's totals current."""
+        with self._lock:
+            self.conn.execute('INSERT OR REPLACE INTO live_roots (path, pid, complete) VALUES (?, ?, ?)',
+                              (root, os.getpid(), int(complete)))
+            self.conn.commit()
+
+    def clear_live(self, root: str):
+        """Withdraw a root registered with set_live."""
+        with self._lock:
+            self.conn.execute('DELETE FROM live_roots WHERE path = ?', (root,))
+            self.conn.commit()
+
+    def is_live(self, path: str) -> bool:
+        """
+        Check whether a running watcher keeps a path's indexed total current.
+
+        True only if the path is indexed and lies under a root whose watcher
+        process is alive and watches every directory of it.
+        """
+        if path not in self.load():
+            return False
+        with self._lock:
+            rows = self.conn.execute('SELECT path, pid FROM live_roots WHERE complete = 1').fetchall()
+        for root, pid in rows:
+            if (path == root or path.startswith(root.rstrip(os.sep) + os.sep)) and _process_alive(pid):
+                return True
+        return False
+
+    @staticmethod
+    def _aggregate(visited: Dict[str, DirRecord]) -> Dict[str, Tuple[int, int]]:
+        """Compute (apparent, on-disk) subtree totals bottom-up from per-directory file bytes."""
+        totals: Dict[str, Tuple[int, int]] = {}
+        # Children always have longer paths than their parents
+        for path in sorted(visited, key=len, reverse=True):
+            record = visited[path]
+            apparent, disk = record.file_bytes, record.file_disk_bytes
+            for name in record.subdirs:
+                child = totals.get(os.path.join(path, name))
+                if child:
+                    apparent += child[0]
+                    disk += child[1]
+            totals[path] = (apparent, disk)
+        return totals
+
+    def close(self):
+        """Close index connection."""
+        self.conn.close()
+
+
+def _process_alive(pid: int) -> bool:
+    """Check whether a process exists (POSIX; watchers only run on Linux)."""
+    if os.name != 'posix':
+        return False  # os.kill would terminate the process on Windows
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _subtree_bounds(root: str) -> Tuple[str, str]:
+    """String range covering every path strictly below root."""
+    prefix = root.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
@@ -0,0 +1,349 @@
+"""
+CloudCleaner - Watcher Module
+Keeps the scan index current between scans with inotify watches (Linux only).
+"""
+
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+
+from .dir_sizer import DirSizer, disk_usage, _outermost
+from .fd_walk import scan_dir
+from .io_throttle import IOThrottle
+from .scan_index import DirRecord, ScanIndex
+
+
+HAS_INOTIFY = sys.platform.startswith('linux')
+
+# inotify event bits (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+
+# struct inotify_event header: wd, mask, cookie, name length
+_EVENT = struct.Struct('iIII')
+
+# Default cap on watches; never more than half the per-user kernel limit,
+# which other applications (editors, file managers) share
+DEFAULT_WATCH_BUDGET = 8192
+
+# Events are collected this long before being applied, so a burst of
+# writes into one directory costs a single rescan of it
+SETTLE_SECONDS = 0.5
+
+# How often a blocked watcher checks whether it should stop
+POLL_INTERVAL = 0.5
+
+
+class _Inotify:
+    """Minimal ctypes binding of one inotify instance."""
+
+    _libc = None
+
+    def __init__(self):
+        if _Inotify._libc is None:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+            _Inotify._libc = libc
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+
+    def add_watch(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code), path)
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self) -> List[Tuple[int, int, str]]:
+        """Drain pending events as (wd, mask, name) tuples."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _RootWatch:
+    """Watches of one root, on an inotify instance of its own."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.inotify = _Inotify()
+        self.paths: Dict[int, str] = {}
+        self.wds: Dict[str, int] = {}
+        # False once the budget ran out: parts of the tree go unwatched
+        self.complete = True
+
+
+class CacheWatcher:
+    """
+    Applies filesystem changes under scan roots to the scan index as they happen.
+
+    Every indexed directory under the roots gets an inotify watch, shallowest
+    first, until the watch budget runs out. A change inside a watched
+    directory re-lists just that directory's files and carries the size
+    difference up through its ancestors (ScanIndex.update_dir); a new
+    subdirectory is sized and watched. Each root has its own inotify queue,
+    so when one overflows only that root is rescanned, through the index, which
+    re-lists only directories whose mtime changed.
+
+    While running, fully watched roots are registered as live in the index,
+    and sizers answer them from it without walking. Re-listed directories
+    count every hardlink; files rewritten in place while a queue overflowed
+    keep their old size until their directory is next listed.
+    """
+
+    def __init__(self, index: ScanIndex, roots: List[str], max_watches: int = DEFAULT_WATCH_BUDGET,
+                 throttle: Optional[IOThrottle] = None):
+        """
+        Initialize watcher.
+
+        Args:
+            index: Scan index to keep current
+            roots: Directories to watch (normalized absolute paths)
+            max_watches: Watch budget shared by all roots
+            throttle: Paces the walks that (re)index whole subtrees
+        """
+        self.index = index
+        self.roots = _outermost(list(dict.fromkeys(roots)))
+        self.max_watches = min(max_watches, _kernel_watch_limit() // 2 or max_watches)
+        # Must walk for real; answering from the index would read back its own state
+        self.sizer = DirSizer(index=index, throttle=throttle, live=False)
+        self.watch_count = 0
+        self._states: Dict[int, _RootWatch] = {}
+
+    def start(self) -> Dict:
+        """
+        Index the roots, add watches and register the roots as live.
+
+        Returns:
+            Dict with watched roots, watch count and whether every directory is watched
+        """
+        if not HAS_INOTIFY:
+            raise OSError(errno.ENOSYS, 'inotify is only available on Linux')
+        roots = [root for root in self.roots if os.path.isdir(root)]
+        self.sizer.get_sizes(roots)
+        for root in roots:
+            state = _RootWatch(root)
+            self._states[state.inotify.fd] = state
+            self._watch_subtree(state, root)
+        # Changes made while the watches were going up are picked up here
+        self.sizer.get_sizes(roots)
+        for state in self._states.values():
+            self.index.set_live(state.root, state.complete)
+        return self.status()
+
+    def status(self) -> Dict:
+        """Current watch coverage and indexed totals of the roots."""
+        return {
+            'roots': [
+                {
+                    'path': state.root,
+                    'size_bytes': self.index.get_total(state.root) or 0,
+                    'disk_size_bytes': self.index.get_disk_total(state.root) or 0,
+                    'complete': state.complete
+                }
+                for state in self._states.values()
+            ],
+            'watches': self.watch_count,
+            'max_watches': self.max_watches
+        }
+
+    def run(self, stop: threading.Event, on_change: Optional[Callable[[Dict], None]] = None):
+        """
+        Apply changes until stop is set, then withdraw the watches.
+
+        Args:
+            stop: Event that ends the watcher
+            on_change: Called with status() whenever a batch of events changed it
+        """
+        poller = select.poll()
+        for fd in self._states:
+            poller.register(fd, select.POLLIN)
+        last = self.status()
+        try:
+            while not stop.is_set():
+                if not poller.poll(POLL_INTERVAL * 1000):
+                    continue
+                stop.wait(SETTLE_SECONDS)
+                for state in self._states.values():
+                    events = state.inotify.read()
+                    if events:
+                        self._apply(state, events)
+                status = self.status()
+                if on_change and status != last:
+                    on_change(status)
+                last = status
+        finally:
+            self.close()
+
+    def close(self):
+        """Unregister the live roots and release the inotify instances."""
+        for state in self._states.values():
+            self.index.clear_live(state.root)
+            state.inotify.close()
+        self._states.clear()
+        self.watch_count = 0
+
+    def _apply(self, state: _RootWatch, events: List[Tuple[int, int, str]]):
+        """Bring the index in line with one root's batch of events."""
+        dirty: Set[str] = set()
+        created: Set[str] = set()
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                self._rescan(state)
+                return
+            path = state.paths.get(wd)
+            if path is None:
+                continue
+            if mask & IN_IGNORED:
+                self._forget(state, wd)
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if path == state.root:
+                    # The root itself went away; nothing below it is valid
+                    self._rescan(state)
+                    return
+                continue  # The parent's event drops it from the index
+            child = os.path.join(path, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    created.add(child)
+                elif mask & IN_MOVED_FROM:
+                    # Watches follow a moved directory out of the tree
+                    self._unwatch_subtree(state, child)
+            dirty.add(path)
+
+        new_trees = [path for path in _outermost(list(created)) if os.path.isdir(path)]
+        if new_trees:
+            # Sized before their parents are re-listed, so parent totals include them
+            self.sizer.get_sizes(new_trees)
+            for path in new_trees:
+                self._watch_subtree(state, path)
+            # Files added while the watches were going up
+            self.sizer.get_sizes(new_trees)
+        for path in sorted(dirty, key=lambda p: p.count(os.sep), reverse=True):
+            self._refresh(path)
+        if not state.complete:
+            self.index.set_live(state.root, False)
+
+    def _refresh(self, path: str):
+        """Re-list one directory's files and update its index entry."""
+        try:
+            st = os.stat(path, follow_symlinks=False)
+            file_bytes = 0
+            file_disk_bytes = 0
+            subdirs = []
+            with scan_dir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file(follow_symlinks=False):
+                            entry_st = entry.stat(follow_symlinks=False)
+                            file_bytes += entry_st.st_size
+                            file_disk_bytes += disk_usage(entry_st)
+                        elif entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                    except (PermissionError, OSError):
+                        continue
+        except (PermissionError, OSError):
+            return  # Gone; its parent's listing drops it
+        self.index.update_dir(path, DirRecord(st.st_ino, st.st_mtime_ns, file_bytes, tuple(subdirs), 0,
+                                              file_disk_bytes, 0))
+
+    def _rescan(self, state: _RootWatch):
+        """Re-index a root whose events were lost and resync its watches."""
+        self.index.set_live(state.root, False)
+        if not os.path.isdir(state.root):
+            return
+        self.sizer.get_sizes([state.root])
+        indexed = set(self.index.subtree(state.root))
+        for path in [path for path in state.wds if path not in indexed]:
+            self._unwatch(state, path)
+        state.complete = True
+        self._watch_subtree(state, state.root)
+        self.index.set_live(state.root, state.complete)
+
+    def _watch_subtree(self, state: _RootWatch, top: str):
+        """Watch indexed directories at and below top until the budget runs out."""
+        for path in self.index.subtree(top):
+            if path in state.wds:
+                continue
+            if self.watch_count >= self.max_watches:
+                state.complete = False
+                return
+            try:
+                wd = state.inotify.add_watch(path)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    # Kernel limit reached by other watchers
+                    state.complete = False
+                    return
+                continue  # Vanished or unreadable
+            state.paths[wd] = path
+            state.wds[path] = wd
+            self.watch_count += 1
+
+    def _unwatch_subtree(self, state: _RootWatch, top: str):
+        prefix = top.rstrip(os.sep) + os.sep
+        for path in [path for path in state.wds if path == top or path.startswith(prefix)]:
+            self._unwatch(state, path)
+
+    def _unwatch(self, state: _RootWatch, path: str):
+        wd = state.wds.get(path)
+        if wd is not None:
+            state.inotify.rm_watch(wd)
+            self._forget(state, wd)
+
+    def _forget(self, state: _RootWatch, wd: int):
+        path = state.paths.pop(wd, None)
+        if path is not None:
+            del state.wds[path]
+            self.watch_count -= 1
+
+
+def _kernel_watch_limit() -> int:
+    """Per-user inotify watch limit, or 0 if unknown."""
+    try:
+        with open('/proc/sys/fs/inotify/max_user_watches', 'r') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
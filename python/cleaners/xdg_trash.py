@@ -0,0 +1,283 @@
+"""
+CloudCleaner - XDG Trash Module
+Batched freedesktop.org trash (Trash specification 1.0) for Linux and other free desktops.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from urllib.parse import quote
+import errno
+import os
+import shutil
+import stat
+import sys
+import time
+
+from .devices import device_root
+from .fd_walk import remove_tree
+
+
+HAS_XDG_TRASH = os.name == 'posix' and sys.platform != 'darwin'
+
+_INFO_TEMPLATE = '[Trash Info]\nPath={path}\nDeletionDate={date}\n'
+
+
+@dataclass
+class TrashResult:
+    """Outcome of trashing a batch of paths."""
+    trashed: List[str] = field(default_factory=list)  # Renamed into a trash on their own filesystem
+    copied: List[str] = field(default_factory=list)  # Copied into the home trash, then deleted
+    errors: List[Tuple[str, str]] = field(default_factory=list)  # (path, reason)
+
+    def to_dict(self) -> dict:
+        return {
+            'trashed': self.trashed,
+            'copied': self.copied,
+            'errors': [{'path': path, 'error': error} for path, error in self.errors]
+        }
+
+
+class _Slot:
+    """A claimed name in a trash directory: the .trashinfo exists, the move is pending."""
+
+    __slots__ = ('path', 'trash', 'name')
+
+    def __init__(self, path: str, trash: str, name: str):
+        self.path = path
+        self.trash = trash
+        self.name = name
+
+    @property
+    def info_path(self) -> str:
+        return os.path.join(self.trash, 'info', self.name + '.trashinfo')
+
+    @property
+    def files_path(self) -> str:
+        return os.path.join(self.trash, 'files', self.name)
+
+
+class XdgTrash:
+    """
+    Moves paths to the desktop trash, a whole batch at a time.
+
+    Each path goes to the trash of its own filesystem, so it is moved by a
+    single rename: the home trash ($XDG_DATA_HOME/Trash) when it shares the
+    device, otherwise $topdir/.Trash/$uid (if the administrator provided a
+    sticky .Trash) or $topdir/.Trash-$uid. The .trashinfo files of the batch
+    are written first, each claiming its name with O_EXCL as the
+    specification requires, then all renames follow. Only a path with no
+    usable trash on its filesystem is copied into the home trash and then
+    deleted. File managers list, restore and empty the result as usual.
+    """
+
+    def __init__(self, data_home: Optional[str] = None):
+        """
+        Initialize trash.
+
+        Args:
+            data_home: Base of the home trash (default $XDG_DATA_HOME or ~/.local/share)
+        """
+        data_home = data_home or os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+        self.home_trash = os.path.join(data_home, 'Trash')
+        self.uid = os.getuid()
+        # Device -> (trash directory, topdir its Path= entries are relative to, or None if absolute)
+        self._trashes: Dict[int, Optional[Tuple[str, Optional[str]]]] = {}
+
+    def trash(self, paths: List[str],
+              on_copy_progress: Optional[Callable[[str, int, int], None]] = None) -> TrashResult:
+        """
+        Move paths to the trash.
+
+        Args:
+            paths: Files and directories to trash
+            on_copy_progress: Called with (path, bytes copied, bytes total)
+                while a path without a same-device trash is copied
+
+        Returns:
+            TrashResult
+        """
+        result = TrashResult()
+        date = time.strftime('%Y-%m-%dT%H:%M:%S')
+        renames: List[_Slot] = []
+        copies: List[_Slot] = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                device = os.stat(path, follow_symlinks=False).st_dev
+                target = self._trash_for(path, device)
+                if target is None:
+                    slot = self._claim(path, self.home_trash, None, date)
+                    copies.append(slot)
+                else:
+                    renames.append(self._claim(path, target[0], target[1], date))
+            except OSError as e:
+                result.errors.append((path, e.strerror or str(e)))
+
+        for slot in renames:
+            try:
+                os.rename(slot.path, slot.files_path)
+            except OSError as e:
+                if e.errno == errno.EXDEV:
+                    copies.append(slot)  # A bind mount or similar hid the device boundary
+                    continue
+                _unlink(slot.info_path)
+                result.errors.append((slot.path, e.strerror or str(e)))
+                continue
+            result.trashed.append(slot.path)
+
+        for slot in copies:
+            if slot.trash != self.home_trash:
+                # Re-claim in the home trash, where the copy goes
+                _unlink(slot.info_path)
+                try:
+                    slot = self._claim(slot.path, self.home_trash, None, date)
+                except OSError as e:
+                    result.errors.append((slot.path, e.strerror or str(e)))
+                    continue
+            error = self._copy(slot, on_copy_progress)
+            if error:
+                result.errors.append((slot.path, error))
+            else:
+                result.copied.append(slot.path)
+        return result
+
+    def _trash_for(self, path: str, device: int) -> Optional[Tuple[str, Optional[str]]]:
+        """Trash directory on a path's own filesystem, created on first use; None if there is none."""
+        if device in self._trashes:
+            return self._trashes[device]
+        target = None
+        if _prepare_trash(self.home_trash) and os.stat(self.home_trash).st_dev == device:
+            target = (self.home_trash, None)
+        else:
+            topdir = device_root(path)
+            admin_trash = os.path.join(topdir, '.Trash')
+            for candidate in (os.path.join(admin_trash, str(self.uid)), os.path.join(topdir, f'.Trash-{self.uid}')):
+                if candidate.startswith(admin_trash + os.sep) and not _valid_admin_trash(admin_trash):
+                    continue
+                if _prepare_trash(candidate) and _private_dir(candidate, self.uid, device):
+                    target = (candidate, topdir)
+                    break
+        self._trashes[device] = target
+        return target
+
+    def _claim(self, path: str, trash: str, topdir: Optional[str], date: str) -> _Slot:
+        """Write the .trashinfo of a path under a name no other entry uses."""
+        if not _prepare_trash(trash):
+            raise OSError(errno.EACCES, 'Cannot create the trash directory', trash)
+        base = os.path.basename(path.rstrip(os.sep)) or 'root'
+        stored = os.path.relpath(path, topdir) if topdir else path
+        info = _INFO_TEMPLATE.format(path=quote(stored, safe='/'), date=date).encode('utf-8')
+        for attempt in range(1, 10000):
+            name = base if attempt == 1 else f'{base}.{attempt}'
+            slot = _Slot(path, trash, name)
+            if os.path.lexists(slot.files_path):
+                continue
+            try:
+                fd = os.open(slot.info_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                continue
+            try:
+                os.write(fd, info)
+            finally:
+                os.close(fd)
+            return slot
+        raise OSError(errno.EEXIST, 'No free name in the trash', path)
+
+    def _copy(self, slot: _Slot, on_progress: Optional[Callable[[str, int, int], None]]) -> Optional[str]:
+        """Copy a path into the trash, then delete the original; an error message on failure."""
+        total = _tree_size(slot.path)
+        copied = 0
+
+        def copy_file(source, destination, *, follow_symlinks=True):
+            nonlocal copied
+            shutil.copy2(source, destination, follow_symlinks=follow_symlinks)
+            copied += os.stat(source, follow_symlinks=False).st_size
+            if on_progress:
+                on_progress(slot.path, copied, total)
+            return destination
+
+        try:
+            if os.path.isdir(slot.path) and not os.path.islink(slot.path):
+                shutil.copytree(slot.path, slot.files_path, symlinks=True, copy_function=copy_file)
+            else:
+                copy_file(slot.path, slot.files_path, follow_symlinks=False)
+        except (OSError, shutil.Error) as e:
+            # Never leave a half copy that looks like a complete trash entry
+            if os.path.isdir(slot.files_path) and not os.path.islink(slot.files_path):
+                remove_tree(slot.files_path)
+            else:
+                _unlink(slot.files_path)
+            _unlink(slot.info_path)
+            return f'Copy to trash failed: {e}'
+
+        if os.path.isdir(slot.path) and not os.path.islink(slot.path):
+            failures = remove_tree(slot.path)
+        else:
+            try:
+                os.unlink(slot.path)
+                failures = []
+            except OSError as e:
+                failures = [(slot.path, e)]
+        if failures:
+            failed_path, error = failures[0]
+            return f'Copied to trash, but {len(failures)} entries could not be deleted ({failed_path}: {error.strerror})'
+        return None
+
+
+def _prepare_trash(trash: str) -> bool:
+    """Create a trash directory with its files/ and info/ subdirectories."""
+    try:
+        for sub in ('files', 'info'):
+            os.makedirs(os.path.join(trash, sub), mode=0o700, exist_ok=True)
+        return True
+    except OSError:
+        return False
+
+
+def _valid_admin_trash(path: str) -> bool:
+    """An administrator-created $topdir/.Trash must be a real, sticky directory."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISDIR(st.st_mode) and bool(st.st_mode & stat.S_ISVTX)
+
+
+def _private_dir(path: str, uid: int, device: int) -> bool:
+    """A per-user trash must be a real directory owned by the user on the expected device."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISDIR(st.st_mode) and st.st_uid == uid and st.st_dev == device
+
+
+def _tree_size(path: str) -> int:
+    """Apparent size of a file or tree, for copy progress."""
+    if not os.path.isdir(path) or os.path.islink(path):
+        try:
+            return os.lstat(path).st_size
+        except OSError:
+            return 0
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+if __name__ == '__main__':
+    # Quick test
+    import json
+    trash = XdgTrash()
+    print(json.dumps(trash.trash(sys.argv[1:]).to_dict(), indent=2))
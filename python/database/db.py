@@ -6,11 +6,15 @@ SQLite database for scan history and user preferences.
 import sqlite3
 import json
 import os
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 from dataclasses import asdict
 from pathlib import Path
 
 
+# Scans whose per-item sizes are kept for cleanup; older ones are dropped
+SCAN_ITEM_RETENTION = 5
+
+
 class Database:
     """SQLite database manager for CloudCleaner."""
 
@@ -86,31 +90,83 @@ class Database:
                 added_at TEXT DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+
+        # Resume state of partial (cancelled) scans
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_checkpoints (
+                scan_id INTEGER PRIMARY KEY,
+                saved_at TEXT NOT NULL,
+                state TEXT NOT NULL,
+                FOREIGN KEY (scan_id) REFERENCES scan_history(id)
+            )
+        ''')
+
+        # Items a partial scan had found, re-emitted when it is resumed
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_checkpoint_items (
+                scan_id INTEGER NOT NULL,
+                item TEXT NOT NULL,
+                FOREIGN KEY (scan_id) REFERENCES scan_history(id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS scan_checkpoint_items_scan ON scan_checkpoint_items (scan_id)')
+
+        # Directory items of recent scans, with the fingerprint they were sized at
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_items (
+                scan_id INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                disk_bytes INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                PRIMARY KEY (scan_id, path),
+                FOREIGN KEY (scan_id) REFERENCES scan_history(id)
+            )
+        ''')
+
+        # Columns added after the first release
+        self._add_column(cursor, 'scan_history', 'total_disk_bytes', 'INTEGER DEFAULT 0')
+        self._add_column(cursor, 'cleanup_history', 'disk_bytes_freed', 'INTEGER DEFAULT 0')
         
         self.conn.commit()
 
+    @staticmethod
+    def _add_column(cursor: sqlite3.Cursor, table: str, column: str, definition: str):
+        """Add a column to an existing table unless it is already there."""
+        cursor.execute(f'PRAGMA table_info({table})')
+        if column not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
     def add_scan(self, 
                  scan_type: str,
                  total_items: int,
                  total_size_bytes: int,
                  duration_seconds: float,
                  scan_data: Optional[Dict] = None,
-                 status: str = 'completed') -> int:
+                 status: str = 'completed',
+                 total_disk_bytes: int = 0) -> int:
         """
         Add a scan record to history.
         
+        Args:
+            total_size_bytes: Apparent size of everything found
+            total_disk_bytes: Space it occupies on disk (allocated blocks)
+        
         Returns:
             The ID of the inserted scan record.
         """
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO scan_history 
-            (timestamp, scan_type, total_items, total_size_bytes, duration_seconds, status, scan_data)
-            VALUES (datetime('now'), ?, ?, ?, ?, ?, ?)
+            (timestamp, scan_type, total_items, total_size_bytes, total_disk_bytes,
+             duration_seconds, status, scan_data)
+            VALUES (datetime('now'), ?, ?, ?, ?, ?, ?, ?)
         ''', (
             scan_type,
             total_items,
             total_size_bytes,
+            total_disk_bytes,
             duration_seconds,
             status,
             json.dumps(scan_data) if scan_data else None
@@ -118,39 +174,172 @@ class Database:
         self.conn.commit()
         return cursor.lastrowid
 
+    def update_scan(self,
+                    scan_id: int,
+                    total_items: int,
+                    total_size_bytes: int,
+                    duration_seconds: float,
+                    scan_data: Optional[Dict] = None,
+                    status: str = 'completed',
+                    total_disk_bytes: int = 0):
+        """Overwrite the results of an existing scan record (e.g. a resumed scan)."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            UPDATE scan_history
+            SET timestamp = datetime('now'), total_items = ?, total_size_bytes = ?,
+                total_disk_bytes = ?, duration_seconds = ?, status = ?, scan_data = ?
+            WHERE id = ?
+        ''', (
+            total_items,
+            total_size_bytes,
+            total_disk_bytes,
+            duration_seconds,
+            status,
+            json.dumps(scan_data) if scan_data else None,
+            scan_id
+        ))
+        self.conn.commit()
+
+    def get_scan(self, scan_id: int) -> Optional[Dict]:
+        """Get one scan record, or None if it does not exist."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id, timestamp, scan_type, total_items, total_size_bytes,
+                   total_disk_bytes, duration_seconds, status
+            FROM scan_history
+            WHERE id = ?
+        ''', (scan_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def save_checkpoint(self, scan_id: int, state: Dict, items: Iterable[Dict] = ()):
+        """
+        Store the resume state of a partial scan, replacing any earlier one.
+
+        Args:
+            scan_id: Scan the checkpoint belongs to
+            state: JSON-serializable walk state
+            items: Items found so far, as dicts; consumed one at a time, so
+                they can be streamed from wherever the scan keeps them
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO scan_checkpoints (scan_id, saved_at, state)
+            VALUES (?, datetime('now'), ?)
+        ''', (scan_id, json.dumps(state)))
+        cursor.execute('DELETE FROM scan_checkpoint_items WHERE scan_id = ?', (scan_id,))
+        cursor.executemany('INSERT INTO scan_checkpoint_items (scan_id, item) VALUES (?, ?)',
+                           ((scan_id, json.dumps(item)) for item in items))
+        self.conn.commit()
+
+    def get_checkpoint(self, scan_id: int) -> Optional[Dict]:
+        """Get the resume state of a partial scan."""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT state FROM scan_checkpoints WHERE scan_id = ?', (scan_id,))
+        row = cursor.fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_checkpoint_items(self, scan_id: int) -> Iterator[Dict]:
+        """Yield the items saved with a partial scan's checkpoint, in the order they were saved."""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT item FROM scan_checkpoint_items WHERE scan_id = ? ORDER BY rowid', (scan_id,))
+        for row in cursor:
+            yield json.loads(row[0])
+
+    def delete_checkpoint(self, scan_id: int):
+        """Drop the resume state of a scan once it has completed."""
+        cursor = self.conn.cursor()
+        cursor.execute('DELETE FROM scan_checkpoints WHERE scan_id = ?', (scan_id,))
+        cursor.execute('DELETE FROM scan_checkpoint_items WHERE scan_id = ?', (scan_id,))
+        self.conn.commit()
+
+    def save_scan_items(self, scan_id: int, items: Iterable[Tuple[str, int, int, int, int]]):
+        """
+        Store the sizes a scan measured, replacing any earlier ones of that scan.
+
+        Args:
+            scan_id: Scan the items belong to
+            items: (path, size_bytes, disk_bytes, inode, mtime_ns) tuples
+
+        Only the newest SCAN_ITEM_RETENTION scans keep their items.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('DELETE FROM scan_items WHERE scan_id = ?', (scan_id,))
+        cursor.executemany('''
+            INSERT OR REPLACE INTO scan_items (scan_id, path, size_bytes, disk_bytes, inode, mtime_ns)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', ((scan_id,) + tuple(item) for item in items))
+        cursor.execute('''
+            DELETE FROM scan_items WHERE scan_id NOT IN (
+                SELECT DISTINCT scan_id FROM scan_items ORDER BY scan_id DESC LIMIT ?
+            )
+        ''', (SCAN_ITEM_RETENTION,))
+        self.conn.commit()
+
+    def get_scan_items(self, scan_id: int, paths: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Get the recorded size and fingerprint of the given paths a scan measured (all of them if None)."""
+        cursor = self.conn.cursor()
+        query = 'SELECT path, size_bytes, disk_bytes, inode, mtime_ns FROM scan_items WHERE scan_id = ?'
+        if paths is None:
+            cursor.execute(query, (scan_id,))
+            return {row['path']: dict(row) for row in cursor.fetchall()}
+        items = {}
+        # Bound the number of SQL parameters per query
+        for start in range(0, len(paths), 500):
+            chunk = paths[start:start + 500]
+            cursor.execute(f"{query} AND path IN ({', '.join('?' * len(chunk))})", [scan_id] + chunk)
+            items.update((row['path'], dict(row)) for row in cursor.fetchall())
+        return items
+
     def add_cleanup(self,
                     scan_id: Optional[int],
                     items_deleted: int,
                     items_failed: int,
                     bytes_freed: int,
-                    deleted_paths: Optional[List[str]] = None) -> int:
+                    deleted_paths: Optional[List[str]] = None,
+                    disk_bytes_freed: int = 0) -> int:
         """
         Add a cleanup record to history.
         
+        Args:
+            bytes_freed: Apparent size of what was deleted
+            disk_bytes_freed: Disk space actually released (allocated blocks)
+        
         Returns:
             The ID of the inserted cleanup record.
         """
         cursor = self.conn.cursor()
         cursor.execute('''
             INSERT INTO cleanup_history
-            (scan_id, timestamp, items_deleted, items_failed, bytes_freed, deleted_paths)
-            VALUES (?, datetime('now'), ?, ?, ?, ?)
+            (scan_id, timestamp, items_deleted, items_failed, bytes_freed, disk_bytes_freed, deleted_paths)
+            VALUES (?, datetime('now'), ?, ?, ?, ?, ?)
         ''', (
             scan_id,
             items_deleted,
             items_failed,
             bytes_freed,
+            disk_bytes_freed,
             json.dumps(deleted_paths) if deleted_paths else None
         ))
         self.conn.commit()
         return cursor.lastrowid
 
+    def add_cleanup_freed(self, cleanup_id: int, bytes_freed: int, disk_bytes_freed: int = 0):
+        """Add space freed later to a cleanup record, e.g. when its quarantined items are purged."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            UPDATE cleanup_history
+            SET bytes_freed = bytes_freed + ?, disk_bytes_freed = disk_bytes_freed + ?
+            WHERE id = ?
+        ''', (bytes_freed, disk_bytes_freed, cleanup_id))
+        self.conn.commit()
+
     def get_scan_history(self, limit: int = 50) -> List[Dict]:
         """Get recent scan history."""
         cursor = self.conn.cursor()
         cursor.execute('''
             SELECT id, timestamp, scan_type, total_items, total_size_bytes, 
-                   duration_seconds, status
+                   total_disk_bytes, duration_seconds, status
             FROM scan_history
             ORDER BY timestamp DESC
             LIMIT ?
@@ -162,7 +351,8 @@ class Database:
         """Get recent cleanup history."""
         cursor = self.conn.cursor()
         cursor.execute('''
-            SELECT id, scan_id, timestamp, items_deleted, items_failed, bytes_freed
+            SELECT id, scan_id, timestamp, items_deleted, items_failed, bytes_freed,
+                   disk_bytes_freed
             FROM cleanup_history
             ORDER BY timestamp DESC
             LIMIT ?
@@ -180,18 +370,21 @@ class Database:
         
         # Total cleanups and bytes freed
         cursor.execute('''
-            SELECT COUNT(*), COALESCE(SUM(bytes_freed), 0), COALESCE(SUM(items_deleted), 0)
+            SELECT COUNT(*), COALESCE(SUM(bytes_freed), 0), COALESCE(SUM(items_deleted), 0),
+                   COALESCE(SUM(disk_bytes_freed), 0)
             FROM cleanup_history
         ''')
         row = cursor.fetchone()
         total_cleanups = row[0]
         total_bytes_freed = row[1]
         total_items_cleaned = row[2]
+        total_disk_bytes_freed = row[3]
         
         return {
             'total_scans': total_scans,
             'total_cleanups': total_cleanups,
             'total_bytes_freed': total_bytes_freed,
+            'total_disk_bytes_freed': total_disk_bytes_freed,
             'total_items_cleaned': total_items_cleaned
         }
 
@@ -7,14 +7,22 @@ Integrates with database for persistent history.
 
 import argparse
 import json
+import signal
+import subprocess
 import sys
 import os
+import threading
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import psutil
-from cleaners import CacheScanner, Cleaner
+from cleaners import ArtifactFinder, CacheScanner, Cleaner, DirSizer, DuplicateFinder, FileFilter, IOThrottle, ScanIndex
+from cleaners.cache_scanner import FileItem, ItemRuns
+from cleaners.io_throttle import lower_priority
+from cleaners.quarantine import DEFAULT_RETENTION_DAYS, Quarantine
+from cleaners.watcher import DEFAULT_WATCH_BUDGET, CacheWatcher
+from cleaners.rule_packs import BUILTIN_PACKS
 from database import get_database
 from security import SecurityScanner
 from performance import PerformanceDiagnoser
@@ -29,7 +37,13 @@ def main():
     # Commands
     parser.add_argument('--scan', action='store_true', help='Run cache/junk scan')
     parser.add_argument('--clean', action='store_true', help='Execute cleanup')
+    parser.add_argument('--preview', action='store_true', help='Show what --clean would free (with --items)')
+    parser.add_argument('--undo', type=int, metavar='CLEANUP_ID', help='Restore what a --quarantine cleanup moved away')
+    parser.add_argument('--purge-quarantine', action='store_true',
+                        help='Delete quarantined data past the retention window or under disk pressure')
     parser.add_argument('--quick', action='store_true', help='Quick scan mode')
+    parser.add_argument('--time-budget', type=float, metavar='SECONDS',
+                        help='Time limit for --quick; sizes not walked in time are estimated (default: 2)')
     parser.add_argument('--history', action='store_true', help='Show scan/cleanup history')
     parser.add_argument('--stats', action='store_true', help='Show aggregate statistics')
     
@@ -47,16 +61,65 @@ def main():
     
     # Options
     parser.add_argument('--items', type=str, help='JSON list of paths to clean (for --clean)')
+    parser.add_argument('--items-file', metavar='FILE',
+                        help='NDJSON paths to clean, one JSON string or {"path": ...} per line; - reads stdin')
     parser.add_argument('--output', choices=['json', 'text'], default='text', help='Output format')
     parser.add_argument('--use-trash', action='store_true', default=True, help='Move to trash instead of delete')
-    parser.add_argument('--scan-id', type=int, help='Associated scan ID for cleanup')
+    parser.add_argument('--no-trash', dest='use_trash', action='store_false', help='Delete permanently (for --clean)')
+    parser.add_argument('--quarantine', action='store_true',
+                        help='Move items into a quarantine on their own filesystem instead of deleting (for --clean)')
+    parser.add_argument('--retention-days', type=float, default=DEFAULT_RETENTION_DAYS, metavar='DAYS',
+                        help=f'Keep quarantined data this long (default: {DEFAULT_RETENTION_DAYS:g})')
+    parser.add_argument('--scan-id', type=int,
+                        help='Associated scan ID for cleanup; its recorded sizes are reused while unchanged')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream scan results (for --scan) or cleanup progress (for --clean) as NDJSON events')
+    parser.add_argument('--files', action='store_true', help='Scan at file granularity (for --scan)')
+    parser.add_argument('--older-than', type=float, metavar='DAYS', help='Only files not modified for DAYS (implies --files)')
+    parser.add_argument('--larger-than', type=float, metavar='MB', help='Only files of at least MB megabytes (implies --files)')
+    parser.add_argument('--largest', type=int, metavar='N', help='Find the N largest files (under --roots or the scan paths)')
+    parser.add_argument('--duplicates', action='store_true', help='Find duplicate files under --roots')
+    parser.add_argument('--artifacts', action='store_true',
+                        help='Find build outputs (node_modules, target, ...) under --roots (default: home)')
+    parser.add_argument('--roots', nargs='+', metavar='PATH', help='Directories to search (for --largest/--duplicates)')
+    parser.add_argument('--no-index', action='store_true', help='Ignore the incremental scan index and re-walk everything')
+    parser.add_argument('--resume', type=int, metavar='SCAN_ID', help='Continue a cancelled (partial) scan')
+    parser.add_argument('--throttle', type=float, nargs='?', const=0, metavar='ENTRIES_PER_SEC',
+                        help='Background mode: back off when the disk is busy, optionally capping directory entries read per second')
+    parser.add_argument('--low-priority', action='store_true', help='Run at reduced CPU and I/O priority')
+    parser.add_argument('--packs', nargs='+', metavar='NAME',
+                        help=f"Built-in rule packs to scan with (default: all of {', '.join(BUILTIN_PACKS)})")
+    parser.add_argument('--rule-pack', action='append', metavar='FILE',
+                        help='Additional rule pack (JSON); may be given several times')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep scan sizes current with filesystem watches until interrupted (Linux)')
+    parser.add_argument('--watch-budget', type=int, default=DEFAULT_WATCH_BUDGET, metavar='N',
+                        help=f'Maximum number of directory watches (default: {DEFAULT_WATCH_BUDGET})')
+    parser.add_argument('--cross-mounts', action='store_true', help='Descend into filesystems mounted inside scanned directories')
     
     args = parser.parse_args()
+
+    if args.low_priority:
+        lower_priority()
     
-    if args.scan:
+    if args.largest:
+        run_largest(args)
+    elif args.duplicates:
+        run_duplicates(args)
+    elif args.artifacts:
+        run_artifacts(args)
+    elif args.watch:
+        run_watch(args)
+    elif args.scan or args.resume:
         run_scan(args)
     elif args.clean:
         run_clean(args)
+    elif args.preview:
+        run_preview(args)
+    elif args.undo:
+        run_undo(args)
+    elif args.purge_quarantine:
+        run_purge(args)
     elif args.history:
         show_history(args)
     elif args.stats:
@@ -82,32 +145,90 @@ def main():
         sys.exit(1)
 
 
+def get_scan_index(db) -> ScanIndex:
+    """Open the incremental scan index stored next to the database file."""
+    return ScanIndex(os.path.join(os.path.dirname(db.db_path), 'scan_index.db'))
+
+
+def get_sizer(args, index=None) -> DirSizer:
+    """Build the directory walk engine, throttled if --throttle was given."""
+    throttle = IOThrottle(args.throttle) if args.throttle is not None else None
+    return DirSizer(index=index, throttle=throttle, cross_mounts=args.cross_mounts)
+
+
+def get_scanner(args, db, sizer=None) -> CacheScanner:
+    """Build the scanner with the rule packs selected by --packs/--rule-pack, spilling next to the database."""
+    try:
+        return CacheScanner(sizer=sizer, exclusions=db.get_exclusions(), rule_packs=args.packs,
+                            pack_files=args.rule_pack,
+                            temp_dir=os.path.join(os.path.dirname(db.db_path), 'spill'))
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
 def run_scan(args):
     """Execute a system scan and save to database."""
-    scanner = CacheScanner()
-    result = scanner.scan(quick_scan=args.quick)
+    db = get_database()
+    index = None if args.no_index else get_scan_index(db)
+    scanner = get_scanner(args, db, get_sizer(args, index))
+    file_filter = get_file_filter(args)
+
+    resume = None
+    resume_items = None
+    if args.resume:
+        resume = db.get_checkpoint(args.resume)
+        if resume is None:
+            print(f"Error: scan {args.resume} has no checkpoint to resume", file=sys.stderr)
+            sys.exit(1)
+        resume_items = (FileItem(**data) for data in db.iter_checkpoint_items(args.resume))
+        args.quick = (db.get_scan(args.resume) or {}).get('scan_type') == 'quick'
+
+    # Ctrl+C / SIGTERM stop the walk and checkpoint it instead of losing it
+    cancel = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: cancel.set())
+
+    if args.stream:
+        stream_scan(scanner, db, args, file_filter, cancel, resume, resume_items)
+        return
+
+    result = scanner.scan(quick_scan=args.quick, file_filter=file_filter, time_budget=args.time_budget,
+                          cancel=cancel, resume=resume, resume_items=resume_items)
     
     # Save scan to database
-    db = get_database()
-    scan_id = db.add_scan(
-        scan_type='quick' if args.quick else 'full',
-        total_items=result.total_items,
-        total_size_bytes=result.total_size_bytes,
-        duration_seconds=result.scan_duration_seconds,
-        scan_data={'categories': result.categories}
-    )
+    scan_id = record_scan(db, args, {
+        'status': result.status,
+        'total_items': result.total_items,
+        'total_size_bytes': result.total_size_bytes,
+        'total_disk_size_bytes': result.total_disk_size_bytes,
+        'scan_duration_seconds': result.scan_duration_seconds,
+        'categories': result.categories,
+        'checkpoint': result.checkpoint,
+        'measured_dirs': result.measured_dirs
+    }, result.items)
     
     if args.output == 'json':
-        output = result.to_dict()
+        output = result.to_dict(include_items=False)
         output['scan_id'] = scan_id  # Include DB scan ID
-        print(json.dumps(output, indent=2))
+        # Items are written one by one; a spilled scan never has them all in memory
+        header = json.dumps(output, indent=2)
+        sys.stdout.write(header[:-2] + ',\n  "items": [\n')
+        for i, item in enumerate(result.items.iter_dicts()):
+            sys.stdout.write(('    ' if i == 0 else '  , ') + json.dumps(item) + '\n')
+        sys.stdout.write('  ]\n}\n')
     else:
         print("\n" + "=" * 50)
         print("CloudCleaner Scan Results")
         print("=" * 50)
         print(f"\nScan ID: {scan_id}")
+        if result.status == 'partial':
+            print(f"Scan cancelled - continue it with --resume {scan_id}")
         print(f"Total items found: {result.total_items}")
-        print(f"Total size: {format_bytes(result.total_size_bytes)}")
+        print(f"Total size: {format_bytes(result.total_size_bytes)}"
+              f" ({format_bytes(result.total_disk_size_bytes)} on disk)")
+        if result.estimated:
+            print(f"  Estimated, +/- {format_bytes(result.total_size_margin_bytes)}")
         print(f"Scan duration: {result.scan_duration_seconds}s")
         print("\nCategories:")
         for cat, size in result.categories.items():
@@ -115,36 +236,348 @@ def run_scan(args):
         print("\nTop 5 largest items:")
         for item in result.items[:5]:
             print(f"  - {item.path}")
-            print(f"    Size: {format_bytes(item.size_bytes)}, Risk: {item.risk_level}")
+            size = format_bytes(item.size_bytes)
+            if item.estimated:
+                size = f"~{size} +/- {format_bytes(item.size_margin_bytes)}"
+            print(f"    Size: {size}, Risk: {item.risk_level}")
         print()
+    result.close()
 
 
-def run_clean(args):
-    """Execute cleanup of specified items and save to database."""
+def get_file_filter(args):
+    """Build the file-granular scan filter from CLI options, or None for a root-level scan."""
+    if not (args.files or args.older_than or args.larger_than):
+        return None
+    return FileFilter(
+        min_size_bytes=int((args.larger_than or 0) * 1024 * 1024),
+        min_age_days=args.older_than or 0
+    )
+
+
+def stream_scan(scanner: CacheScanner, db, args, file_filter=None, cancel=None, resume=None,
+                resume_items=None):
+    """Print scan events as NDJSON while the scan runs; the final event carries the scan ID."""
+    items = ItemRuns(scanner.spill_threshold_bytes, scanner.temp_dir)
+    for event in scanner.scan_iter(quick_scan=args.quick, file_filter=file_filter,
+                                   time_budget=args.time_budget, cancel=cancel, resume=resume,
+                                   resume_items=resume_items):
+        output = event.to_dict()
+        if event.type == 'item':
+            items.append_item(event.item)
+        elif event.type == 'done':
+            output.pop('checkpoint', None)
+            output.pop('measured_dirs', None)
+            output['scan_id'] = record_scan(db, args, event.data, items.finish())
+        print(json.dumps(output), flush=True)
+
+
+def record_scan(db, args, summary: dict, items=None) -> int:
+    """
+    Save scan totals to history (updating the row of a resumed scan) and keep or drop its checkpoint.
+
+    A partial scan's checkpoint is saved with its items, streamed from the
+    scan's own item store (spilled runs included) rather than a copy.
+
+    The sizes of the directory items are stored too, with the inode and
+    mtime the walk saw, for --clean/--preview --scan-id to reuse; nothing
+    is stat'ed again here, and file-granular scans store none.
+    """
+    fields = {
+        'total_items': summary['total_items'],
+        'total_size_bytes': summary['total_size_bytes'],
+        'duration_seconds': summary['scan_duration_seconds'],
+        'scan_data': {'categories': summary['categories']},
+        'status': summary['status'],
+        'total_disk_bytes': summary['total_disk_size_bytes']
+    }
+    if args.resume:
+        scan_id = args.resume
+        db.update_scan(scan_id, **fields)
+    else:
+        scan_id = db.add_scan(scan_type='quick' if args.quick else 'full', **fields)
+
+    if summary.get('checkpoint'):
+        db.save_checkpoint(scan_id, summary['checkpoint'], items.iter_dicts() if items is not None else ())
+    else:
+        db.delete_checkpoint(scan_id)
+    db.save_scan_items(scan_id, summary.get('measured_dirs', ()))
+    return scan_id
+
+
+def run_watch(args):
+    """Watch the scan roots and keep their indexed sizes current until interrupted."""
+    db = get_database()
+    index = get_scan_index(db)
+    scanner = get_scanner(args, db)
+    throttle = IOThrottle(args.throttle) if args.throttle is not None else None
+    watcher = CacheWatcher(index, scanner.root_dirs(), max_watches=args.watch_budget, throttle=throttle)
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    try:
+        status = watcher.start()
+    except OSError as e:
+        print(f"Error: cannot watch scan roots: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    printed = {}
+
+    def report(status: dict):
+        if args.output == 'json':
+            print(json.dumps(status), flush=True)
+            return
+        for root in status['roots']:
+            coverage = '' if root['complete'] else ' (partially watched)'
+            line = f"{root['path']}: {format_bytes(root['size_bytes'])}{coverage}"
+            # Text mode only shows changes visible at its precision
+            if printed.get(root['path']) != line:
+                printed[root['path']] = line
+                print(line, flush=True)
+
+    if args.output != 'json':
+        print(f"Watching {len(status['roots'])} roots with {status['watches']} watches; Ctrl+C to stop")
+    report(status)
+    watcher.run(stop, on_change=report)
+
+
+def run_largest(args):
+    """Find the N largest files and print the ranking."""
+    db = get_database()
+    scanner = get_scanner(args, db, get_sizer(args))
+    items = scanner.find_largest(args.largest, roots=args.roots, file_filter=get_file_filter(args))
+
+    if args.output == 'json':
+        # Written item by item so the ranking is never held as one JSON string
+        sys.stdout.write('{"items": [\n')
+        for i, item in enumerate(items):
+            sys.stdout.write(('  ' if i == 0 else ', ') + json.dumps(item.to_dict()) + '\n')
+        sys.stdout.write(f'], "total_items": {len(items)}, '
+                         f'"total_size_bytes": {sum(item.size_bytes for item in items)}}}\n')
+    else:
+        print("\n" + "=" * 50)
+        print(f"Largest {len(items)} Files")
+        print("=" * 50)
+        for item in items:
+            print(f"  {format_bytes(item.size_bytes):>10}  {item.path}")
+        print()
+
+
+def run_duplicates(args):
+    """Find duplicate files under the given roots."""
+    if not args.roots:
+        print("Error: --roots required for --duplicates", file=sys.stderr)
+        sys.exit(1)
+
+    db = get_database()
+    min_size = int((args.larger_than or 0) * 1024 * 1024)
+    finder = DuplicateFinder(sizer=get_sizer(args), min_size_bytes=min_size, exclusions=db.get_exclusions())
+    result = finder.find(args.roots)
+
+    if args.output == 'json':
+        output = result.to_dict()
+        # Ready to pass to --clean --items
+        output['cleanup_paths'] = result.cleanup_paths()
+        print(json.dumps(output, indent=2))
+    else:
+        print("\n" + "=" * 50)
+        print("CloudCleaner Duplicate Files")
+        print("=" * 50)
+        print(f"\nDuplicate groups: {len(result.groups)}")
+        print(f"Reclaimable: {format_bytes(result.reclaimable_bytes)}")
+        print(f"Files examined: {result.files_examined}, hashed: {result.files_hashed}")
+        for group in result.groups[:10]:
+            print(f"\n  {format_bytes(group.size_bytes)} x {len(group.paths)}")
+            print(f"    keep: {group.paths[0]}")
+            for path in group.redundant_paths():
+                print(f"    dup:  {path}")
+        print()
+
+
+def run_artifacts(args):
+    """Find build artifacts under project roots, stalest first."""
+    db = get_database()
+    finder = ArtifactFinder(sizer=get_sizer(args), exclusions=db.get_exclusions(),
+                            min_age_days=args.older_than or 0)
+    result = finder.find(args.roots or [os.path.expanduser('~')])
+
+    if args.output == 'json':
+        output = result.to_dict()
+        # Ready to pass to --clean --items
+        output['cleanup_paths'] = result.cleanup_paths()
+        print(json.dumps(output, indent=2))
+    else:
+        print("\n" + "=" * 50)
+        print("CloudCleaner Build Artifacts")
+        print("=" * 50)
+        print(f"\nArtifacts: {len(result.artifacts)}")
+        print(f"Reclaimable: {format_bytes(result.reclaimable_bytes)}")
+        print(f"Directories searched: {result.dirs_walked}")
+        for artifact in result.artifacts[:10]:
+            print(f"\n  {artifact.path}")
+            print(f"    {artifact.ecosystem}, {format_bytes(artifact.size_bytes)},"
+                  f" last built {artifact.age_days:.0f} days ago")
+        print()
+
+
+def get_items(args):
+    """Parse the --items JSON list (or read all of --items-file), exiting on a missing or malformed one."""
+    if args.items_file:
+        try:
+            return list(iter_items_file(args.items_file))
+        except (ValueError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
     if not args.items:
-        print("Error: --items required for cleanup", file=sys.stderr)
+        print("Error: --items or --items-file required for cleanup", file=sys.stderr)
         sys.exit(1)
-    
     try:
-        paths = json.loads(args.items)
+        return json.loads(args.items)
     except json.JSONDecodeError:
         print("Error: Invalid JSON for --items", file=sys.stderr)
         sys.exit(1)
-    
-    cleaner = Cleaner(use_trash=args.use_trash)
-    result = cleaner.execute(paths)
+
+
+def iter_items_file(path: str):
+    """
+    Yield paths from an NDJSON file ('-' for stdin) as they are read.
+
+    Each non-empty line holds a JSON string or an object with a "path" key.
+
+    Raises:
+        ValueError: On a line that is neither
+    """
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                raise ValueError(f"Invalid JSON on line {number} of {path}")
+            if isinstance(item, dict):
+                item = item.get('path')
+            if not isinstance(item, str):
+                raise ValueError(f"No path on line {number} of {path}")
+            yield item
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def get_cleaner(args, db, paths=None) -> Cleaner:
+    """
+    Build the cleaner, reusing the sizes --scan-id recorded and the scan index for the rest.
+
+    Only the recorded sizes of paths are loaded; all of the scan's if paths is None.
+    """
+    index = None if args.no_index else get_scan_index(db)
+    scan_sizes = db.get_scan_items(args.scan_id, paths) if args.scan_id else None
+    return Cleaner(use_trash=args.use_trash, sizer=get_sizer(args, index), exclusions=db.get_exclusions(),
+                   scan_sizes=scan_sizes, quarantine=get_quarantine(db) if args.quarantine else None)
+
+
+def get_quarantine(db) -> Quarantine:
+    """Open the quarantine journal stored next to the database file."""
+    app_dir = os.path.dirname(db.db_path)
+    return Quarantine(os.path.join(app_dir, 'quarantine.db'), os.path.join(app_dir, 'quarantine'))
+
+
+def start_purger(args):
+    """Run --purge-quarantine in a detached low-priority process, so cleanup returns at once."""
+    command = [sys.executable] if getattr(sys, 'frozen', False) else [sys.executable, os.path.abspath(__file__)]
+    command += ['--purge-quarantine', '--low-priority', '--retention-days', str(args.retention_days)]
+    options = {'creationflags': subprocess.DETACHED_PROCESS} if os.name == 'nt' else {'start_new_session': True}
+    try:
+        subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL, **options)
+    except OSError:
+        pass  # The next cleanup or an explicit --purge-quarantine catches up
+
+
+def run_preview(args):
+    """Show the paths a cleanup would delete and the space it would free."""
+    paths = get_items(args)
+    db = get_database()
+    preview = get_cleaner(args, db, paths).preview(paths)
+
+    if args.output == 'json':
+        print(json.dumps(preview, indent=2))
+    else:
+        print("\n" + "=" * 50)
+        print("CloudCleaner Cleanup Preview")
+        print("=" * 50)
+        print(f"\nItems to delete: {preview['items_to_delete']}")
+        print(f"Space to free: {format_bytes(preview['estimated_size_bytes'])}"
+              f" ({format_bytes(preview['estimated_disk_bytes'])} on disk)")
+        for item in preview['paths']:
+            source = ' (from scan)' if item['from_scan'] else ''
+            print(f"  {format_bytes(item['size']):>10}  {item['path']}{source}")
+        for warning in preview['warnings']:
+            print(f"  - {warning}")
+        print()
+
+
+def run_clean(args):
+    """Execute cleanup of specified items and save to database."""
+    # --items-file is streamed in batches; --items arrives whole on the command line
+    paths = None if args.items_file else get_items(args)
+    db = get_database()
+    cleaner = get_cleaner(args, db, paths)
+
+    def print_progress(reports):
+        # One NDJSON line per requested path with its running counts
+        for report in reports:
+            output = report.to_dict()
+            output.pop('failures')
+            print(json.dumps({'type': 'progress', **output}), flush=True)
+
+    def print_copy_progress(path, copied, total):
+        print(json.dumps({'type': 'copy_progress', 'path': path, 'copied_bytes': copied,
+                          'total_bytes': total}), flush=True)
+
+    on_progress = print_progress if args.stream else None
+    on_copy_progress = print_copy_progress if args.stream else None
+    if paths is not None:
+        result = cleaner.execute(paths, on_progress=on_progress, on_copy_progress=on_copy_progress)
+        cleaned_paths = result.cleaned_paths
+    else:
+        # Each batch's cleaned paths, for the history record to be auditable
+        cleaned_paths = []
+
+        def on_batch(number, batch, total):
+            cleaned_paths.extend(batch.cleaned_paths)
+            if args.stream:
+                print(json.dumps({'type': 'batch', 'batch': number, 'items_deleted': batch.items_deleted,
+                                  'items_failed': batch.items_failed, 'freed_bytes': batch.freed_bytes,
+                                  'total_items_deleted': total.items_deleted,
+                                  'total_items_failed': total.items_failed,
+                                  'total_freed_bytes': total.freed_bytes}), flush=True)
+            elif args.output == 'text':
+                print(f"Batch {number}: {total.items_deleted} deleted, {total.items_failed} failed,"
+                      f" {format_bytes(total.freed_bytes)} freed", file=sys.stderr, flush=True)
+        result = cleaner.execute_stream(iter_items_file(args.items_file), on_batch=on_batch,
+                                        on_progress=on_progress, on_copy_progress=on_copy_progress)
     
     # Save cleanup to database
-    db = get_database()
     cleanup_id = db.add_cleanup(
         scan_id=args.scan_id,
         items_deleted=result.items_deleted,
         items_failed=result.items_failed,
         bytes_freed=result.freed_bytes,
-        deleted_paths=paths if result.success else None
+        deleted_paths=cleaned_paths,
+        disk_bytes_freed=result.freed_disk_bytes
     )
+    if result.quarantine_batch:
+        cleaner.quarantine.assign_cleanup(result.quarantine_batch, cleanup_id)
+        start_purger(args)
     
-    if args.output == 'json':
+    if args.stream:
+        print(json.dumps({'type': 'done', **result.to_dict(), 'cleanup_id': cleanup_id}), flush=True)
+    elif args.output == 'json':
         output = result.to_dict()
         output['cleanup_id'] = cleanup_id
         print(json.dumps(output, indent=2))
@@ -155,7 +588,14 @@ def run_clean(args):
         print(f"\nCleanup ID: {cleanup_id}")
         print(f"Items deleted: {result.items_deleted}")
         print(f"Items failed: {result.items_failed}")
-        print(f"Space freed: {format_bytes(result.freed_bytes)}")
+        print(f"Entries removed: {result.entries_deleted}, left behind: {result.entries_failed}")
+        if result.quarantine_batch:
+            print(f"Space held in quarantine: {format_bytes(result.held_bytes)}"
+                  f" ({format_bytes(result.held_disk_bytes)} on disk) - freed when purged")
+            print(f"Quarantined for {args.retention_days:g} days - restore with --undo {cleanup_id}")
+        else:
+            print(f"Space freed: {format_bytes(result.freed_bytes)}"
+                  f" ({format_bytes(result.freed_disk_bytes)} on disk)")
         if result.errors:
             print("\nErrors:")
             for error in result.errors:
@@ -163,6 +603,44 @@ def run_clean(args):
         print()
 
 
+def run_undo(args):
+    """Restore the items a quarantine cleanup moved away."""
+    db = get_database()
+    result = get_quarantine(db).undo(args.undo)
+
+    if args.output == 'json':
+        output = result.to_dict()
+        output['cleanup_id'] = args.undo
+        print(json.dumps(output, indent=2))
+    else:
+        print(f"\nRestored {len(result.moved)} items of cleanup {args.undo}")
+        for path in result.moved:
+            print(f"  + {path}")
+        for path, reason in result.errors:
+            print(f"  - {path}: {reason}")
+        print()
+    if result.errors:
+        sys.exit(1)
+
+
+def run_purge(args):
+    """Delete quarantined data that is past retention or needed for free space."""
+    db = get_database()
+    result = get_quarantine(db).purge(retention_days=args.retention_days, sizer=get_sizer(args))
+    # Quarantine cleanups were recorded as freeing nothing; credit them now
+    for cleanup_id, freed in result['cleanups'].items():
+        db.add_cleanup_freed(cleanup_id, freed['freed_bytes'], freed['freed_disk_bytes'])
+
+    if args.output == 'json':
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"\nPurged {result['purged']} quarantined items, freeing {format_bytes(result['freed_bytes'])}"
+              f" ({format_bytes(result['freed_disk_bytes'])} on disk)")
+        for error in result['errors']:
+            print(f"  - {error['path']}: {error['error']}")
+        print()
+
+
 def show_history(args):
     """Show scan and cleanup history."""
     db = get_database()
@@ -179,14 +657,16 @@ def show_history(args):
         print("=" * 50)
         for scan in db.get_scan_history(limit=10):
             print(f"  [{scan['id']}] {scan['timestamp']} - {scan['scan_type']}")
-            print(f"      Items: {scan['total_items']}, Size: {format_bytes(scan['total_size_bytes'])}")
+            print(f"      Items: {scan['total_items']}, Size: {format_bytes(scan['total_size_bytes'])}"
+                  f" ({format_bytes(scan['total_disk_bytes'])} on disk)")
         
         print("\n" + "=" * 50)
         print("Cleanup History (Last 10)")
         print("=" * 50)
         for cleanup in db.get_cleanup_history(limit=10):
             print(f"  [{cleanup['id']}] {cleanup['timestamp']}")
-            print(f"      Deleted: {cleanup['items_deleted']}, Freed: {format_bytes(cleanup['bytes_freed'])}")
+            print(f"      Deleted: {cleanup['items_deleted']}, Freed: {format_bytes(cleanup['bytes_freed'])}"
+                  f" ({format_bytes(cleanup['disk_bytes_freed'])} on disk)")
         print()
 
 
@@ -203,7 +683,8 @@ def show_stats(args):
         print("=" * 50)
         print(f"\nTotal scans performed: {stats['total_scans']}")
         print(f"Total cleanups performed: {stats['total_cleanups']}")
-        print(f"Total space freed: {format_bytes(stats['total_bytes_freed'])}")
+        print(f"Total space freed: {format_bytes(stats['total_bytes_freed'])}"
+              f" ({format_bytes(stats['total_disk_bytes_freed'])} on disk)")
         print(f"Total items cleaned: {stats['total_items_cleaned']}")
         print()
 
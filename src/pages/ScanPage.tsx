@@ -72,7 +72,21 @@ export default function ScanPage() {
             // Try to use Electron API first
             if (window.electronAPI) {
                 const { quickScanByDefault } = useAppStore.getState().preferences
-                const result = await window.electronAPI.runScan({ quick: quickScanByDefault })
+                const unsubscribe = window.electronAPI.onScanProgress((scanEvent) => {
+                    if (scanEvent.type === 'progress') {
+                        const eta = scanEvent.eta_seconds != null ? ` (~${Math.ceil(scanEvent.eta_seconds)}s left)` : ''
+                        updateScanProgress(Math.round(scanEvent.percent), `Scanned ${scanEvent.dirs_visited} folders${eta}`)
+                    } else if (scanEvent.type === 'category') {
+                        const mb = Math.round(scanEvent.size_bytes / (1024 * 1024))
+                        setDiscoveries(d => [...d.filter(line => !line.includes(` ${scanEvent.category}`)), `✓ Found ${mb} MB in ${scanEvent.category}`])
+                    }
+                })
+                let result
+                try {
+                    result = await window.electronAPI.runScan({ quick: quickScanByDefault })
+                } finally {
+                    unsubscribe()
+                }
                 completeScan(result)
                 // Calculate health score based on results
                 const junkGB = result.total_size_bytes / (1024 * 1024 * 1024)
@@ -112,6 +126,7 @@ export default function ScanPage() {
     }, [])
 
     const handleCancel = () => {
+        window.electronAPI?.cancelScan()
         cancelScan()
         navigate('/')
     }
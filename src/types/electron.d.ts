@@ -9,6 +9,8 @@ declare global {
             // Scanner operations
             runScan: (options: { quick: boolean }) => Promise<any>
             executeCleanup: (items: string[]) => Promise<any>
+            cancelScan: () => Promise<{ success: boolean }>
+            onScanProgress: (callback: (event: { type: string; [key: string]: any }) => void) => () => void
 
             // System info
             getSystemInfo: () => Promise<{
@@ -30,6 +32,7 @@ declare global {
                     scan_type: string
                     total_items: number
                     total_size_bytes: number
+                    total_disk_bytes: number
                     duration_seconds: number
                     status: string
                 }>
@@ -40,12 +43,14 @@ declare global {
                     items_deleted: number
                     items_failed: number
                     bytes_freed: number
+                    disk_bytes_freed: number
                 }>
             }>
             getStats: () => Promise<{
                 total_scans: number
                 total_cleanups: number
                 total_bytes_freed: number
+                total_disk_bytes_freed: number
                 total_items_cleaned: number
             }>
             getDiskUsage: () => Promise<{